@@ -1,4 +1,4 @@
-import sys,glob
+import sys
 import numpy as np
 sys.path.insert(1,'../')
 from mpi4py import MPI
@@ -10,8 +10,7 @@ def test_integration():
         All test data here is for the same system, currently at zero temperature
         TODO: have finite temperature tests..
     """
-    csv_list = glob.glob("dumps/pafi_data_*.csv")
-    p = ResultsProcessor(data_path=csv_list)
+    p = ResultsProcessor(data_path="dumps/pafi_data_*.csv")
     
     # Returns a pandas DataFrame and a list of dictionaries
     x_key = 'ReactionCoordinate'
@@ -68,6 +67,26 @@ def test_python_input():
     manager.run()
     manager.close()
 
+def test_model_input():
+    """Sample a Frenkel-Kontorova chain with ModelWorker, without LAMMPS
+    """
+    from pafi import PAFIManager,PAFIParser,ModelWorker
+    parameters = PAFIParser()
+    parameters.set("Model","FrenkelKontorova",create=True)
+    parameters.set("Replicas",64,create=True)
+    # write the minimum energy path as LAMMPS data files
+    ModelWorker.write_pathway(parameters,"systems/MODEL-FK")
+    parameters.axes["Temperature"] = [100.]
+    parameters.axes["ReactionCoordinate"] = np.linspace(0.,1.,11)
+    parameters.set("SampleSteps",500)
+    parameters.set("ThermSteps",200)
+    parameters.set("ThermWindow",100)
+    
+    manager = PAFIManager(MPI.COMM_WORLD,parameters=parameters,
+                          Worker=ModelWorker)
+    manager.run()
+    manager.close()
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="""
@@ -78,11 +97,14 @@ if __name__ == "__main__":
             mpirun -np 4 python TestRoutines.py -t partial
             mpirun -np 4 python TestRoutines.py -t python
 
+            # analytic model, without LAMMPS
+            mpirun -np 4 python TestRoutines.py -t model
+
             # just test postprocessing
             python TestRoutines.py -t integrate
             """)
     
-    options =  ['complete','partial','python','integrate']
+    options =  ['complete','partial','python','integrate','model']
     
     parser.add_argument('-t', '--test', help='Must be in '+" ".join(options))
     args = parser.parse_args()
@@ -97,6 +119,8 @@ if __name__ == "__main__":
         test_python_input()
     elif test==options[3]:
         test_integration()
+    elif test==options[4]:
+        test_model_input()
     
 
 exit()
@@ -0,0 +1,110 @@
+import sys,os,json
+import numpy as np
+sys.path.insert(1,os.path.join(os.path.dirname(os.path.abspath(__file__)),'../../'))
+from mpi4py import MPI
+import argparse
+
+"""
+    Single benchmark of PAFIManager.run() with MockWorker, without LAMMPS.
+    Run with e.g.
+        mpirun -np 8 python MockBenchmark.py --planes 16 --repeats 2
+    See RunBenchmarks.py for a scaling study
+"""
+
+def run_benchmark(args:argparse.Namespace)->None|dict:
+    """Run PAFIManager with MockWorker and Profile=1
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        command line arguments
+
+    Returns
+    -------
+    None or dict
+        configuration and timings, on rank 0
+    """
+    from pafi import PAFIManager, PAFIParser, MockWorker
+    world = MPI.COMM_WORLD
+    rank = world.Get_rank()
+
+    systems = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "../systems/EAM-VAC-W")
+    parameters = PAFIParser(rank=rank)
+    parameters.set_pathway(os.path.join(systems,"image_*.dat"))
+    # MockWorker does not read the potential
+    parameters.set_potential(os.path.join(systems,"image_0.dat"))
+    parameters.axes["Temperature"] = [100.]
+    parameters.axes["ReactionCoordinate"] = np.linspace(0.,1.,args.planes)
+    parameters.set("DumpFolder",args.dump)
+    parameters.set("nRepeats",args.repeats)
+    parameters.set("maxExtraRepeats",0)
+    parameters.set("CoresPerWorker",args.cores)
+    parameters.set("TaskFarm",int(args.taskfarm))
+    parameters.set("PostDump",int(args.atoms>0))
+    parameters.set("WriteDev",int(args.atoms>0))
+    parameters.set("Profile",1)
+    for k,v in zip(["MockCost","MockCostSpread","MockAtoms"],
+                   [args.cost,args.spread,args.atoms]):
+        parameters.set(k,v,create=True)
+    if rank==0:
+        os.makedirs(args.dump,exist_ok=True)
+    world.Barrier()
+
+    manager = PAFIManager(world,parameters=parameters,Worker=MockWorker)
+    world.Barrier()
+    start = MPI.Wtime()
+    manager.run()
+    world.Barrier()
+    wall = MPI.Wtime() - start
+    profiles = manager.gather_profiles()
+    manager.close()
+    if rank>0:
+        return None
+
+    total = lambda p,k: p[k][1] if k in p else 0.0
+    calls = lambda p,k: p[k][0] if k in p else 0
+    n_samples = sum(calls(p,"Sample") for p in profiles)
+    # time not spent sampling, per sample, for each sampling worker
+    overhead = [(wall-total(p,"Sample"))/calls(p,"Sample") \
+                for p in profiles if calls(p,"Sample")>0]
+    gather = sum(total(p,k) for p in profiles for k in ["Post","Drain","Record"])
+    return {"procs":world.Get_size(),"workers":manager.nWorkers,
+            "planes":args.planes,"repeats":args.repeats,
+            "taskfarm":int(args.taskfarm),"cost":args.cost,
+            "spread":args.spread,"atoms":args.atoms,
+            "wall":wall,"samples":n_samples,
+            "ideal":max(total(p,"Sample") for p in profiles),
+            "overhead_per_sample":float(np.mean(overhead)),
+            "gather_per_sample":gather/max(1,n_samples),
+            "write":total(profiles[0],"Write"),
+            "writer_thread":total(profiles[0],"Writer")}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="""
+    PAFIManager benchmark with MockWorker, without LAMMPS.
+    Timings are appended as a JSON line to --output
+    """)
+    parser.add_argument('--planes',type=int,default=8,
+                        help='number of ReactionCoordinate planes')
+    parser.add_argument('--repeats',type=int,default=1,help='nRepeats')
+    parser.add_argument('--cores',type=int,default=1,help='CoresPerWorker')
+    parser.add_argument('--cost',type=float,default=0.01,
+                        help='mean sample time in seconds')
+    parser.add_argument('--spread',type=float,default=0.0,
+                        help='log-normal spread of sample time')
+    parser.add_argument('--atoms',type=int,default=0,
+                        help='if >0, write Dev of this many atoms')
+    parser.add_argument('--taskfarm',action='store_true',help='TaskFarm=1')
+    parser.add_argument('--dump',default='./benchmark_dumps',
+                        help='DumpFolder')
+    parser.add_argument('--output',default=None,
+                        help='file to append JSON results to')
+    args = parser.parse_args()
+
+    res = run_benchmark(args)
+    if not res is None:
+        print(json.dumps(res))
+        if not args.output is None:
+            with open(args.output,'a') as f:
+                f.write(json.dumps(res)+"\n")
@@ -0,0 +1,81 @@
+import os,json,subprocess,itertools
+import argparse
+from typing import List
+
+"""
+    Scaling study of PAFIManager with MockWorker, without LAMMPS.
+    Runs MockBenchmark.py under mpirun for increasing numbers of
+    workers, planes and repeats, then prints a table of
+    - wall : total run time [s]
+    - ideal : run time of the slowest worker's samples [s]
+    - overhead : time not spent sampling, per sample [ms]
+    - gather : time posting, receiving and recording results, per sample [ms]
+    - write : blocking rank 0 output time [ms]
+    - writer : output time on the background thread of rank 0 [ms]
+
+    Compare tables before and after a change, at the same --cost,
+    to catch regressions in the coordination layer
+"""
+
+def run(mpirun:str,procs:int,options:List[str],output:str)->None:
+    """Run a single MockBenchmark.py
+
+    Parameters
+    ----------
+    mpirun : str
+        MPI launcher, with any options, e.g. "mpirun --oversubscribe"
+    procs : int
+        number of MPI processes
+    options : List[str]
+        options for MockBenchmark.py
+    output : str
+        JSON lines file for results
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "MockBenchmark.py")
+    cmd = mpirun.split() + ["-np",str(procs),"python",script,
+                            "--output",output] + options
+    print(" ".join(cmd))
+    subprocess.run(cmd,check=True,stdout=subprocess.DEVNULL)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="""
+    Scaling benchmark of PAFIManager with MockWorker
+    """)
+    parser.add_argument('--mpirun',default='mpirun',
+                        help='MPI launcher, e.g. "mpirun --oversubscribe"')
+    parser.add_argument('--procs',default='2 4 8',
+                        help='numbers of MPI processes')
+    parser.add_argument('--planes',default='4 16',help='numbers of planes')
+    parser.add_argument('--repeats',default='1 4',help='values of nRepeats')
+    parser.add_argument('--cost',default='0.01',
+                        help='mean sample time in seconds')
+    parser.add_argument('--atoms',default='0',
+                        help='if >0, write Dev of this many atoms')
+    parser.add_argument('--taskfarm',action='store_true',help='TaskFarm=1')
+    parser.add_argument('--output',default='benchmark.jsonl',
+                        help='JSON lines file for results, overwritten')
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    options = ["--cost",args.cost,"--atoms",args.atoms]
+    if args.taskfarm:
+        options += ["--taskfarm"]
+    for procs,planes,repeats in itertools.product(
+            *[[int(v) for v in a.split()] \
+              for a in [args.procs,args.planes,args.repeats]]):
+        run(args.mpirun,procs,options+["--planes",str(planes),
+                                       "--repeats",str(repeats)],args.output)
+
+    with open(args.output,'r') as f:
+        results = [json.loads(line) for line in f]
+    fields = ["workers","planes","repeats","samples","wall","ideal"]
+    ms_fields = ["overhead_per_sample","gather_per_sample","write","writer_thread"]
+    header = fields + ["overhead","gather","write","writer"]
+    print(("{: >10} "*len(header)).format(*header))
+    for res in results:
+        line = [res[k] if isinstance(res[k],int) else f"{res[k]:.3g}" \
+                for k in fields]
+        line += [f"{1000.*res[k]:.3g}" for k in ms_fields]
+        print(("{: >10} "*len(header)).format(*line))
@@ -1,5 +1,13 @@
 from .parsers.PAFIParser import PAFIParser
-from .workers.PAFIWorker import PAFIWorker
+try:
+    from .workers.PAFIWorker import PAFIWorker
+except ModuleNotFoundError as e:
+    # without LAMMPS, only e.g. MockWorker can be used
+    if e.name!="lammps":
+        raise
+    PAFIWorker = None
+from .workers.MockWorker import MockWorker
+from .workers.ModelWorker import ModelWorker
 from .results.ResultsHolder import ResultsHolder
 from .results.ResultsProcessor import ResultsProcessor
 from .managers.PAFIManager import PAFIManager
\ No newline at end of file
@@ -1,4 +1,5 @@
 from mpi4py import MPI
+from typing import List
 from ..parsers.PAFIParser import BaseParser
 from ..workers.BaseWorker import BaseWorker
 from ..results.BaseGatherer import BaseGatherer
@@ -16,31 +17,38 @@ class BaseManager:
             a predefined or custom Worker classes, default BaseWorker
         Gatherer : Gatherer class
             a predefined or custom Gatherer classes, default BaseGatherer
+        worker_sizes : None or List[int], optional
+            number of cores for each worker, summing to nProcs, 
+            not allowed if `TaskFarm==1`. If None, read from the 
+            `WorkerSizes` parameter, or if that is empty, nProcs is 
+            split into near-equal workers of around `CoresPerWorker` 
+            cores, with a single core for the 
+            coordinating worker if `TaskFarm==1`. Default None
     """
     def __init__(self,world:MPI.Intracomm,parameters:BaseParser,
-                 Worker=BaseWorker,Gatherer=BaseGatherer)->None:
+                 Worker=BaseWorker,Gatherer=BaseGatherer,
+                 worker_sizes:None|List[int]=None)->None:
         self.world = world
         self.rank = world.Get_rank()
         self.nProcs = world.Get_size()
         # Read in configuration file
         self.parameters = parameters
-        self.CoresPerWorker = int(self.parameters("CoresPerWorker"))
-        if self.nProcs%self.CoresPerWorker!=0:
-            if self.rank==0:
-                print(f"""
-                    CoresPerWorker={self.CoresPerWorker} must factorize nProcs={self.nProcs}!!
-                """)
-                exit(-1)
+        # all ranks use the output suffix of rank 0, e.g. for DevStore
+        self.parameters.suffix = world.bcast(self.parameters.suffix)
+        
         # Establish Workers
-        # worker_comm : Worker communicator for e.g. LAMMPS
-        self.nWorkers = self.nProcs // self.CoresPerWorker
+        self.worker_sizes = self.find_worker_sizes(worker_sizes)
+        self.nWorkers = len(self.worker_sizes)
+        
+        # roots : first rank of each worker
+        self.roots = [sum(self.worker_sizes[:i]) for i in range(self.nWorkers)]
+        self.worker_rank = sum(r<=self.rank for r in self.roots) - 1
+        self.CoresPerWorker = self.worker_sizes[self.worker_rank]
         
-        # Create worker communicator 
-        self.worker_rank = self.rank // self.CoresPerWorker
+        # worker_comm : Worker communicator for e.g. LAMMPS
         self.worker_comm = world.Split(self.worker_rank,0)
         
         # ensemble_comm: Global communicator for averaging
-        self.roots = [i*self.CoresPerWorker for i in range(self.nWorkers)]
         self.ensemble_comm = world.Create(world.group.Incl(self.roots))
         
 
@@ -50,7 +58,8 @@ class BaseManager:
                              self.parameters,
                              self.worker_rank,
                              self.rank,
-                             self.roots)
+                             self.roots,
+                             world=self.world)
         
         
         # Establish Gatherer
@@ -67,6 +76,56 @@ class BaseManager:
         if self.rank==0:
             print(self.parameters.welcome_message())   
     
+    def find_worker_sizes(self,worker_sizes:None|List[int]=None)->List[int]:
+        """Number of cores for each worker
+
+        Parameters
+        ----------
+        worker_sizes : None or List[int], optional
+            if None, read from `WorkerSizes` or split nProcs into 
+            near-equal workers of around `CoresPerWorker` cores. 
+            If `TaskFarm==1`, the first worker then has a single core
+
+        Returns
+        -------
+        List[int]
+            number of cores for each worker
+
+        Raises
+        ------
+        ValueError
+            if the worker sizes are not positive or do not sum to nProcs,
+            or are given with `TaskFarm==1`, where the first worker 
+            only coordinates, see PAFIManager.run_task_farm()
+        """
+        if worker_sizes is None:
+            worker_sizes = [int(n) for n in \
+                            str(self.parameters("WorkerSizes")).split()]
+        if len(worker_sizes)>0:
+            if self.parameters("TaskFarm"):
+                raise ValueError(f"WorkerSizes={list(worker_sizes)} "
+                                 "cannot be used with TaskFarm=1")
+            if sum(worker_sizes)!=self.nProcs or min(worker_sizes)<1:
+                raise ValueError(f"WorkerSizes={list(worker_sizes)} requests "
+                                 f"{sum(worker_sizes)} cores, but "
+                                 f"{self.nProcs} are available")
+            return list(worker_sizes)
+        CoresPerWorker = int(self.parameters("CoresPerWorker"))
+        # with TaskFarm==1 the first worker only coordinates,
+        # so is given a single core, see PAFIManager.run_task_farm()
+        coordinator = int(bool(self.parameters("TaskFarm")) \
+                          and CoresPerWorker>1 and self.nProcs>CoresPerWorker)
+        nProcs = self.nProcs - coordinator
+        nWorkers = max(1,nProcs // CoresPerWorker)
+        if nProcs%CoresPerWorker!=0 and self.rank==0:
+            print(f"""
+                CoresPerWorker={CoresPerWorker} does not factorize nProcs={nProcs},
+                using {nWorkers} workers of near-equal size
+                """)
+        # remainder distributed over the first workers
+        return [1]*coordinator + \
+            [nProcs//nWorkers + int(i < nProcs%nWorkers) for i in range(nWorkers)]
+    
     def close(self)->None:
         """Close Manager
             closes Worker
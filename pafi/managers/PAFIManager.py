@@ -1,21 +1,29 @@
 import itertools
-from typing import List,Dict
+from typing import List,Dict,Tuple
 import numpy as np
 import os
 from mpi4py import MPI
 from ..results.ResultsHolder import ResultsHolder
 from .BaseManager import BaseManager
 from ..parsers.PAFIParser import PAFIParser
-from ..workers.PAFIWorker import PAFIWorker
+try:
+    from ..workers.PAFIWorker import PAFIWorker
+except ModuleNotFoundError as e:
+    # without LAMMPS, only e.g. MockWorker can be used
+    if e.name!="lammps":
+        raise
+    PAFIWorker = None
 from ..results.Gatherer import Gatherer
 
 class PAFIManager(BaseManager):
+    TASK_TAG = 7
     def __init__(self, world: MPI.Intracomm, 
                  xml_path:None|os.PathLike[str]=None,
                  parameters:None|PAFIParser=None,
                  restart_data:None|os.PathLike[str]=None,
                  Worker:PAFIWorker=PAFIWorker,
-                 Gatherer:Gatherer=Gatherer) -> None:
+                 Gatherer:Gatherer=Gatherer,
+                 worker_sizes:None|List[int]=None) -> None:
         """Default manager of PAFI, child of BaseManager
 
         Parameters
@@ -27,24 +35,187 @@ class PAFIManager(BaseManager):
         parameters : None or PAFIParser object, optional
             preloaded PAFIParser object, default None
         restart_data : None or os.PathLike[str], optional
-            path to CSV data file. Will read and skip already sampled parameters
+            path to CSV data file or .npz checkpoint. Will read and skip 
+            already sampled parameters. The prior data is merged into 
+            the new output, which then contains all samples
         Worker : PAFIWorker, optional,
             Can be overwritten by child class, by default PAFIWorker
         Gatherer : Gatherer, optional
             Can be overwritten by child class, by default Gatherer
+        worker_sizes : None or List[int], optional
+            number of cores for each worker, see BaseManager. Default None
         """
         
         
         assert (not parameters is None) or (not xml_path is None)
+        if Worker is None:
+            raise ModuleNotFoundError("PAFIWorker requires LAMMPS, "
+                                      "see MockWorker for testing")
         
         if parameters is None:
             # TODO have standalone check for suffix in config_[suffix].xml?
             # not the best solution currently if we use BaseManager alone....
             parameters = PAFIParser(xml_path=xml_path,rank=world.Get_rank())
         
-        super().__init__(world, parameters, Worker, Gatherer)
+        super().__init__(world, parameters, Worker, Gatherer, worker_sizes)
         
+        # completed samples for each (plane,repeat), see load_restart()
+        self.completed = {}
+        if not restart_data is None:
+            self.load_restart(restart_data)
+        
+        # scalar results are sent as typed records, see set_schema()
+        self.schema = self.Worker.results_schema()
+        if not self.Gatherer is None:
+            self.Gatherer.set_schema(self.schema)
+        
+        # per-stage timing, shared with the worker, see Profiler
+        self.profiler = self.Worker.profiler
+        
+        # minimum number of valid samples per plane, see resample()
+        self.parameters.set_min_valid(self.nWorkers)
+        
+        # TaskFarm==1 : dynamic scheduling, rank 0 only coordinates
+        self.task_farm = bool(self.parameters("TaskFarm"))
+        if self.task_farm and self.nWorkers<2:
+            if self.rank==0:
+                print("TaskFarm requires at least two workers, using lockstep")
+            self.task_farm = False
+    
+    def plane_results(self,dict_axes:dict)->ResultsHolder:
+        """Initial ResultsHolder for a given hyperplane
+
+        Parameters
+        ----------
+        dict_axes : dict
+            values of each axis, e.g. Temperature and ReactionCoordinate
+
+        Returns
+        -------
+        ResultsHolder
+            input data for Worker.sample()
+        """
+        results = ResultsHolder(schema=self.schema)
+        results.set_dict(dict_axes)
+        
+        # Useful helper for including zero temperature cheaply...
+        for k in ["SampleSteps","ThermSteps","ThermWindow"]:
+            if results("Temperature")<0.1:
+                results.set(k,1)
+            else:
+                results.set(k,self.parameters(k))
+        return results
+    
+    def planes(self)->List[dict]:
+        """All hyperplanes to sample, as a nested loop over all 
+            <Axes> in the order presented in the XML configuration file
+
+        Returns
+        -------
+        List[dict]
+            list of dictionaries of the values of each axis
+        """
+        axes = self.parameters.axes
+        return [dict(zip(axes.keys(),axes_coord)) \
+                for axes_coord in itertools.product(*axes.values())]
+    
+    def load_restart(self,restart_data:os.PathLike[str])->None:
+        """Read in data from a previous run, on rank 0, and determine
+            the number of completed samples for each (plane,repeat).
+            Axes values must match those of <Axes> to 8 decimals, 
+            see BaseGatherer.plane_key(), with a warning if none do
+
+        Parameters
+        ----------
+        restart_data : os.PathLike[str]
+            path to CSV data file or .npz checkpoint
+        """
+        completed = {}
+        if self.rank==0:
+            if str(restart_data)[-4:]==".npz":
+                self.Gatherer.read_checkpoint(restart_data)
+            else:
+                self.Gatherer.read_pandas(restart_data)
+            data = self.Gatherer.all_data
+            planes = {self.Gatherer.plane_key(d):i \
+                      for i,d in enumerate(self.planes())}
+            n_data = 0 if data is None else len(data["Repeat"])
+            for i in range(n_data):
+                key = self.Gatherer.plane_key({a:data[a][i] \
+                                              for a in self.parameters.axes})
+                if key in planes:
+                    batch = (planes[key],int(data["Repeat"][i]))
+                    completed[batch] = completed.get(batch,0) + 1
+            n_matched = sum(completed.values())
+            print(f"""
+            Restarting from {restart_data}: {n_data} samples,
+            {n_matched} on the planes of <Axes>
+            """)
+            # axes values must match to 8 decimals, see plane_key()
+            if n_data>0 and n_matched==0:
+                print(f"""
+            WARNING: no sample of {restart_data} matches the <Axes>,
+            all planes will be sampled
+            """)
+        self.completed = self.world.bcast(completed,root=0)
+    
+    def prior_repeats(self,nRepeats:int)->Dict[int,int]:
+        """Number of repeats for each plane, including any
+            extra repeats made before restart
+
+        Parameters
+        ----------
+        nRepeats : int
+            number of repeats per hyperplane
+
+        Returns
+        -------
+        Dict[int,int]
+            number of repeats for each plane index
+        """
+        prior_repeats = {plane:nRepeats for plane in range(len(self.planes()))}
+        for plane,repeat in self.completed.keys():
+            prior_repeats[plane] = max(prior_repeats[plane],repeat)
+        return prior_repeats
     
+    def checkpoint(self,n_planes:None|int=None)->None:
+        """Write binary checkpoint of all data every 
+            CheckpointInterval completed planes, on rank 0.
+            Can be used as restart_data
+
+        Parameters
+        ----------
+        n_planes : None|int, optional
+            number of completed planes. If None, always write
+            if CheckpointInterval>0. Default None
+        """
+        interval = self.parameters("CheckpointInterval")
+        if self.rank!=0 or interval<1:
+            return
+        if n_planes is None or n_planes%interval==0:
+            self.Gatherer.write_checkpoint(self.parameters.checkpoint_file)
+    
+    def resample(self,dict_axes:dict)->bool:
+        """Check if a hyperplane has too few valid samples,
+            i.e. less than parameters.min_valid(). Only on rank 0
+
+        Parameters
+        ----------
+        dict_axes : dict
+            values of each axis
+
+        Returns
+        -------
+        bool
+            True if an extra repeat should be scheduled
+        """
+        n_valid = self.Gatherer.valid_count(dict_axes)
+        min_valid = self.parameters.min_valid()
+        if n_valid < min_valid:
+            plane = " ".join(f"{k}={dict_axes[k]}" for k in self.parameters.axes)
+            print(f"Resampling {plane}: {n_valid} < {min_valid} valid samples")
+            return True
+        return False
     
     def run(self,print_fields:List[str]|None=None,
             width:int=10,precision:int=5)->None:
@@ -52,8 +223,9 @@ class PAFIManager(BaseManager):
 
             Performs a nested loop over all <Axes>, in the order
             presented in the XML configuration file.
-            Here, parallelization is naive- all workers are given the 
-            same parameters.
+            If TaskFarm==0, parallelization is naive- all workers are given 
+            the same parameters. If TaskFarm==1, rank 0 hands out samples
+            to idle workers, see run_task_farm()
         Parameters
         ----------
         print_fields : List[str] or None
@@ -102,11 +274,25 @@ class PAFIManager(BaseManager):
                 fields += [f if isstr else np.round(f,precision)]
             return format_string.format(*fields)
 
+        # printout of each (plane,repeat) once complete, see record()
+        self.print_fields = print_fields
+        self.line = line
+        self.plane_data = {}
+        self.batch_count = self.completed.copy()
+        self.last_coord = None
+
         if self.rank==0:
+            cores = set(self.worker_sizes)
+            cores = cores.pop() if len(cores)==1 else \
+                f"{min(cores)}-{max(cores)}"
             screen_out = f"""
-            Initialized {self.nWorkers} workers with {self.CoresPerWorker} cores
+            Initialized {self.nWorkers} workers with {cores} cores
             <> == time averages,  av/err over ensemble
             """
+            if self.task_farm:
+                screen_out+=f"""
+            TaskFarm: rank 0 coordinates {self.nWorkers-1} sampling workers
+            """
             if min(self.parameters.axes["Temperature"]) < 0.1:
                 screen_out+="""
             *** FOR T=0K RUNS SampleSteps=1 AND ThermalSteps=1 ***
@@ -114,45 +300,364 @@ class PAFIManager(BaseManager):
             print(screen_out)
             print(line(print_fields))
         
-        last_coord = None
-        for axes_coord in itertools.product(*self.parameters.axes.values()):
-            dict_axes = dict(zip(self.parameters.axes.keys(), axes_coord))
-            
+        if self.task_farm:
+            self.run_task_farm(nRepeats)
+        else:
+            self.run_lockstep(nRepeats)
+        
+        if self.rank==0:
+            print(f"Data written to {self.parameters.csv_file}")
+        if self.profiler.enabled:
+            self.profile_summary()
+    
+    def gather_profiles(self)->None|List[Dict[str,Tuple[int,float]]]:
+        """Profiler summary of each worker, on rank 0. `Writer` is the
+            time spent writing output on the background thread of rank 0,
+            see ResultsWriter. Must be called by all roots
+
+        Returns
+        -------
+        None or List[Dict[str,Tuple[int,float]]]
+            (number of calls,total time) of each stage, for each worker,
+            None if not rank 0
+        """
+        summary = None
+        if self.rank in self.roots:
+            summary = self.profiler.summary()
             if self.rank==0:
-                if not last_coord is None and last_coord!=axes_coord[:-1]:
-                    print("\n"+line(print_fields))
+                summary["Writer"] = self.Gatherer.write_stats()
+            summary = self.ensemble_comm.gather(summary)
+        return summary
+    
+    def profile_summary(self)->None:
+        """Print the mean wall time per call of each stage, for each
+            worker, see gather_profiles()
+        """
+        summary = self.gather_profiles()
+        if self.rank==0:
+            stages = []
+            for s in summary:
+                stages += [k for k in s if not k in stages]
+            width = max(10,max(len(k) for k in stages))
+            fmt = ("{: >%d} " % width) * (len(stages)+1)
+            print("\nMean time per call [ms], (number of calls) for each worker")
+            print(fmt.format("Worker",*stages))
+            for worker,s in enumerate(summary):
+                fields = [f"{1000.*s[k][1]/max(1,s[k][0]):.3g} ({s[k][0]})" \
+                          if k in s else "-" for k in stages]
+                print(fmt.format(worker,*fields))
+    
+    def record(self,result:dict,plane:int,repeat:int)->bool:
+        """Store a single result on rank 0. Once a (plane,repeat) 
+            has nWorkers samples, print the running average for 
+            the plane and write all data.
+
+        Parameters
+        ----------
+        result : dict
+            Simulation data, extracted as dictionary from ResultsHolder
+        plane : int
+            plane index, see planes()
+        repeat : int
+            repeat index, starting from 1
+
+        Returns
+        -------
+        bool
+            True if the (plane,repeat) batch is complete
+        """
+        self.Gatherer.store(result)
+        
+        # running printout data for each plane, fields only
+        if not plane in self.plane_data:
+            keys = set(f[:-4] if f[-4:]=="_std" else f for f in self.print_fields)
+            self.plane_data[plane] = {k:[] for k in keys}
+        for k,v in self.plane_data[plane].items():
+            if k in result:
+                v += [result[k]]
+        
+        batch = (plane,repeat)
+        self.batch_count[batch] = self.batch_count.get(batch,0) + 1
+        if self.batch_count[batch] < self.nWorkers:
+            return False
+        
+        if not self.task_farm:
+            axes_coord = tuple(result[a] for a in self.parameters.axes)
+            if not self.last_coord is None and self.last_coord!=axes_coord[:-1]:
+                print("\n"+self.line(self.print_fields))
+            self.last_coord = axes_coord[:-1]
+        screen_data = self.plane_data[plane].copy()
+        screen_data["Repeat"] = [repeat]
+        screen_out = self.Gatherer.get_dict(self.print_fields,data=screen_data)
+        print(self.line(screen_out))
+        self.Gatherer.write_pandas(path=self.parameters.csv_file)
+        return True
+    
+    def run_lockstep(self,nRepeats:int)->None:
+        """Lockstep sampling: all workers sample each hyperplane together.
+            Workers post results without blocking, then continue. 
+            Rank 0 receives results between its own samples.
+            Only when checking for extra repeats does rank 0 wait 
+            for all results on a plane, see resample()
+
+        Parameters
+        ----------
+        nRepeats : int
+            number of repeats per worker per hyperplane
+        """
+        maxExtraRepeats = self.parameters("maxExtraRepeats")
+        prior_repeats = self.prior_repeats(nRepeats)
+        planes = self.planes()
+        plane_index = {}
+        if self.rank==0:
+            plane_index = {self.Gatherer.plane_key(d):i \
+                           for i,d in enumerate(planes)}
+        
+        def drain(block_plane:None|int=None,block_repeat:int=0)->None:
+            """Record results received on rank 0, optionally
+            waiting until a given (plane,repeat) is complete
+            """
+            block = not block_plane is None
+            batch = (block_plane,block_repeat)
+            while True:
+                if block and self.batch_count.get(batch,0)>=self.nWorkers:
+                    block = False
+                with self.profiler("Drain"):
+                    received = self.Gatherer.drain(block=block)
+                for result in received:
+                    plane = plane_index[self.Gatherer.plane_key(result)]
+                    with self.profiler("Record"):
+                        self.record(result,plane,int(result["Repeat"]))
+                if not block:
+                    break
+        
+        for plane,plane_axes in enumerate(planes):
+            dict_axes = dict(plane_axes)
             if nRepeats>1:
                 dict_axes["Repeat"] = 1
-            results = ResultsHolder()
-            results.set_dict(dict_axes)
-            
-            
-            # Useful helper for including zero temperature cheaply...
-            for k in ["SampleSteps","ThermSteps","ThermWindow"]:
-                if results("Temperature")<0.1:
-                    results.set(k,1)
-                else:
-                    results.set(k,self.parameters(k))
+            results = self.plane_results(dict_axes)
             
-            for repeat in range(nRepeats):
-                # Sampling run, returning ResultsHolder object
-                final_results = self.Worker.sample(results)
-                final_results.set("Repeat",repeat + 1)
-
-                # incorporate results (this is only performed on local roots)
-                self.Gatherer.gather(final_results)
-                self.Gatherer.collate(repeat)
-
-                # wait
-                self.world.Barrier()
-                screen_out = self.Gatherer.get_dict(print_fields)
+            # extra repeats if too few valid samples, see resample()
+            nSamples = prior_repeats[plane]
+            repeat = 0
+            while repeat < nSamples:
+                # skip workers which have already sampled, on restart
+                n_done = self.completed.get((plane,repeat+1),0)
+                if n_done < self.nWorkers and self.worker_rank >= n_done:
+                    # Sampling run, returning ResultsHolder object
+                    with self.profiler("Sample"):
+                        final_results = self.Worker.sample(results)
+                    self.profiler.record(final_results)
+                    final_results.set("Repeat",repeat + 1)
+                    
+                    # send results (this is only performed on local roots)
+                    if not self.Gatherer is None:
+                        with self.profiler("Post"):
+                            self.Gatherer.post(final_results)
                 if self.rank == 0:
-                    print(line(screen_out))
-                    self.Gatherer.write_pandas(path=self.parameters.csv_file)
+                    drain()
+                
+                repeat += 1
+                if repeat == nSamples and nSamples < nRepeats + maxExtraRepeats:
+                    resample = None
+                    if self.rank==0:
+                        drain(plane,repeat)
+                        resample = self.resample(dict_axes)
+                    with self.profiler("Wait"):
+                        resample = self.world.bcast(resample,root=0)
+                    if resample:
+                        nSamples += 1
             
-            last_coord = axes_coord[:-1]
+            if self.rank == 0:
+                with self.profiler("Write"):
+                    self.Gatherer.write_pandas(self.parameters.csv_file,sync=True)
+                    self.checkpoint(plane+1)
         
-        if self.rank==0:
-            print(f"Data written to {self.parameters.csv_file}")
+        # receive all remaining results
+        if not self.Gatherer is None:
+            for result in self.Gatherer.flush():
+                plane = plane_index[self.Gatherer.plane_key(result)]
+                self.record(result,plane,int(result["Repeat"]))
+        if self.rank == 0:
+            self.Gatherer.write_pandas(path=self.parameters.csv_file)
+            self.Gatherer.close()
+        self.checkpoint()
+        self.world.Barrier()
+    
+    def task_list(self,nRepeats:int)->List[Tuple[int,dict,int]]:
+        """List of sampling tasks for the task farm. 
+            Each hyperplane and repeat receives nWorkers samples, as in 
+            lockstep sampling, less any completed samples on restart.
+            Tasks are interleaved over hyperplanes, such that idle 
+            workers spread across all planes
+
+        Parameters
+        ----------
+        nRepeats : int
+            number of repeats per hyperplane
+
+        Returns
+        -------
+        List[Tuple[int,dict,int]]
+            list of (plane index, axes dictionary, repeat)
+        """
+        planes = self.planes()
+        prior_repeats = self.prior_repeats(nRepeats)
+        tasks = []
+        for repeat in range(1,max(prior_repeats.values())+1):
+            for member in range(self.nWorkers):
+                for plane,dict_axes in enumerate(planes):
+                    if repeat > prior_repeats[plane]:
+                        continue
+                    if member < self.completed.get((plane,repeat),0):
+                        continue
+                    tasks += [(plane,dict_axes,repeat)]
+        return tasks
+
+    def run_task_farm(self,nRepeats:int)->None:
+        """Dynamic sampling: rank 0 hands out (axes,repeat) tasks 
+            to idle workers, which return results as soon as they finish.
+            Results are posted as typed records, as in lockstep sampling, 
+            followed by a request for the next task.
+            Worker 0 only coordinates and does not sample. Unless worker 
+            sizes are given, it has a single core, see find_worker_sizes().
+            A hyperplane is printed once each repeat has nWorkers samples
+
+        Parameters
+        ----------
+        nRepeats : int
+            number of repeats per hyperplane
+        """
+        if self.rank == 0:
+            self.coordinate_task_farm(nRepeats)
+            self.worker_comm.bcast(None,root=0)
+        elif self.worker_rank == 0:
+            # any other cores of the coordinating worker wait
+            self.worker_comm.bcast(None,root=0)
+        else:
+            task_id = None
+            while True:
+                with self.profiler("Wait"):
+                    if self.rank in self.roots:
+                        # None for the first request, else the completed task
+                        self.ensemble_comm.send(task_id,dest=0,tag=self.TASK_TAG)
+                        task = self.ensemble_comm.recv(source=0,tag=self.TASK_TAG)
+                    else:
+                        task = None
+                    task = self.worker_comm.bcast(task,root=0)
+                if task is None:
+                    break
+                task_id, dict_axes, repeat = task
+                results = self.plane_results(dict_axes)
+                results.set("Repeat",repeat)
+                with self.profiler("Sample"):
+                    final_results = self.Worker.sample(results)
+                self.profiler.record(final_results)
+                # received by coordinate_task_farm() before the next request
+                if not self.Gatherer is None:
+                    with self.profiler("Post"):
+                        self.Gatherer.post(final_results)
         
-    
\ No newline at end of file
+        # complete all sends, results are already received
+        if not self.Gatherer is None:
+            received = self.Gatherer.flush()
+            if self.rank == 0:
+                self.finish_task_farm(received)
+        self.world.Barrier()
+    
+    def coordinate_task_farm(self,nRepeats:int)->None:
+        """Task farm coordinator, run on rank 0 only
+
+        Parameters
+        ----------
+        nRepeats : int
+            number of repeats per hyperplane
+        """
+        tasks = self.task_list(nRepeats)
+        next_task = 0
+        active = self.nWorkers-1
+        idle = []
+        
+        # samples not yet returned and extra repeats, for each plane
+        maxExtraRepeats = self.parameters("maxExtraRepeats")
+        planes = self.planes()
+        pending = {plane:0 for plane in range(len(planes))}
+        for plane,_,_ in tasks:
+            pending[plane] += 1
+        extra = {plane:r-nRepeats for plane,r in self.prior_repeats(nRepeats).items()}
+        n_pending = len(tasks)
+        n_complete = 0
+        
+        def complete_plane(plane:int)->None:
+            """Schedule extra repeat or count plane as complete
+            """
+            nonlocal n_pending, n_complete
+            if extra[plane]<maxExtraRepeats and self.resample(planes[plane]):
+                extra[plane] += 1
+                repeat = nRepeats + extra[plane]
+                tasks.extend([(plane,planes[plane],repeat)] * self.nWorkers)
+                pending[plane] += self.nWorkers
+                n_pending += self.nWorkers
+            else:
+                n_complete += 1
+                with self.profiler("Write"):
+                    self.Gatherer.write_pandas(self.parameters.csv_file,sync=True)
+                    self.checkpoint(n_complete)
+        
+        # planes completed before restart
+        for plane in range(len(planes)):
+            if pending[plane]==0:
+                complete_plane(plane)
+        
+        status = MPI.Status()
+        while active>0:
+            with self.profiler("Wait"):
+                task_id = self.ensemble_comm.recv(source=MPI.ANY_SOURCE,
+                                                  tag=self.TASK_TAG,
+                                                  status=status)
+            idle += [status.Get_source()]
+            if not task_id is None:
+                plane, dict_axes, repeat = tasks[task_id]
+                with self.profiler("Drain"):
+                    result = self.Gatherer.receive_from(status.Get_source())
+                with self.profiler("Record"):
+                    self.record(result,plane,repeat)
+                
+                pending[plane] -= 1
+                n_pending -= 1
+                if pending[plane]==0:
+                    complete_plane(plane)
+            
+            # hand out tasks to idle workers
+            while len(idle)>0 and next_task < len(tasks):
+                _, dict_axes, repeat = tasks[next_task]
+                self.ensemble_comm.send((next_task,dict_axes,repeat),
+                                        dest=idle.pop(),tag=self.TASK_TAG)
+                next_task += 1
+            
+            # idle workers wait until all results are in, as these
+            # may trigger extra repeats, then stop
+            if n_pending==0:
+                for source in idle:
+                    self.ensemble_comm.send(None,dest=source,tag=self.TASK_TAG)
+                active -= len(idle)
+                idle = []
+    
+    def finish_task_farm(self,received:List[dict])->None:
+        """Record any results not received by coordinate_task_farm(), 
+        then write all data, on rank 0 only
+
+        Parameters
+        ----------
+        received : List[dict]
+            remaining results, see BaseGatherer.flush()
+        """
+        if len(received)>0:
+            plane_index = {self.Gatherer.plane_key(d):i \
+                           for i,d in enumerate(self.planes())}
+            for result in received:
+                plane = plane_index[self.Gatherer.plane_key(result)]
+                self.record(result,plane,int(result["Repeat"]))
+        self.Gatherer.write_pandas(path=self.parameters.csv_file)
+        self.Gatherer.close()
+        self.checkpoint()
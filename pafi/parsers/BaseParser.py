@@ -5,6 +5,7 @@ import numpy as np
 from typing import Union,Any,List
 ScriptArg = Union[int,float,str]
 from ..results.ResultsHolder import ResultsHolder
+from .ScriptTemplate import ScriptTemplate
 
 class BaseParser:
     """
@@ -160,13 +161,19 @@ class BaseParser:
         """
         self.parameters = {}
         self.parameters["CoresPerWorker"] = 1
+        self.parameters["WorkerSizes"] = ""
         self.parameters["WriteDev"] = 0
         self.parameters["Verbosity"] = 0
         self.parameters["SampleSteps"] = 2000
         self.parameters["ThermSteps"] = 1000
         self.parameters["ThermWindow"] = 100
+        self.parameters["WarmStart"] = 0
+        self.parameters["WarmThermSteps"] = 100
         self.parameters["MinSteps"] = 1000
         self.parameters["nRepeats"] = 1
+        self.parameters["TaskFarm"] = 0
+        self.parameters["CheckpointInterval"] = 0
+        self.parameters["ColumnarOutput"] = 0
         self.parameters["DumpFolder"] = './dumps'
         self.parameters["OverDamped"] = 0
         self.parameters["Friction"] = 0.05
@@ -179,6 +186,12 @@ class BaseParser:
         self.parameters["PostMin"] = 1
         self.parameters["Verbose"] = 0
         self.parameters["SplinePath"] = 1
+        self.parameters["PathTable"] = 0
+        self.parameters["SharedPath"] = 0
+        self.parameters["NativePathReader"] = 0
+        self.parameters["PathCache"] = ""
+        self.parameters["LocalScatter"] = 0
+        self.parameters["Profile"] = 0
         self.parameters["RealMEPDist"] = 1
         self.parameters["GlobalSeed"] = 137
         self.parameters["FreshSeed"] = 1
@@ -372,6 +385,8 @@ class BaseParser:
         self.scripts["PreRun"] = """"""
         self.scripts["PostRun"] = """"""
         self.scripts["PreTherm"] = """"""
+        # compiled scripts, see parse_script()
+        self.templates = {}
     
     def read_scripts(self,xml_scripts) -> None:
         """Read in scripts defined in the XML file 
@@ -504,7 +519,9 @@ class BaseParser:
                      arguments:None|dict|ResultsHolder=None) -> str:
         """Parse an input script
             If script_key is not a key of self.scripts, it 
-            it is treated as a script itself
+            it is treated as a script itself. Scripts are compiled
+            once into a ScriptTemplate, which is only re-rendered
+            if the value of a %key% wildcard has changed
 
         Parameters
         ----------
@@ -522,18 +539,25 @@ class BaseParser:
             script = script_key
         else:
             script = self.scripts[script_key]
+        template = self.templates.get(script_key)
+        if template is None or not template.script is script:
+            template = ScriptTemplate(script)
+            if script_key in self.scripts:
+                self.templates[script_key] = template
         if arguments is None:
             _args = {}
         elif isinstance(arguments,ResultsHolder):
-            _args = arguments.data.copy()
+            _args = arguments.data
         else:
-            _args = arguments.copy()
-        _args["FirstPathConfiguration"] = self.PathwayConfigurations[0]
-        if not self.PotentialLocation is None:
-            _args["Potential"] = self.PotentialLocation
-        for key,value in _args.items():
-            script = self.replace(script,key,value)
-        return script
+            _args = arguments
+        # only placeholders are read, avoiding a copy of arguments
+        values = {k:_args[k] for k in template.placeholders if k in _args}
+        if "FirstPathConfiguration" in template.placeholders:
+            values["FirstPathConfiguration"] = self.PathwayConfigurations[0]
+        if "Potential" in template.placeholders and \
+            not self.PotentialLocation is None:
+            values["Potential"] = self.PotentialLocation
+        return template.render(values)
     
     
     def welcome_message(self):
@@ -596,6 +620,8 @@ class BaseParser:
             self.suffix += 1
             self.xml_file = os.path.join(df,f"config_{self.suffix}.xml")
             self.csv_file = os.path.join(df,f"pafi_data_{self.suffix}.csv")
+            self.checkpoint_file = \
+                os.path.join(df,f"pafi_checkpoint_{self.suffix}.npz")
             self.has_suffix=True
             if self.rank==0:
                 self.to_xml_file()
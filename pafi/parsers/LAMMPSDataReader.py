@@ -0,0 +1,93 @@
+import os
+import numpy as np
+
+# column of x in the Atoms section for each atom style, see
+# https://docs.lammps.org/read_data.html#format-of-the-body-of-a-data-file
+POSITION_COLUMN = {"atomic":2,"charge":3,"bond":3,"angle":3,
+                   "molecular":3,"full":4}
+
+def read_data_positions(file_path:os.PathLike[str],
+                        atom_style:None|str=None)->np.ndarray:
+    """Read atomic positions from a LAMMPS data file, as written by
+    write_data, without LAMMPS. Positions are ordered by atom ID,
+    as returned by LAMMPSWorker.gather("x"). Image flags are ignored,
+    as positions are later unwrapped with BaseWorker.pbc()
+
+    Parameters
+    ----------
+    file_path : os.PathLike[str]
+        path to the LAMMPS data file
+    atom_style : None or str, optional
+        atom style, by default None. If None, read from the
+        `Atoms # style` comment, else assumed `atomic`
+
+    Returns
+    -------
+    np.ndarray, shape (natoms,3)
+        the positions
+
+    Raises
+    ------
+    ValueError
+        if the file has no Atoms section, an unknown atom style
+        or does not contain all atoms
+    """
+    with open(file_path,'r') as f:
+        lines = f.readlines()
+
+    natoms = None
+    start = None
+    for i,line in enumerate(lines):
+        fields = line.split("#")[0].split()
+        if len(fields)==2 and fields[1]=="atoms":
+            natoms = int(fields[0])
+        elif len(fields)>0 and fields[0]=="Atoms":
+            if atom_style is None and "#" in line:
+                atom_style = line.split("#")[1].strip()
+            start = i+1
+            break
+    if natoms is None or start is None:
+        raise ValueError(f"No atoms found in {file_path}")
+
+    atom_style = "atomic" if atom_style is None else atom_style
+    if not atom_style in POSITION_COLUMN:
+        raise ValueError(f"Unknown atom style {atom_style} in {file_path}")
+    column = POSITION_COLUMN[atom_style]
+
+    # skip blank lines after section header
+    while start<len(lines) and len(lines[start].strip())==0:
+        start += 1
+    if start + natoms > len(lines):
+        raise ValueError(f"Expected {natoms} atoms in {file_path}")
+    data = np.loadtxt(lines[start:start+natoms],ndmin=2,
+                      usecols=(0,column,column+1,column+2))
+    return data[np.argsort(data[:,0]),1:]
+
+def write_data_positions(file_path:os.PathLike[str],X:np.ndarray,
+                         cell:None|np.ndarray=None)->None:
+    """Write positions as a LAMMPS data file, atom style `atomic`,
+    with atom IDs in order and a single atom type. 
+    Readable by read_data_positions() and LAMMPS read_data
+
+    Parameters
+    ----------
+    file_path : os.PathLike[str]
+        path to the LAMMPS data file
+    X : np.ndarray, shape (natoms,3)
+        the positions
+    cell : None or np.ndarray, shape (3,3), optional
+        orthogonal supercell, by default None. 
+        If None, a box enclosing all positions
+    """
+    if cell is None:
+        lo, hi = X.min(0)-10.0, X.max(0)+10.0
+    else:
+        lo, hi = np.zeros(3), np.diag(cell)
+    lines = ["LAMMPS data file via pafi","",f"{X.shape[0]} atoms","1 atom types",""]
+    for i,d in enumerate("xyz"):
+        lines += [f"{lo[i]:.10f} {hi[i]:.10f} {d}lo {d}hi"]
+    lines += ["","Masses","","1 1.0","","Atoms # atomic",""]
+    lines += [f"{i+1} 1 {x[0]:.12f} {x[1]:.12f} {x[2]:.12f}" \
+              for i,x in enumerate(X)]
+    with open(file_path,'w') as f:
+        f.write("\n".join(lines)+"\n")
@@ -0,0 +1,50 @@
+import re
+from typing import Union
+ScriptArg = Union[int,float,str]
+
+class ScriptTemplate:
+    def __init__(self,script:str)->None:
+        """A script compiled once into literal text and %key% placeholders.
+        render() only rebuilds the script when the value of a
+        placeholder has changed since the last call
+
+        Parameters
+        ----------
+        script : str
+            script text, with %key% wildcards
+
+        Methods
+        ----------
+        render()
+        """
+        self.script = script
+        # odd entries are placeholder names
+        parts = re.split(r"%(\w+)%",script)
+        self.literals = parts[0::2]
+        self.keys = parts[1::2]
+        self.placeholders = set(self.keys)
+        self.last_values = None
+        self.last_script = None
+
+    def render(self,values:dict[str,ScriptArg])->str:
+        """Fill placeholders. Placeholders without a value are left as %key%
+
+        Parameters
+        ----------
+        values : dict[str,ScriptArg]
+            placeholder values, only the placeholders are read
+
+        Returns
+        -------
+        str
+            the script
+        """
+        filled = {k:str(values[k]) for k in self.placeholders if k in values}
+        if filled == self.last_values:
+            return self.last_script
+        res = [self.literals[0]]
+        for key,literal in zip(self.keys,self.literals[1:]):
+            res += [filled.get(key,f"%{key}%"),literal]
+        self.last_values = filled
+        self.last_script = "".join(res)
+        return self.last_script
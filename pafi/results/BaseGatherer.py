@@ -1,11 +1,20 @@
 from mpi4py import MPI
 import os
 import numpy as np
-from typing import List
+from typing import List, Tuple
 from ..parsers.PAFIParser import PAFIParser
 from .ResultsHolder import ResultsHolder
+from .ResultsWriter import ResultsWriter
 
 class BaseGatherer:
+    RESULT_TAG = 11
+    # typed records, without and with other fields, see post()
+    RECORD_TAG = 12
+    RECORD_OTHERS_TAG = 13
+    OTHERS_TAG = 14
+    # fixed dtypes for columnar output, see schema()
+    SCHEMA = {"Repeat":np.int32,"Valid":np.bool_,"SampleSteps":np.int64,
+              "ThermSteps":np.int64,"ThermWindow":np.int64,"DevIndex":np.int64}
     def __init__(self,params:PAFIParser,
                  nWorkers:int,
                  rank:int,
@@ -35,23 +44,110 @@ class BaseGatherer:
         self.epoch_data = None # for each cycle
         self.all_data = None # for total simulation
         self.last_data = None # for print out
+        self.valid_counts = {} # valid samples for each hyperplane
+        # non-blocking collection, see post() and drain()
+        self.requests = []
+        self.buffers = []
+        self.inbox = []
+        self.n_posted = 0
+        self.n_received = 0
+        # incremental output, see write_pandas()
+        self.writer = None
+        self.n_written = 0
+        # writes of closed writers, see write_stats()
+        self.write_counts = (0,0.0)
+        # typed records, see set_schema()
+        self.record_dtype = None
     
-    def gather(self,data:dict|ResultsHolder)->None:
+    def set_schema(self,schema:None|np.dtype)->None:
+        """Set a structured dtype of scalar fields, which are then 
+        sent as typed records by post() and collate(), rather than pickled.
+        Must be identical on all roots. Other fields, or results
+        not matching the schema, are pickled, see ResultsHolder.split()
+
+        Parameters
+        ----------
+        schema : None or np.dtype
+            structured dtype, or None to pickle all results
+        """
+        self.record_dtype = schema
+    
+    def gather(self,data:None|dict|ResultsHolder)->None:
         """Gather results from a simulation epoch,
         local to each worker. Here, very simple,
         is overwritten by each call of gather()
 
         Parameters
         ----------
-        data : dict or ResultsHolder
-            Simulation data, extracted as dictionary from ResultsHolder
+        data : None, dict or ResultsHolder
+            Simulation data, extracted as dictionary from ResultsHolder.
+            None if the worker did not sample in this epoch
         """
         if self.rank in self.roots:
-            if isinstance(data,ResultsHolder):
+            if data is None:
+                self.epoch_data = None
+            elif isinstance(data,ResultsHolder):
                 self.epoch_data = data.data.copy()
             else:
                 self.epoch_data = data.copy()
-       
+    
+    def gather_records(self)->List[dict]|None:
+        """Gather epoch_data to root node, with typed records in 
+        a single Gatherv() where possible, see set_schema().
+        Must be called by all roots
+
+        Returns
+        -------
+        List[dict] or None
+            all non-empty epoch_data in root order on root node, else None
+        """
+        if self.record_dtype is None:
+            all_epoch_data = self.comm.gather(self.epoch_data)
+            if all_epoch_data is None:
+                return None
+            return [d for d in all_epoch_data if not d is None]
+        
+        # 0 : no data, 1 : record, 2 : record and others, 3 : pickled
+        record, others = None, None
+        mode = 0
+        if not self.epoch_data is None:
+            record, others = ResultsHolder.split(self.epoch_data,
+                                                 self.record_dtype)
+            if record is None:
+                mode = 3
+            else:
+                mode = 1 if len(others)==0 else 2
+        modes = np.zeros(self.comm.Get_size(),np.int32)
+        self.comm.Allgather(np.array([mode],np.int32),modes)
+        
+        itemsize = self.record_dtype.itemsize
+        counts = np.where((modes==1)|(modes==2),itemsize,0)
+        displs = np.cumsum(counts) - counts
+        records = None
+        if self.rank == 0:
+            records = np.empty(counts.sum()//itemsize,dtype=self.record_dtype)
+        if record is None:
+            record = np.empty(0,dtype=self.record_dtype)
+        self.comm.Gatherv([record,MPI.BYTE],
+                          [records,(counts,displs),MPI.BYTE])
+        
+        all_others = None
+        if modes.max()>=2:
+            all_others = self.comm.gather(others if mode>=2 else None)
+        if self.rank != 0:
+            return None
+        
+        all_epoch_data = []
+        i_record = 0
+        for i,m in enumerate(modes):
+            if m==1 or m==2:
+                all_epoch_data += [ResultsHolder.from_record(
+                    records[i_record:i_record+1],
+                    None if m==1 else all_others[i])]
+                i_record += 1
+            elif m==3:
+                all_epoch_data += [all_others[i]]
+        return all_epoch_data
     
     def collate(self,repeat:int=0)->None:
         """Collate all data on root node
@@ -64,10 +160,10 @@ class BaseGatherer:
             If  0, wipe last_data. Default 0
         """
         if self.rank in self.roots:
-            if not self.epoch_data is None:
-                all_epoch_data = self.comm.gather(self.epoch_data)
-                self.epoch_data = None
-            else:
+            # workers which did not sample send None, e.g. on restart
+            all_epoch_data = self.gather_records()
+            self.epoch_data = None
+            if not all_epoch_data is None and len(all_epoch_data)==0:
                 all_epoch_data = None
 
             if self.rank == 0 and not all_epoch_data is None:
@@ -76,21 +172,237 @@ class BaseGatherer:
                 if repeat:
                     self.last_data["Repeat"] = []
 
-                if self.all_data is None:
-                    self.all_data = {k:[] for k in all_epoch_data[0].keys()}
-                
                 for k in all_epoch_data[0].keys():
-                    self.all_data[k] += list(d[k] for d in all_epoch_data)
                     self.last_data[k] += list(d[k] for d in all_epoch_data)
+                for d in all_epoch_data:
+                    self.store(d)
+
+    
+    def post(self,data:dict|ResultsHolder)->None:
+        """Send the results of a single sample to the root node
+        without blocking, such that the worker can continue sampling.
+        The root node receives these results with drain()
+
+        Parameters
+        ----------
+        data : dict or ResultsHolder
+            Simulation data, extracted as dictionary from ResultsHolder
+        """
+        if not self.rank in self.roots:
+            return
+        if isinstance(data,ResultsHolder):
+            data = data.data
+        if self.rank == 0:
+            self.inbox += [data.copy()]
+        else:
+            record, others = ResultsHolder.split(data,self.record_dtype)
+            if record is None:
+                # isend() pickles data immediately
+                self.requests += [self.comm.isend(others,dest=0,
+                                                  tag=self.RESULT_TAG)]
+                self.buffers += [None]
+            else:
+                # record buffer is kept until the send completes
+                tag = self.RECORD_TAG if len(others)==0 \
+                    else self.RECORD_OTHERS_TAG
+                self.requests += [self.comm.Isend([record,MPI.BYTE],
+                                                  dest=0,tag=tag)]
+                self.buffers += [record]
+                if len(others)>0:
+                    self.requests += [self.comm.isend(others,dest=0,
+                                                      tag=self.OTHERS_TAG)]
+                    self.buffers += [None]
+            active = [not r.Test() for r in self.requests]
+            self.requests = [r for r,a in zip(self.requests,active) if a]
+            self.buffers = [b for b,a in zip(self.buffers,active) if a]
+        self.n_posted += 1
+    
+    def receive(self,status:MPI.Status)->dict:
+        """Receive a single result sent by post(), after probing
+
+        Parameters
+        ----------
+        status : MPI.Status
+            status of a successful probe
+
+        Returns
+        -------
+        dict
+            Simulation data
+        """
+        source, tag = status.Get_source(), status.Get_tag()
+        if tag == self.RESULT_TAG:
+            return self.comm.recv(source=source,tag=tag)
+        record = np.empty(1,dtype=self.record_dtype)
+        self.comm.Recv([record,MPI.BYTE],source=source,tag=tag)
+        others = None
+        if tag == self.RECORD_OTHERS_TAG:
+            others = self.comm.recv(source=source,tag=self.OTHERS_TAG)
+        return ResultsHolder.from_record(record,others)
+    
+    def receive_from(self,source:int)->dict:
+        """Receive the next result sent by post() from a given root, 
+        on root node, waiting until it arrives. Used by the task farm, 
+        where each result is followed by a request for the next task
+
+        Parameters
+        ----------
+        source : int
+            rank of the root in ensemble_comm
+
+        Returns
+        -------
+        dict
+            Simulation data
+        """
+        status = MPI.Status()
+        self.comm.Probe(source=source,tag=MPI.ANY_TAG,status=status)
+        if not status.Get_tag() in [self.RESULT_TAG,self.RECORD_TAG,
+                                    self.RECORD_OTHERS_TAG]:
+            raise IOError(f"Unexpected message tag {status.Get_tag()}")
+        self.n_received += 1
+        return self.receive(status)
+    
+    def drain(self,block:bool=False)->List[dict]:
+        """Receive results sent by post() on the root node.
+        Results are returned, not stored, see store()
+
+        Parameters
+        ----------
+        block : bool, optional
+            wait for at least one result, by default False
+
+        Returns
+        -------
+        List[dict]
+            all results received so far, empty if not root node
+        """
+        if self.rank != 0:
+            return []
+        received, self.inbox = self.inbox, []
+        status = MPI.Status()
+        tags = [self.RESULT_TAG,self.RECORD_TAG,self.RECORD_OTHERS_TAG]
+        if block and len(received)==0:
+            self.comm.Probe(source=MPI.ANY_SOURCE,tag=MPI.ANY_TAG,status=status)
+            if not status.Get_tag() in tags:
+                raise IOError(f"Unexpected message tag {status.Get_tag()}")
+            received += [self.receive(status)]
+        for tag in tags:
+            while self.comm.Iprobe(source=MPI.ANY_SOURCE,tag=tag,status=status):
+                received += [self.receive(status)]
+        self.n_received += len(received)
+        return received
+    
+    def flush(self)->List[dict]:
+        """Complete all post() calls and receive all remaining 
+        results on the root node. Must be called by all roots
+
+        Returns
+        -------
+        List[dict]
+            remaining results, empty if not root node
+        """
+        if not self.rank in self.roots:
+            return []
+        MPI.Request.waitall(self.requests)
+        self.requests = []
+        self.buffers = []
+        n_posted = self.comm.gather(self.n_posted)
+        received = self.drain()
+        if self.rank == 0:
+            while self.n_received < sum(n_posted):
+                received += self.drain(block=True)
+        return received
+
+    def store(self,data:dict)->None:
+        """Append a single result to all_data on root node,
+        e.g. as received from a worker by the task farm
+
+        Parameters
+        ----------
+        data : dict
+            Simulation data, extracted as dictionary from ResultsHolder
+        """
+        if self.rank == 0:
+            self.append_rows({k:[v] for k,v in data.items()},1)
+            self.count_valid(data)
+
+    def append_rows(self,data:dict,n_rows:int)->None:
+        """Append rows to all_data on root node, keeping the union of 
+        all fields. Fields missing from data, or from earlier rows, 
+        e.g. of a restart from a differently configured run, are NaN
+
+        Parameters
+        ----------
+        data : dict
+            dictionary of lists, each of length n_rows
+        n_rows : int
+            number of rows
+        """
+        if self.all_data is None:
+            self.all_data = {}
+        n_data = len(next(iter(self.all_data.values()))) \
+            if len(self.all_data)>0 else 0
+        for k in data.keys():
+            if not k in self.all_data:
+                self.all_data[k] = [np.nan] * n_data
+        for k,v in self.all_data.items():
+            v += list(data[k]) if k in data else [np.nan] * n_rows
+
+    def plane_key(self,data:dict)->tuple:
+        """Hashable key of the hyperplane of a sample, 
+        i.e. the values of all axes
 
+        Parameters
+        ----------
+        data : dict
+            Simulation data or dictionary of axes values
+
+        Returns
+        -------
+        tuple
+            rounded axes values, in order of params.axes
+        """
+        return tuple(np.round(float(data[a]),8) for a in self.params.axes.keys())
+    
+    def count_valid(self,data:dict)->None:
+        """Increment the valid sample count of a hyperplane.
+        Samples without a `Valid` field are counted as valid
+
+        Parameters
+        ----------
+        data : dict
+            Simulation data from a single sample
+        """
+        key = self.plane_key(data)
+        valid = int(bool(data["Valid"])) if "Valid" in data else 1
+        self.valid_counts[key] = self.valid_counts.get(key,0) + valid
     
-    def get_line(self,fields:List[str])->List[str]|None:
+    def valid_count(self,dict_axes:dict)->int:
+        """Return the number of valid samples on a hyperplane,
+        only on root node
+
+        Parameters
+        ----------
+        dict_axes : dict
+            values of each axis
+        
+        Returns
+        -------
+        int
+            number of valid samples collated so far
+        """
+        return self.valid_counts.get(self.plane_key(dict_axes),0)
+
+    def get_line(self,fields:List[str],data:None|dict=None)->List[str]|None:
         """Return output data to print out on root node
 
         Parameters
         ----------
         fields : List[str]
             fields to extract
+        data : None or dict, optional
+            dictionary of lists to average, by default None (use last_data)
         Returns
         -------
         List[str]|None
@@ -98,69 +410,256 @@ class BaseGatherer:
         """
         if self.rank != 0:
             return None
+        if data is None:
+            data = self.last_data
         line = []
         for f in fields:
             std = bool(f[-4:] == "_std")
             key = f[:-4] if std else f
-            if (not self.last_data is None) and (key in self.last_data.keys()):
-                d = self.last_data[key]
+            if (not data is None) and (key in data.keys()):
+                d = data[key]
                 line += [np.std(d)/np.sqrt(len(d)) if std else np.mean(d)]
             else:
                 line += ["n/a"]
             
         return line
     
-    def get_dict(self,fields:List[str])->dict|None:
+    def get_dict(self,fields:List[str],data:None|dict=None)->dict|None:
         """Return output data to print out on root node
 
         Parameters
         ----------
         fields : List[str]
             fields to extract
+        data : None or dict, optional
+            dictionary of lists to average, by default None (use last_data)
         Returns
         -------
         dict|None
             if root process, return dict of fields to print, else return `None`
         """
-        line = self.get_line(fields)
+        line = self.get_line(fields,data=data)
         if not line is None:
             return {kv[0]:kv[1] for kv in zip(fields,line)}
 
-    def write_pandas(self,path:os.PathLike[str])->None:
+    def write_pandas(self,path:os.PathLike[str],sync:bool=False)->None:
         """Write data as pandas dataframe
 
+        Only rows added since the last call are appended to the file,
+        on a background thread, see ResultsWriter. If `path` changes,
+        all data is written to the new file.
+
         Parameters
         ----------
         path : os.PathLike[str]
             path to file
+        sync : bool, optional
+            fsync the file once written, e.g. at plane boundaries,
+            by default False
         """
 
         if self.rank==0:
             if self.all_data is None:
                 print("No data to write! Exiting!")
             else:
-                import pandas as pd
                 if not os.path.isdir(os.path.dirname(path)):
                     raise IOError("Unknown directory for writing csv!")
-                else:
-                    df = pd.DataFrame(self.all_data)
-                    df.metadata = " ".join(list(self.params.axes.keys()))
-                    #df.attrs = self.params.to_dict().copy()
-                    df.to_csv(path)
+                # all data is rewritten if fields were added, see store()
+                if self.writer is None or self.writer.path != path or \
+                    self.writer.columns != list(self.all_data.keys()):
+                    self.close()
+                    self.writer = ResultsWriter(path,self.all_data.keys())
+                    self.n_written = 0
+                n_data = len(self.all_data[self.writer.columns[0]])
+                if n_data > self.n_written:
+                    rows = {k:v[self.n_written:] for k,v in self.all_data.items()}
+                    self.writer.append(rows,start=self.n_written)
+                    self.n_written = n_data
+                if sync:
+                    self.writer.sync()
+                    if self.params("ColumnarOutput"):
+                        self.write_columnar(self.columnar_path(path))
+    
+    def close(self)->None:
+        """Finish writing all data, see write_pandas()
+        """
+        if not self.writer is None:
+            if self.params("ColumnarOutput"):
+                self.write_columnar(self.columnar_path(self.writer.path))
+            self.writer.close()
+            self.write_counts = self.write_stats()
+            self.writer = None
+    
+    def write_stats(self)->Tuple[int,float]:
+        """Number of writes and total time spent writing on the 
+        background thread, see ResultsWriter
+
+        Returns
+        -------
+        Tuple[int,float]
+            (count, time in seconds)
+        """
+        count, total = self.write_counts
+        if not self.writer is None:
+            count += self.writer.n_writes
+            total += self.writer.write_time
+        return count, total
+    
+    def columnar_path(self,path:os.PathLike[str])->str:
+        """Path of columnar output, e.g. pafi_data_0.npz for pafi_data_0.csv
+
+        Parameters
+        ----------
+        path : os.PathLike[str]
+            path to CSV file
+        
+        Returns
+        -------
+        str
+            path to .npz file
+        """
+        return os.path.splitext(path)[0]+".npz"
+    
+    def schema(self)->np.dtype:
+        """Structured dtype of all scalar fields in all_data, on root node.
+        Axes are float64 and fields in SCHEMA have fixed types. Other fields
+        are bool, int64, float64 or unicode from their values. Bool or
+        integer fields with missing (NaN) values, see append_rows(), are 
+        float64. Non-scalar fields, e.g. `Dev`, have no columnar form 
+        and are omitted.
+
+        Returns
+        -------
+        np.dtype
+            the structured dtype, with one field per column
+        """
+        fields = []
+        for k,v in self.all_data.items():
+            values = [_v for _v in v if not \
+                      (isinstance(_v,float) and np.isnan(_v))]
+            if k in self.params.axes or len(values)==0:
+                dtype = np.float64
+            elif k in self.SCHEMA:
+                dtype = self.SCHEMA[k]
+            elif np.ndim(values[0])>0:
+                continue
+            elif isinstance(values[0],str):
+                dtype = np.array(v).dtype
+            elif isinstance(values[0],(bool,np.bool_)):
+                dtype = np.bool_
+            elif isinstance(values[0],(int,np.integer)):
+                dtype = np.int64
+            else:
+                dtype = np.float64
+            if len(values)<len(v) and np.dtype(dtype).kind in "biu":
+                dtype = np.float64
+            fields += [(k,dtype)]
+        return np.dtype(fields)
+    
+    def write_columnar(self,path:os.PathLike[str],objects:bool=False)->None:
+        """Write all data as columnar numpy .npz file on root node,
+        one typed array per field, see schema(). The axes names are
+        stored under `__axes__`. Read with ResultsProcessor.
+
+        Parameters
+        ----------
+        path : os.PathLike[str]
+            path to file
+        objects : bool, optional
+            also store non-scalar fields as object arrays, which 
+            then require allow_pickle=True to read. Default False
+        """
+        if self.rank!=0 or self.all_data is None:
+            return
+        schema = self.schema()
+        columns = {}
+        for k in schema.names:
+            columns[k] = np.asarray(self.all_data[k],dtype=schema[k])
+        if objects:
+            for k in set(self.all_data.keys())-set(schema.names):
+                columns[k] = np.empty(len(self.all_data[k]),dtype=object)
+                for i,_v in enumerate(self.all_data[k]):
+                    columns[k][i] = _v
+        columns["__axes__"] = np.array(list(self.params.axes.keys()))
+        # write then move, so file is always complete
+        tmp_path = path+".tmp.npz"
+        np.savez(tmp_path,**columns)
+        os.replace(tmp_path,path)
     
     def read_pandas(self,path:os.PathLike[str])->None:
-        """Read in data from pandas dataframe
+        """Read in data from pandas dataframe, e.g. for restarts
 
-        Only possible if no sampling has taken place.
+        If sampling has taken place, the data is merged with 
+        existing data, see merge().
 
         Parameters
         ----------
         path : os.PathLike[str]
             path to file
         """
-        assert self.all_data is None
         assert os.path.exists(path)
         import pandas as pd
-        self.all_data = pd.read_csv(path)
-            
-                
+        df = pd.read_csv(path,index_col=0)
+        self.merge(df.to_dict(orient="list"),source=path)
+    
+    def write_checkpoint(self,path:os.PathLike[str])->None:
+        """Write all data as binary numpy .npz checkpoint, on root node.
+        As write_columnar(), also storing non-scalar fields
+
+        Parameters
+        ----------
+        path : os.PathLike[str]
+            path to file
+        """
+        self.write_columnar(path,objects=True)
+
+    def read_checkpoint(self,path:os.PathLike[str])->None:
+        """Read in data from .npz checkpoint, see write_checkpoint()
+        
+        If sampling has taken place, the data is merged with 
+        existing data, see merge().
+
+        Parameters
+        ----------
+        path : os.PathLike[str]
+            path to file
+        """
+        assert os.path.exists(path)
+        with np.load(path,allow_pickle=True) as checkpoint:
+            self.merge({k:list(checkpoint[k]) for k in checkpoint.files \
+                        if k!="__axes__"},source=path)
+
+    def merge(self,data:dict,source:str="data")->None:
+        """Merge dictionary of lists with all_data on root node.
+        The axes and `Repeat` are required, to identify completed 
+        samples. Other fields may differ, e.g. `Time*` fields if 
+        `Profile==1`, and all fields are kept, see append_rows()
+        
+        Parameters
+        ----------
+        data : dict
+            dictionary of lists, e.g. from a previous run
+        source : str, optional
+            description of data for messages, by default "data"
+
+        Raises
+        ------
+        ValueError
+            if data is missing the axes or `Repeat`
+        """
+        if self.rank != 0:
+            return
+        missing = [k for k in list(self.params.axes.keys())+["Repeat"] \
+                   if not k in data]
+        if len(missing)>0:
+            raise ValueError(f"{source} is missing fields {missing}, "
+                             "required to identify completed samples")
+        if not self.all_data is None and set(data)!=set(self.all_data):
+            print(f"""
+            Fields of {source} differ, missing values are NaN: 
+            {sorted(set(data)^set(self.all_data))}
+            """)
+        n_data = len(data["Repeat"])
+        self.append_rows(data,n_data)
+        for i in range(n_data):
+            self.count_valid({k:v[i] for k,v in data.items()})
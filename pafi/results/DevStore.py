@@ -0,0 +1,111 @@
+import os
+import numpy as np
+from typing import Tuple
+
+class DevStore:
+    def __init__(self,folder:os.PathLike[str],
+                 worker_instance:int,
+                 chunk_size:int=16)->None:
+        """Chunked on-disk store of per-atom deviations `Dev`, written
+        by a single worker. Each chunk is a memory-mappable .npy file
+        `worker_[worker_instance]_[chunk].npy` of shape
+        (chunk_size,natoms,3), filled one sample at a time.
+
+        The results table only keeps a reference (`DevFile`,`DevIndex`),
+        with `DevFile` relative to the DumpFolder. See load().
+
+        Parameters
+        ----------
+        folder : os.PathLike[str]
+            directory for all chunks, e.g. DumpFolder/dev_[suffix]
+        worker_instance : int
+            unique worker rank
+        chunk_size : int, optional
+            samples per chunk, by default 16
+
+        Methods
+        ----------
+        write()
+        close()
+        load()
+        """
+        self.folder = folder
+        self.worker_instance = worker_instance
+        self.chunk_size = chunk_size
+        self.chunk = -1
+        self.index = chunk_size
+        self.data = None
+        os.makedirs(folder,exist_ok=True)
+
+    def chunk_path(self,chunk:int)->str:
+        """Path to a chunk file
+
+        Parameters
+        ----------
+        chunk : int
+            chunk index
+
+        Returns
+        -------
+        str
+            the path
+        """
+        return os.path.join(self.folder,
+                            f"worker_{self.worker_instance}_{chunk}.npy")
+
+    def write(self,dev:np.ndarray)->Tuple[str,int]:
+        """Write deviation of a single sample, opening a new chunk if full
+
+        Parameters
+        ----------
+        dev : np.ndarray, shape (natoms,3)
+            per-atom deviation from the pathway
+
+        Returns
+        -------
+        Tuple[str,int]
+            chunk file, relative to the parent of `folder`, and index in chunk
+        """
+        if self.index == self.chunk_size:
+            self.close()
+            self.chunk += 1
+            self.index = 0
+            self.data = np.lib.format.open_memmap(self.chunk_path(self.chunk),
+                                    mode='w+',dtype=np.float64,
+                                    shape=(self.chunk_size,)+dev.shape)
+        self.data[self.index] = dev
+        self.data.flush()
+        self.index += 1
+        path = os.path.join(os.path.basename(os.path.normpath(self.folder)),
+                            os.path.basename(self.chunk_path(self.chunk)))
+        return path, self.index-1
+
+    def close(self)->None:
+        """Close the current chunk
+        """
+        if not self.data is None:
+            self.data.flush()
+            del self.data
+            self.data = None
+
+    @staticmethod
+    def load(dump_folder:os.PathLike[str],dev_file:str,
+             dev_index:int)->np.ndarray:
+        """Memory-map the deviation of a single sample
+
+        Parameters
+        ----------
+        dump_folder : os.PathLike[str]
+            DumpFolder of the PAFI run
+        dev_file : str
+            `DevFile` entry of the results table
+        dev_index : int
+            `DevIndex` entry of the results table
+
+        Returns
+        -------
+        np.ndarray, shape (natoms,3)
+            read-only deviation
+        """
+        path = os.path.join(dump_folder,dev_file)
+        return np.load(path,mmap_mode='r')[int(dev_index)]
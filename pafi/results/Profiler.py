@@ -0,0 +1,126 @@
+import time
+import numpy as np
+from contextlib import nullcontext
+from typing import Dict, List, Tuple
+from .ResultsHolder import ResultsHolder
+
+class Stage:
+    def __init__(self,profiler,name:str)->None:
+        """Timer of a single stage, see Profiler
+
+        Parameters
+        ----------
+        profiler : Profiler
+            the profiler to add the elapsed time to
+        name : str
+            stage name
+        """
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self)->None:
+        self.start = time.perf_counter()
+
+    def __exit__(self,*args)->None:
+        self.profiler.add(self.name,time.perf_counter()-self.start)
+
+class Profiler:
+    # returned by __call__() when disabled
+    NULL = nullcontext()
+    def __init__(self,enabled:bool=False,
+                 columns:None|List[str]=None)->None:
+        """Wall time of each stage of a sample, e.g.
+
+            with profiler("PreMin"):
+                ...
+
+        Stages in `columns` are added to the results of each sample
+        as `Time[stage]`, see record(). All stages are summed
+        over samples, see summary(). If not enabled, no timing is done
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            if False, stages are not timed, by default False
+        columns : None or List[str], optional
+            stages recorded per sample, by default None
+
+        Methods
+        ----------
+        __call__()
+        add()
+        record()
+        schema()
+        summary()
+        """
+        self.enabled = enabled
+        self.columns = [] if columns is None else list(columns)
+        self.current = {}
+        self.totals = {}
+        self.counts = {}
+
+    def __call__(self,name:str)->Stage|nullcontext:
+        """Timer context for a stage
+
+        Parameters
+        ----------
+        name : str
+            stage name
+
+        Returns
+        -------
+        Stage or nullcontext
+            the timer, or a shared null context if not enabled
+        """
+        return Stage(self,name) if self.enabled else self.NULL
+
+    def add(self,name:str,elapsed:float)->None:
+        """Add time to a stage
+
+        Parameters
+        ----------
+        name : str
+            stage name
+        elapsed : float
+            time in seconds
+        """
+        self.current[name] = self.current.get(name,0.0) + elapsed
+        self.totals[name] = self.totals.get(name,0.0) + elapsed
+        self.counts[name] = self.counts.get(name,0) + 1
+
+    def record(self,results:ResultsHolder)->None:
+        """Set `Time[stage]` for each of `columns` in results,
+        zero if not run, then start a new sample
+
+        Parameters
+        ----------
+        results : ResultsHolder
+            results of the sample
+        """
+        if not self.enabled:
+            return
+        for name in self.columns:
+            results.set(f"Time{name}",self.current.get(name,0.0))
+        self.current = {}
+
+    def schema(self)->Dict[str,type]:
+        """Fields added by record(), for results_schema()
+
+        Returns
+        -------
+        Dict[str,type]
+            field names and types, empty if not enabled
+        """
+        if not self.enabled:
+            return {}
+        return {f"Time{name}":np.float64 for name in self.columns}
+
+    def summary(self)->Dict[str,Tuple[int,float]]:
+        """Number of calls and total time of each stage
+
+        Returns
+        -------
+        Dict[str,Tuple[int,float]]
+            (count,total time in seconds) for each stage
+        """
+        return {k:(self.counts[k],self.totals[k]) for k in self.totals}
@@ -1,16 +1,27 @@
-from typing import Any,List
+import numpy as np
+from typing import Any,List,Tuple
 
 class ResultsHolder:
     """PAFI ResultsHolder object, 
     a dictionary which contains input and output values
 
+    Parameters
+    ----------
+    schema : None or np.dtype, optional
+        structured dtype of scalar fields, by default None.
+        If given, these fields can be sent as a typed record,
+        see to_record() and BaseGatherer.post()
+
     Methods
     -------
     __call__
     has_key
+    to_record
+    from_record
     """
-    def __init__(self) -> None:
+    def __init__(self,schema:None|np.dtype=None) -> None:
         self.data = {}
+        self.schema = schema
     def items(self)-> Any: # TODO what is the type here?
         """return items for iteration
         Returns
@@ -97,4 +108,64 @@ class ResultsHolder:
                 res[key] = self.data[key] if self.has_key(key) else blanks
             else:
                 res[key] = self.__call__(key)
-        return res
\ No newline at end of file
+        return res
+    
+    def to_record(self)->Tuple[None|np.ndarray,dict]:
+        """Split data into a typed record of the schema fields
+        and a dictionary of all other fields, see split()
+
+        Returns
+        -------
+        Tuple[None or np.ndarray, dict]
+            record and other fields
+        """
+        return self.split(self.data,self.schema)
+    
+    @staticmethod
+    def split(data:dict,schema:None|np.dtype)->Tuple[None|np.ndarray,dict]:
+        """Split data into a typed record of the schema fields
+        and a dictionary of all other fields, e.g. non-scalar
+
+        Parameters
+        ----------
+        data : dict
+            dictionary of results
+        schema : None or np.dtype
+            structured dtype of scalar fields
+
+        Returns
+        -------
+        Tuple[None or np.ndarray, dict]
+            record array of shape (1,) and dtype schema, and other fields.
+            If there is no schema, or any schema field is missing or 
+            non-scalar, the record is None and all fields are returned
+        """
+        if schema is None or \
+            any(not k in data or np.ndim(data[k])>0 for k in schema.names):
+            return None, data.copy()
+        record = np.empty(1,dtype=schema)
+        for k in schema.names:
+            record[k] = data[k]
+        others = {k:v for k,v in data.items() if not k in schema.names}
+        return record, others
+    
+    @staticmethod
+    def from_record(record:np.ndarray,others:None|dict=None)->dict:
+        """Inverse of split()
+
+        Parameters
+        ----------
+        record : np.ndarray
+            record array of shape (1,)
+        others : None or dict, optional
+            other fields, by default None
+
+        Returns
+        -------
+        dict
+            dictionary of results, with python scalars for record fields
+        """
+        data = {k:record[k][0].item() for k in record.dtype.names}
+        if not others is None:
+            data.update(others)
+        return data
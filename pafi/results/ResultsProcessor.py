@@ -1,32 +1,59 @@
 import pandas as pd
-import plotext as plt
-import os,glob,itertools
+import os,glob
 import numpy as np
-from typing import Any,List
+from typing import List,Tuple
+from concurrent.futures import ThreadPoolExecutor
 from .ResultsHolder import ResultsHolder
 from ..parsers.PAFIParser import PAFIParser
 from scipy.integrate import cumulative_trapezoid
 from scipy.interpolate import interp1d
 
 class ResultsProcessor:
+    # axis values are compared after rounding to this many decimals
+    AXIS_DECIMALS = 4
+    # field tagging each row with its file, see load()
+    SOURCE_KEY = "Source"
+    # types of standard fields when reading CSV files
+    FIELD_TYPES = {**{k:np.float64 for k in [
+        "ReactionCoordinate","Temperature","MinEnergy","preTemperature",
+        "FreeEnergyGradient","FreeEnergyGradientVariance","avePsi",
+        "dXTangent","postTemperature","MaxJump","MaxDev"]},
+        **{k:np.int64 for k in ["SampleSteps","ThermSteps","ThermWindow",
+                                "Repeat"]},"Valid":np.bool_}
     def __init__(self,
                  data_path:os.PathLike[str]|List[os.PathLike[str]],
                  xml_path:None|os.PathLike[str]=None,
-                 axes:List[str]=None) -> None:
+                 axes:List[str]=None,
+                 max_workers:None|int=None,
+                 streaming:bool=False,
+                 chunksize:int=100000) -> None:
         """Read in PAFI data and plot results
 
         Parameters
         ----------
         data_path : os.PathLike[str] | List[os.PathLike[str]]
-            path, wildcard, or list of paths to PAFI csv files
+            path, wildcard, or list of paths or wildcards 
+            to PAFI csv or npz files
         xml_path : None | os.PathLike[str]
             path to PAFI XML configuration file, default None
         axes : List[str], optional
             List of axes, overwritten by data in xml_path if present,
             default : None, will be set to ["ReactionCoordinate","Temperature"]
+        max_workers : None | int, optional
+            number of threads to read files, default None, one per file 
+            up to 32. See load()
+        streaming : bool, optional
+            if True, files are read in chunks and only the statistics of 
+            each point of the axes are stored, not the data. 
+            Memory is then bounded by the number of axes points. 
+            Default False. See stream()
+        chunksize : int, optional
+            number of rows per chunk if `streaming`, default 100000
 
         Methods
         ----------
+        load()
+        stream()
         append()
         extract_axes()
         integrate()
@@ -35,65 +62,314 @@ class ResultsProcessor:
         self.data = None
         self.axes = None
         self.fields = None
-        if not isinstance(data_path,list):
-            data_path = [data_path]
-        for dp in data_path:
-            if self.data is None:
-                if os.path.exists(dp):
-                    self.data = pd.read_csv(dp)
-            else:
-                self.append(dp)
+        self.file_axes = None
+        self.max_workers = max_workers
+        self.streaming = streaming
+        self.chunksize = chunksize
+        self.stream_axes = None
         
         if (not xml_path is None) and os.path.exists(xml_path):
             self.params = PAFIParser(xml_path,postprocessing=True)
         else:
             self.params = None
         
+        if self.streaming:
+            # (count, mean, M2) of valid samples, see stream()
+            self.statistics_data = None
+            paths = self.expand_paths(data_path)
+            # axes must be known before reading, as when loading all files
+            for dp in paths:
+                if os.path.splitext(dp)[1] == ".npz":
+                    with np.load(dp) as npz_data:
+                        if "__axes__" in npz_data.files:
+                            self.file_axes = \
+                                [str(a) for a in npz_data["__axes__"]]
+                            break
+            self.stream_axes = {a:set() for a in self.axis_names(axes)}
+            self.append(paths)
+        else:
+            self.append(data_path)
+        
         self.extract_axes(axes=axes)
     
-    def extract_axes(self,axes=None):
-        self.fields = list(self.data.keys())[1:]
-        self.axes = {}
+    def expand_paths(self,data_path:os.PathLike[str]|List[os.PathLike[str]])\
+        ->List[os.PathLike[str]]:
+        """Expand wildcards, keeping only existing files, without duplicates
 
-        if not self.params is None:
-            axes = self.params.axes.keys()
-        else:
-            if axes is None:
-                axes = ["ReactionCoordinate","Temperature"]
-            print(f"""
-                No config_*.xml file specified (via 'xml_path' argument)
-                Using axes (sampling marginals): {axes}
-                """)
-        for a in axes:
-            self.axes[a] = list(np.round(np.sort(np.unique(self.data[a])),4))
+        Parameters
+        ----------
+        data_path : os.PathLike[str] | List[os.PathLike[str]]
+            path, wildcard, or list of paths or wildcards
+
+        Returns
+        -------
+        List[os.PathLike[str]]
+            existing paths, wildcard matches in sorted order
+        """
+        if not isinstance(data_path,list):
+            data_path = [data_path]
+        paths = []
+        for dp in data_path:
+            matches = sorted(glob.glob(dp)) if glob.has_magic(str(dp)) else [dp]
+            paths += [m for m in matches if os.path.exists(m) \
+                      and not m in paths]
+        return paths
+    
+    def source(self,data_path:os.PathLike[str])->str:
+        """Source tag of a data file, the suffix of e.g. pafi_data_[suffix].csv,
+        else the file name without extension
+
+        Parameters
+        ----------
+        data_path : os.PathLike[str]
+            path to file
+
+        Returns
+        -------
+        str
+            the tag
+        """
+        return os.path.splitext(os.path.basename(data_path))[0].split("_")[-1]
+    
+    def load(self,paths:List[os.PathLike[str]])->None|pd.DataFrame:
+        """Read files concurrently in a thread pool, with read(), 
+        and concatenate once. Every file must have the fields of the 
+        first, otherwise it is skipped; fields not in the first are dropped.
+        Each row is tagged with source() of its file, as field `SOURCE_KEY`
 
-    def append(self,data_path)->None:
-        if os.path.exists(data_path):
-            new_data = pd.read_csv(data_path)
+        Parameters
+        ----------
+        paths : List[os.PathLike[str]]
+            paths to PAFI csv or npz files
+
+        Returns
+        -------
+        None | pd.DataFrame
+            the data, or None if no file could be read
+        """
+        if len(paths)==0:
+            return None
+        max_workers = min(32,len(paths)) if self.max_workers is None \
+            else max(1,self.max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(self.read,paths))
         
-        """Append DataFrame to existing stored data. 
-        Will throw error if `new_data` does not have fields of `self.data`stored fields to not cover append field
+        fields = [f for f in frames[0].keys() if f!=self.SOURCE_KEY] \
+            if self.data is None else self.fields
+        valid = []
+        for dp,df in zip(paths,frames):
+            if not set(df.keys())>=set(fields):
+                print(f"Could not append {dp}, missing fields",
+                      set(fields)-set(df.keys()))
+                continue
+            valid += [df[fields].assign(**{self.SOURCE_KEY:self.source(dp)})]
+        if len(valid)==0:
+            return None
+        return pd.concat(valid,ignore_index=True)
+    
+    def stream(self,paths:List[os.PathLike[str]])->None:
+        """Read files in chunks of `chunksize` rows, merging the 
+        statistics of valid samples of each chunk, see statistics(), 
+        with those of previous chunks, by Chan's parallel update of the 
+        mean and sum of squared deviations M2. Only these statistics and 
+        the values of each axis are kept. Files must have the fields of the
+        first, otherwise they are skipped. npz files are read as one chunk
+
+        Parameters
+        ----------
+        paths : List[os.PathLike[str]]
+            paths to PAFI csv or npz files
+        """
+        # no fallback for missing values in integer fields
+        dtype = {k:v for k,v in self.FIELD_TYPES.items() if v is np.float64}
+        for dp in paths:
+            if os.path.splitext(dp)[1] == ".npz":
+                chunks = [self.read(dp)]
+            else:
+                chunks = pd.read_csv(dp,index_col=0,dtype=dtype,
+                                     chunksize=self.chunksize)
+            for chunk in chunks:
+                if self.fields is None:
+                    self.fields = [f for f in chunk.keys() \
+                                   if f!=self.SOURCE_KEY]
+                if not set(chunk.keys())>=set(self.fields):
+                    print(f"Could not append {dp}, missing fields",
+                          set(self.fields)-set(chunk.keys()))
+                    break
+                for a in self.stream_axes:
+                    self.stream_axes[a].update(
+                        np.round(chunk[a].to_numpy(float),self.AXIS_DECIMALS))
+                self.merge_statistics(self.statistics(chunk[self.fields]))
+    
+    def statistics(self,data:pd.DataFrame)->Tuple[pd.DataFrame,pd.DataFrame,
+                                                  pd.DataFrame]:
+        """Statistics of valid samples at each point of the axes,
+        grouped by axis values rounded to `AXIS_DECIMALS`. Missing values
+        are skipped, so each field has its own count. `Valid` is parsed
+        as a number or "True"/"False", otherwise the sample is not valid
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            the data, one row per sample. Non-numeric fields are NaN
+
+        Returns
+        -------
+        Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]
+            count, mean and sum of squared deviations M2 of each field,
+            indexed by the rounded axis values
+        """
+        axes = list(self.axes.keys()) if self.stream_axes is None \
+            else list(self.stream_axes.keys())
+        valid = data['Valid'].replace({"True":1,"False":0})
+        valid = pd.to_numeric(valid,errors='coerce').fillna(0)
+        valid = valid.to_numpy().astype(bool)
+        values = data[self.fields][valid].apply(pd.to_numeric,
+                                                errors='coerce')
+        keys = [np.round(data[a].to_numpy(float)[valid],
+                         self.AXIS_DECIMALS) for a in axes]
+        groups = values.groupby(keys)
+        count = groups.count()
+        return count, groups.mean(), groups.var(ddof=0)*count
+    
+    def merge_statistics(self,new:Tuple[pd.DataFrame,pd.DataFrame,
+                                        pd.DataFrame])->None:
+        """Merge statistics into those of `streaming` mode, with
+        Chan's parallel update for the mean and M2, per field
+        as counts differ between fields with missing values
+
+        Parameters
+        ----------
+        new : Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]
+            count, mean and M2, see statistics()
+        """
+        if self.statistics_data is None:
+            self.statistics_data = new
+            return
+        index = self.statistics_data[0].index.union(new[0].index)
+        # fields without values have NaN mean and M2
+        (n_a, m_a, M2_a), (n_b, m_b, M2_b) = \
+            [[d.reindex(index).to_numpy(float) for d in s] \
+             for s in [self.statistics_data,new]]
+        n_a, n_b = np.nan_to_num(n_a), np.nan_to_num(n_b)
+        n = n_a + n_b
+        w_b = n_b / np.maximum(n,1.0)
+        m_a, m_b = np.where(n_a>0,m_a,0.0), np.where(n_b>0,m_b,0.0)
+        M2_a, M2_b = np.where(n_a>0,M2_a,0.0), np.where(n_b>0,M2_b,0.0)
+        delta = m_b - m_a
+        mean = np.where(n>0,m_a + delta * w_b,np.nan)
+        M2 = np.where(n>0,M2_a + M2_b + delta * delta * n_a * w_b,np.nan)
+        self.statistics_data = \
+            (pd.DataFrame(n.astype(np.int64),index=index,columns=self.fields),
+             pd.DataFrame(mean,index=index,columns=self.fields),
+             pd.DataFrame(M2,index=index,columns=self.fields))
+    
+    def read(self,data_path:os.PathLike[str])->pd.DataFrame:
+        """Read a PAFI data file, either CSV or columnar .npz 
+        (see BaseGatherer.write_columnar()), which is read natively.
+        Object arrays in .npz checkpoints, e.g. `Dev`, are not read
 
         Parameters
         ----------
-        pd : pd.DataFrame
-            DataFrame to append
+        data_path : os.PathLike[str]
+            path to file
+
+        Returns
+        -------
+        pd.DataFrame
+            the data, one row per sample
         """
-        if set(new_data.keys())>=set(self.data.keys()):
-            old_data = self.data.copy()
-            self.data = {}
-            for f in old_data.keys():
-                self.data[f] = \
-                    pd.concat([old_data[f],new_data[f]],ignore_index=True)
-            self.data = pd.DataFrame(self.data)
+        if os.path.splitext(data_path)[1] == ".npz":
+            columns = {}
+            with np.load(data_path) as npz_data:
+                for k in npz_data.files:
+                    try:
+                        columns[k] = npz_data[k]
+                    except ValueError:
+                        # pickled, see BaseGatherer.write_checkpoint()
+                        continue
+            if "__axes__" in columns:
+                self.file_axes = [str(a) for a in columns.pop("__axes__")]
+            return pd.DataFrame(columns,copy=False)
         else:
+            # explicit types of standard fields, others are inferred
+            try:
+                return pd.read_csv(data_path,index_col=0,
+                                   dtype=self.FIELD_TYPES)
+            except ValueError:
+                # e.g. missing values in integer fields
+                return pd.read_csv(data_path,index_col=0)
+    
+    def axis_names(self,axes:None|List[str]=None)->List[str]:
+        """Names of the axes, from the XML file, the npz files or `axes`
+
+        Parameters
+        ----------
+        axes : None | List[str], optional
+            List of axes, by default None, 
+            for ["ReactionCoordinate","Temperature"]
+
+        Returns
+        -------
+        List[str]
+            the axes
+        """
+        if not self.params is None:
+            return list(self.params.axes.keys())
+        elif axes is None and not self.file_axes is None:
+            return self.file_axes
+        if axes is None:
+            axes = ["ReactionCoordinate","Temperature"]
+        print(f"""
+            No config_*.xml file specified (via 'xml_path' argument)
+            Using axes (sampling marginals): {axes}
+            """)
+        return list(axes)
+    
+    def extract_axes(self,axes=None):
+        if self.streaming:
+            # axes are fixed before reading, see stream()
+            self.axes = {a:list(np.sort(list(v))) \
+                         for a,v in self.stream_axes.items()}
+            return
+        self.fields = [f for f in self.data.keys() if f!=self.SOURCE_KEY]
+        self.axes = {}
+        for a in self.axis_names(axes):
+            self.axes[a] = list(np.round(np.sort(np.unique(self.data[a])),
+                                         self.AXIS_DECIMALS))
+
+    def append(self,
+               data_path:os.PathLike[str]|List[os.PathLike[str]])->None:
+        """Append data files to existing stored data, see load(), 
+        or to the statistics if `streaming`, see stream().
+        Files which do not have the fields of `self.data` are skipped
+
+        Parameters
+        ----------
+        data_path : os.PathLike[str] | List[os.PathLike[str]]
+            path, wildcard, or list of paths or wildcards
+        """
+        if self.streaming:
+            self.stream(self.expand_paths(data_path))
+            if not self.axes is None:
+                self.extract_axes()
+            return
+        new_data = self.load(self.expand_paths(data_path))
+        if new_data is None:
             print("Could not append!")
+            return
+        if self.data is None:
+            self.data = new_data
+            self.fields = [f for f in new_data.keys() if f!=self.SOURCE_KEY]
+        else:
+            self.data = pd.concat([self.data,new_data],ignore_index=True)
         
         # recheck ranges
         if not self.axes is None:
             for a in self.axes:
                 self.axes[a] = \
-                    list(np.round(np.sort(np.unique(self.data[a])),4))
+                    list(np.round(np.sort(np.unique(self.data[a])),
+                                   self.AXIS_DECIMALS))
 
     def ensemble_collate(self,return_pd:bool=False)->None|pd.DataFrame:
         """Perform ensemble averaging 
@@ -101,6 +377,12 @@ class ResultsProcessor:
        
         Each non-axis field F is averaged and returned as 
         F_ave and F_std, using only valid values. 
+        Samples are grouped in a single pass, by axis values rounded to 
+        `AXIS_DECIMALS`, as in extract_axes(). Every point of the axes 
+        grid has a row, with zero averages if no sample is valid, 
+        ordered as itertools.product() of the axes, see integrate(). 
+        Non-numeric fields are averaged as NaN. 
+        If `streaming`, the stored statistics are used, see stream()
         Parameters
         ----------
             return_pd : bool, optional
@@ -110,33 +392,32 @@ class ResultsProcessor:
         pd.DataFrame
             average dataframe, if `return_pd` is True
         """
-        valid_key = 'Valid'
         self.count_key = 'ValidCount'
-        axes = set(self.axes.keys())
-        ave_data = {f:[] for f in self.fields}
-        var_data = {f+"_var":[] for f in self.fields}
-        count_data = {self.count_key:[]}
+        axes = list(self.axes.keys())
         
-        # iterate over all axes
-        for pt in itertools.product(*[self.axes[a] for a in axes]):
-            sel = np.ones_like(self.data[valid_key].to_numpy(),bool)
-            for a in zip(axes,pt):
-                sel *= np.isclose(self.data[a[0]].to_numpy(),a[1])
-            sel_data = self.data[sel]
-            
-            valid_r = sel_data[valid_key]
-            valid_c = valid_r.sum()
-            count_data[self.count_key] += [valid_c]
-
-            for f in self.fields:
-                if valid_c < 1:
-                    ave_data[f] += [0.0]
-                    var_data[f+"_var"] += [0.0]
-                else:
-                    valid_d = sel_data[f][valid_r].to_numpy()
-                    ave_data[f] += [valid_d.mean()]
-                    var_data[f+"_var"] += [valid_d.var()/valid_c]
-
+        if self.streaming:
+            count, ave, M2 = self.statistics_data
+        else:
+            count, ave, M2 = self.statistics(self.data)
+        
+        # all points of the axes grid
+        if len(axes)>1:
+            grid = pd.MultiIndex.from_product([self.axes[a] for a in axes])
+        else:
+            grid = pd.Index(self.axes[axes[0]])
+        count = count.reindex(grid,fill_value=0)
+        ave = ave.reindex(grid,fill_value=0.0)
+        # variance of the mean, with the count of each field
+        var = M2.reindex(grid,fill_value=0.0).to_numpy() \
+            / np.maximum(count.to_numpy(),1)**2
+        
+        ave_data = {f:ave[f].to_numpy() for f in self.fields}
+        # axes are also set at points without valid samples
+        for i,a in enumerate(axes):
+            ave_data[a] = grid.get_level_values(i).to_numpy(float)
+        var_data = {f+"_var":var[:,i] for i,f in enumerate(self.fields)}
+        # axes have no missing values, so count all valid samples
+        count_data = {self.count_key:count[axes[0]].to_numpy()}
         
         self.ave_data = pd.DataFrame({**ave_data,**count_data,**var_data})
         if return_pd:
@@ -151,7 +432,8 @@ class ResultsProcessor:
         
         """Cumulative integration of data along an axis. 
         Integration routine makes a spline interpolation
-        to increase the number of intergrand evaluations 
+        to increase the number of intergrand evaluations.
+        All values of the other axes are integrated in one batch 
         
         Parameters
         ----------
@@ -187,7 +469,6 @@ class ResultsProcessor:
         i_key_std = target+"_integrated_err"
         
         i_keys = [i_key,i_key_std,i_key+"_u",i_key+"_l"]
-        i_data = np.zeros((data[x_key].size,4))
 
         remesh = max(1,remesh)
 
@@ -195,50 +476,38 @@ class ResultsProcessor:
         assert x_key in self.axes
         assert y_key in self.ave_data.keys()
         
-        # we will integrate over constant aux values
-        auxs = list(set(self.axes) - set([x_key]))
+        # ave_data rows are the product of all axes, see ensemble_collate(),
+        # reshaped to (aux..., x, [y,v]) to integrate at all aux values at once
+        axes = list(self.axes.keys())
+        auxs = [a for a in axes if a!=x_key]
+        shape = [len(self.axes[a]) for a in axes]
+        ix = axes.index(x_key)
+        y_val = np.stack([data[k].to_numpy(float).reshape(shape) \
+                          for k in [y_key,v_key]],axis=-1)
+        y_val = np.moveaxis(y_val,ix,-2)
+        x_val = np.asarray(self.axes[x_key],float)
+        
+        y_spl = interp1d(x_val,y_val,axis=-2,kind='cubic')
+        dense_x = np.linspace(x_val.min(),x_val.max(),remesh*x_val.size)
+        dense_y = y_spl(dense_x)
+        dense_i = cumulative_trapezoid(dense_y,dense_x,axis=-2,initial=0)
+        
+        i_dat = interp1d(dense_x,dense_i,axis=-2,kind='cubic')(x_val)
+        i_data = np.concatenate([i_dat,i_dat[...,:1]+i_dat[...,1:],
+                                 i_dat[...,:1]-i_dat[...,1:]],axis=-1)
+        i_data = np.moveaxis(i_data,-2,ix).reshape((-1,4))
         
         if return_remeshed_array:
             out_array = []
-        
-        for pt in itertools.product(*[self.axes[a] for a in auxs]):
-            # dataframe of selected data
-            sel = np.ones_like(data[x_key].to_numpy(),bool)
-
-            for a in zip(auxs,pt):
-                sel *= np.isclose(data[a[0]].to_numpy(),a[1])
-            sel_data = data[sel]
-            
-
-            x_val = np.sort(np.unique(sel_data[x_key]))
-            y_val = np.zeros((x_val.size,2))
-            for i,x in enumerate(x_val):
-                x_sel_data = sel_data[np.isclose(sel_data[x_key],x)]
-                y_val[i][0] = x_sel_data[y_key]
-                y_val[i][1] = x_sel_data[v_key]
-
-            y_spl = interp1d(x_val,y_val,axis=0,kind='cubic')
-            dense_x = np.linspace(x_val.min(),x_val.max(),remesh*x_val.size)
-            dense_y = y_spl(dense_x)
-            dense_i = cumulative_trapezoid(dense_y,dense_x,axis=0,initial=0)
-
-            i_spl = interp1d(dense_x,dense_i,axis=0,kind='cubic')
-            
-            if return_remeshed_array:
-                out_row = {a[0]:a[1] for a in zip(auxs,pt)}
+            for pt in np.ndindex(*y_val.shape[:-2]):
+                out_row = {a:self.axes[a][i] for a,i in zip(auxs,pt)}
                 out_row[x_key] = dense_x
-                out_row[y_key] = dense_y[:,0]
-                out_row[v_key] = dense_y[:,1]
-                out_row[y_key_std] = np.sqrt(np.abs(dense_y[:,1]))
-                out_row[i_key] = dense_i[:,0]
-                out_row[i_key_std] = np.sqrt(np.abs(dense_i[:,1]))
+                out_row[y_key] = dense_y[pt][:,0]
+                out_row[v_key] = dense_y[pt][:,1]
+                out_row[y_key_std] = np.sqrt(np.abs(dense_y[pt][:,1]))
+                out_row[i_key] = dense_i[pt][:,0]
+                out_row[i_key_std] = np.sqrt(np.abs(dense_i[pt][:,1]))
                 out_array += [out_row]
-
-            for i,x in enumerate(x_val):
-                i_dat = i_spl(x)
-                i_row = [i_dat[0],i_dat[1],i_dat[0]+i_dat[1],i_dat[0]-i_dat[1]]
-                i_data[sel*np.isclose(data[x_key],x)] = i_row
-            
             
         for i,k in enumerate(i_keys):
             data[k] = i_data[:,i]
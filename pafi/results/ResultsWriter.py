@@ -0,0 +1,113 @@
+import os
+import time
+import queue
+import threading
+import pandas as pd
+from typing import List
+
+class ResultsWriter:
+    def __init__(self,path:os.PathLike[str],
+                 columns:List[str],
+                 maxsize:int=64)->None:
+        """Append-only CSV writer running on a background thread
+
+        The header is written on creation, then each call to append()
+        adds only new rows, in the pandas to_csv() format read by
+        ResultsProcessor. Rows are written as complete lines,
+        such that the file can be read at any time.
+
+        Parameters
+        ----------
+        path : os.PathLike[str]
+            path to CSV file, overwritten if present
+        columns : List[str]
+            column names, fixing the column order
+        maxsize : int, optional
+            maximum number of queued writes, by default 64.
+            append() blocks if the queue is full
+
+        Methods
+        ----------
+        append()
+        sync()
+        close()
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        # number of writes and total time, see BaseGatherer.write_stats()
+        self.n_writes = 0
+        self.write_time = 0.0
+        self.file = open(path,'w')
+        self.file.write(pd.DataFrame(columns=self.columns).to_csv())
+        self.file.flush()
+        self.thread = threading.Thread(target=self.write_loop,daemon=True)
+        self.thread.start()
+
+    def write_loop(self)->None:
+        """Background thread: write queued rows until close()
+        """
+        while True:
+            item = self.queue.get()
+            t_start = time.perf_counter()
+            try:
+                if item is None:
+                    break
+                elif item == "sync":
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+                else:
+                    rows, start = item
+                    n_rows = len(rows[self.columns[0]])
+                    df = pd.DataFrame(rows,columns=self.columns,
+                                      index=range(start,start+n_rows))
+                    # one write() per block of complete lines
+                    self.file.write(df.to_csv(header=False))
+                    self.file.flush()
+            except Exception as e:
+                self.error = e
+            finally:
+                if not item is None:
+                    self.n_writes += 1
+                    self.write_time += time.perf_counter() - t_start
+                self.queue.task_done()
+
+    def check(self)->None:
+        """Raise any error from the background thread
+
+        Raises
+        ------
+        IOError
+            if writing failed
+        """
+        if not self.error is None:
+            raise IOError(f"Error writing {self.path}: {self.error}")
+
+    def append(self,rows:dict,start:int)->None:
+        """Queue new rows for writing
+
+        Parameters
+        ----------
+        rows : dict
+            dictionary of lists, with keys `columns`
+        start : int
+            index of the first row
+        """
+        self.check()
+        self.queue.put((rows,start))
+
+    def sync(self)->None:
+        """Queue flush and fsync of all rows written so far
+        """
+        self.check()
+        self.queue.put("sync")
+
+    def close(self)->None:
+        """Write all queued rows, fsync and close the file
+        """
+        self.sync()
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        self.check()
@@ -1,9 +1,13 @@
 import numpy as np
 import os
-from typing import List
+from typing import List, Tuple
 from mpi4py import MPI
 from ..parsers.PAFIParser import PAFIParser
+from ..parsers.LAMMPSDataReader import read_data_positions
 from scipy.interpolate import CubicSpline
+from .PathCache import PathCache
+from ..results.Profiler import Profiler
+from ..results.DevStore import DevStore
 
 class BaseWorker:
     """Basic PAFI Worker
@@ -20,14 +24,24 @@ class BaseWorker:
             global rank (for MPI safety)
         roots : List[int]
             list of master ranks  (for MPI safety)
+        world : None or MPI.Intracomm, optional
+            communicator of all workers, used to share the pathway 
+            between all ranks on a node, see make_path(). 
+            If None, only ranks of this worker share. Default None
         """
+    # stages of sample() recorded as Time[stage], see Profiler
+    PROFILE_STAGES = []
     def __init__(self, comm : MPI.Intracomm,
                  parameters:PAFIParser,
                  worker_instance:int,
                  rank:int,
-                 roots:List[int]) -> None:
+                 roots:List[int],
+                 world:None|MPI.Intracomm=None) -> None:
         self.worker_instance = worker_instance
         self.comm = comm
+        self.world = comm if world is None else world
+        self.spline_window = None
+        self.node_comm = None
         self.local_rank = comm.Get_rank()
         self.roots = roots
         self.rank = rank
@@ -45,7 +59,27 @@ class BaseWorker:
         self.Cell = None
         self.Periodicity = None
         self.invCell = None
+        self.path_table = {}
         self.parameters.seed(worker_instance)
+        # Sample is timed by the manager, see PAFIManager
+        self.profiler = Profiler(bool(self.parameters("Profile")),
+                                 ["Sample"]+self.PROFILE_STAGES)
+        # if WriteDev==1, see dev_store()
+        self.DevStore = None
+    
+    def dev_store(self)->DevStore:
+        """The DevStore of this worker, created on first use
+        in DumpFolder/dev_[suffix]
+
+        Returns
+        -------
+        DevStore
+        """
+        if self.DevStore is None:
+            folder = os.path.join(self.parameters("DumpFolder"),
+                                  f"dev_{self.parameters.suffix}")
+            self.DevStore = DevStore(folder,self.worker_instance)
+        return self.DevStore
     
     def load_config(self,file_path:os.PathLike[str]) -> np.ndarray:
         """Placeholder function to load in file and return configuration
@@ -109,33 +143,276 @@ class BaseWorker:
 
             All parameters are read in from XML file
 
-            Lots to do here in principle, TODO: parallel i/o and splining
-            Only really a problem with memory limitations, say 2GB / core.
-            This implies 300M double coordinates == 1M atoms, 100 planes.
-            Typical large-scale use - 150k atoms, 20 planes.
-            So memory-heavy but nothing problematic so far, leaving for future
+            If `NativePathReader==1`, configurations are read once and
+            broadcast, see read_pathway(), else every worker calls
+            load_config(). If `SharedPath==1` the spline is stored once 
+            per node, see shared_spline(). If `PathCache` is a directory,
+            the spline is memory-mapped from there if the configurations, 
+            `RealMEPDist`, `CubicSplineBoundaryConditions` and supercell 
+            are unchanged, else written there. Collective over `world`
         """
 
-        # load configurations
+        # node communicator, for shared memory
+        if self.node_comm is None:
+            self.node_comm = self.world.Split_type(MPI.COMM_TYPE_SHARED)
+        
         pc = self.parameters.PathwayConfigurations
-        all_X = [self.pbc(self.load_config(pc[0]),central=False)]
-        for p in pc[1:]:
-            all_X += [self.pbc(self.load_config(p)-all_X[0])+all_X[0]]
+        bc = self.parameters("CubicSplineBoundaryConditions")
+        assert bc in ['clamped','not-a-knot','natural']
+        
+        # optional on-disk cache, see PathCache
+        cache, key, cached = None, None, False
+        if len(str(self.parameters("PathCache")).strip())>0:
+            cache = PathCache(str(self.parameters("PathCache")).strip())
+            if self.world.Get_rank()==0:
+                key = cache.key(pc,self.parameters("RealMEPDist"),bc,
+                                self.Cell,self.Periodicity)
+                cached = cache.has(key)
+            key, cached = self.world.bcast((key,cached),root=0)
+        if cached:
+            # memory-mapped pages are shared by all ranks on a node
+            self.r_dist, c = cache.load(key)
+            self.Spline_X = CubicSpline.construct_fast(c,self.r_dist,axis=0)
+        else:
+            # load configurations, by a single reader if possible
+            loaded = False
+            if self.parameters("NativePathReader"):
+                loaded, all_X, self.r_dist = self.read_pathway(pc)
+            if not loaded:
+                all_X, self.r_dist = \
+                    self.unwrap_pathway([self.load_config(p) for p in pc])
+            
+            # splining - thank you scipy for 'axis' !!
+            if self.parameters("SharedPath"):
+                self.Spline_X = self.shared_spline(self.r_dist,all_X,bc)
+            else:
+                self.Spline_X = CubicSpline(self.r_dist,all_X,
+                                            axis=0,bc_type=bc)
+            if not cache is None and self.world.Get_rank()==0:
+                cache.write(key,self.r_dist,all_X,self.Spline_X.c)
+            del all_X # save a bit of memory
+        
+        # optional precomputed pathway on each plane, see path_frame()
+        self.path_table = {}
+        if self.parameters("PathTable"):
+            for r in np.unique(self.parameters.axes["ReactionCoordinate"]):
+                self.path_table[self.path_key(r)] = self.path_frame(r)
+    
+    def unwrap_pathway(self,configurations:List[np.ndarray])\
+        ->Tuple[np.ndarray,np.ndarray]:
+        """Unwrap configurations relative to the first, with pbc(),
+        and determine the knot positions
+
+        Parameters
+        ----------
+        configurations : List[np.ndarray]
+            list of configurations, each of shape (natoms,3)
+
+        Returns
+        -------
+        Tuple[np.ndarray,np.ndarray]
+            knot configurations, shape (nknots,3*natoms), 
+            and knot positions, shape (nknots,), in [0,1]
+        """
+        all_X = [self.pbc(configurations[0],central=False)]
+        for X in configurations[1:]:
+            all_X += [self.pbc(X-all_X[0])+all_X[0]]
             
         # determine distance TODO: symmetric??
         if self.parameters("RealMEPDist"):
-            self.r_dist = np.array([self.pbc_dist(X-all_X[0]) for X in all_X])
-            self.r_dist /= self.r_dist[-1]
+            r_dist = np.array([self.pbc_dist(X-all_X[0]) for X in all_X])
+            r_dist /= r_dist[-1]
         else:
-            self.r_dist = np.linspace(0.,1.,all_X.shape[0])
-
-        # splining - thank you scipy for 'axis' !!
+            r_dist = np.linspace(0.,1.,len(all_X))
         all_X = np.array([X.flatten() for X in all_X]) # shape=(nknots,natoms)
-        bc = self.parameters("CubicSplineBoundaryConditions")
-        assert bc in ['clamped','not-a-knot','natural']
+        return all_X, r_dist
+    
+    def read_pathway(self,paths:List[os.PathLike[str]])\
+        ->Tuple[bool,None|np.ndarray,None|np.ndarray]:
+        """Read all configurations on the first rank of `world`
+        with read_data_positions(), rather than with load_config() 
+        on every worker. The unwrapped configurations are broadcast 
+        to the first rank on each node if `SharedPath==1`, else to all.
+        Collective over all ranks of `world`
+
+        Parameters
+        ----------
+        paths : List[os.PathLike[str]]
+            paths to LAMMPS data files
+
+        Returns
+        -------
+        Tuple[bool,None|np.ndarray,None|np.ndarray]
+            success, knot configurations, shape (nknots,3*natoms), 
+            or None if not received, and knot positions, shape (nknots,)
+        """
+        reader = self.world.Get_rank()==0
+        all_X, r_dist, error = None, None, None
+        if reader:
+            try:
+                all_X, r_dist = \
+                    self.unwrap_pathway([read_data_positions(p) for p in paths])
+            except Exception as e:
+                error = str(e)
+        error = self.world.bcast(error,root=0)
+        if not error is None:
+            if reader:
+                print(f"Native reader failed: {error}, using load_config()")
+            return False, None, None
+        shape, r_dist = self.world.bcast((None if all_X is None \
+                                          else all_X.shape,r_dist),root=0)
+        
+        # the reader is the first rank on its node
+        receive = self.node_comm.Get_rank()==0 or \
+            not self.parameters("SharedPath")
+        comm = self.world.Split(0 if receive else MPI.UNDEFINED,
+                                self.world.Get_rank())
+        if receive:
+            if not reader:
+                all_X = np.empty(shape,dtype=np.float64)
+            comm.Bcast(all_X,root=0)
+            comm.Free()
+        return True, all_X, r_dist
+    
+    def shared_spline(self,r_dist:np.ndarray,all_X:np.ndarray,
+                      bc:str)->CubicSpline:
+        """Build the pathway spline once per node. The coefficients are 
+        written to an MPI shared memory window by the first rank on
+        each node, and all other ranks on the node use a read-only view.
+        If the window cannot be allocated, the coefficients are 
+        broadcast and each rank has a private copy.
+        Collective over all ranks of `world`
 
-        self.Spline_X = CubicSpline(self.r_dist,all_X,axis=0,bc_type=bc)
-        del all_X # save a bit of memory
+        Parameters
+        ----------
+        r_dist : np.ndarray, shape (nknots,)
+            knot positions
+        all_X : np.ndarray, shape (nknots,3*natoms)
+            knot configurations
+        bc : str
+            boundary conditions of CubicSpline
+
+        Returns
+        -------
+        CubicSpline
+            spline with coefficients in shared memory
+        """
+        node_comm = self.node_comm
+        node_root = node_comm.Get_rank()==0
+        spline = None
+        if node_root:
+            spline = CubicSpline(r_dist,all_X,axis=0,bc_type=bc)
+        shape = node_comm.bcast(None if spline is None else spline.c.shape)
+        
+        itemsize = MPI.DOUBLE.Get_size()
+        nbytes = int(np.prod(shape))*itemsize if node_root else 0
+        if not self.spline_window is None:
+            self.spline_window.Free()
+            self.spline_window = None
+        window = None
+        try:
+            window = MPI.Win.Allocate_shared(nbytes,itemsize,comm=node_comm)
+            success = True
+        except MPI.Exception:
+            success = False
+        if not node_comm.allreduce(success,op=MPI.LAND):
+            if not window is None:
+                window.Free()
+            if self.world.Get_rank()==0:
+                print("Cannot allocate shared memory, using private copies")
+            c = np.ascontiguousarray(spline.c) if node_root \
+                else np.empty(shape,dtype=np.float64)
+            node_comm.Bcast(c,root=0)
+            return CubicSpline.construct_fast(c,r_dist,axis=0)
+        self.spline_window = window
+        buffer, _ = self.spline_window.Shared_query(0)
+        c = np.ndarray(buffer=buffer,dtype=np.float64,shape=shape)
+        if node_root:
+            c[:] = spline.c
+            del spline
+        node_comm.Barrier()
+        c.flags.writeable = False
+        return CubicSpline.construct_fast(c,r_dist,axis=0)
+    
+    def path_key(self,r:float)->float:
+        """Key of path_table
+
+        Parameters
+        ----------
+        r : float
+            reaction coordinate
+
+        Returns
+        -------
+        float
+            r rounded to 8 decimal places
+        """
+        return float(np.round(r,8))
+    
+    def path_frame(self,r:float,scale:float|np.ndarray[3]=1.0,
+                   nus:Tuple[int]=(0,1,2),
+                   atoms:None|np.ndarray=None)->List[np.ndarray]:
+        """Evaluate the PAFI pathway and its derivatives in one pass.
+        The cubic of the knot interval containing r is evaluated directly 
+        from the CubicSpline coefficients, or copied from path_table if 
+        `PathTable==1` and r is on the `ReactionCoordinate` axis.
+        The thermal expansion is applied in place.
+
+        Parameters
+        ----------
+        r : float
+            reaction coordinate, should be in [0,1]
+        scale : float | np.ndarray[3], optional
+            thermal expansion, by default 1.0
+        nus : Tuple[int], optional
+            derivative orders, each at most 2, by default (0,1,2)
+        atoms : None or np.ndarray, optional
+            indices of atoms to evaluate, e.g. local atoms, by default None.
+            If None, all atoms are evaluated
+
+        Returns
+        -------
+        List[np.ndarray], each of shape (natoms,3) or (len(atoms),3)
+            pathway configuration, tangent and curvature for nus=(0,1,2)
+        """
+        key = self.path_key(r)
+        if key in self.path_table:
+            if atoms is None:
+                frame = [self.path_table[key][nu].copy() for nu in nus]
+            else:
+                frame = [self.path_table[key][nu][atoms] for nu in nus]
+        else:
+            x = self.Spline_X.x
+            i = np.clip(np.searchsorted(x,r,side='right')-1,0,x.size-2)
+            t = r - x[i]
+            c = self.Spline_X.c[:,i] # shape (4,3*natoms), a view
+            if not atoms is None:
+                c = c[:,(3*atoms[:,None]+np.arange(3)).flatten()]
+            frame = []
+            for nu in nus:
+                # Horner scheme for d^nu/dr^nu of the cubic
+                if nu==0:
+                    X = c[0] * t
+                    X += c[1]
+                    X *= t
+                    X += c[2]
+                    X *= t
+                    X += c[3]
+                elif nu==1:
+                    X = c[0] * (3.0*t)
+                    X += 2.0 * c[1]
+                    X *= t
+                    X += c[2]
+                elif nu==2:
+                    X = c[0] * (6.0*t)
+                    X += 2.0 * c[1]
+                else:
+                    raise ValueError(f"Derivative order {nu} > 2")
+                frame += [X.reshape((-1,3))]
+        if not (isinstance(scale,float) and scale==1.0):
+            for X in frame:
+                X *= scale
+        return frame
 
     def pathway(self,r:float,nu:int=0,
                 scale:float|np.ndarray[3]=1.0)->np.ndarray:
@@ -155,14 +432,60 @@ class BaseWorker:
         np.ndarray, shape (natoms,3)
             pathway configuration
         """
+        if nu<=2:
+            return self.path_frame(r,scale=scale,nus=(nu,))[0]
         if isinstance(scale,float):
             scale = np.eye(3)*float(scale)
         else:
             scale = np.diag(scale)
         return self.Spline_X(r,nu=nu).reshape((-1,3))@scale
     
+    def results_schema(self)->None|np.dtype:
+        """Structured dtype of the scalar fields in the ResultsHolder
+        returned by sample(), sent as typed records if not None.
+        See BaseGatherer.set_schema()
+
+        Returns
+        -------
+        None or np.dtype
+            None, such that all results are pickled
+        """
+        return None
+    
+    def standard_schema(self)->dict:
+        """Types of the scalar fields of standard PAFI results, 
+        including all axes, for results_schema() of child classes
+
+        Returns
+        -------
+        dict
+            field names and types
+        """
+        schema = {a:np.float64 for a in self.parameters.axes.keys()}
+        schema.update({"SampleSteps":np.int64,"ThermSteps":np.int64,
+                       "ThermWindow":np.int64,"Repeat":np.int32})
+        for k in ["MinEnergy","preTemperature","FreeEnergyGradient",
+                  "FreeEnergyGradientVariance","avePsi","dXTangent",
+                  "postTemperature","MaxJump"]:
+            schema[k] = np.float64
+        schema["Valid"] = np.bool_
+        return schema
+    
     def close(self)->None:
-        pass
+        """Close down, freeing any shared pathway and DevStore. Collective
+        over all ranks of `world` if the pathway is shared
+        """
+        if not self.DevStore is None:
+            self.DevStore.close()
+            self.DevStore = None
+        if not self.spline_window is None:
+            self.Spline_X = None
+            self.path_table = {}
+            self.spline_window.Free()
+            self.spline_window = None
+        if not self.node_comm is None:
+            self.node_comm.Free()
+            self.node_comm = None
             
 
 
@@ -0,0 +1,153 @@
+from typing import Callable, List
+
+class LAMMPSSession:
+    def __init__(self,run_commands:Callable[[str|List[str]],bool])->None:
+        """Track the fixes and computes of a LAMMPS instance,
+        to avoid redundant redefinitions and `run 0` calls.
+
+        Every fix, unfix or other change of state only marks the
+        session as stale. `run 0` is then called by setup(), i.e. only
+        when data must be extracted before the next run or minimization.
+
+        Parameters
+        ----------
+        run_commands : Callable[[str|List[str]],bool]
+            the run_commands() function of a LAMMPSWorker
+
+        Methods
+        ----------
+        fix()
+        unfix()
+        compute()
+        check()
+        touch()
+        run()
+        setup()
+        reset()
+        """
+        self.run_commands = run_commands
+        self.fixes = {}
+        self.computes = {}
+        self.stale = True
+
+    def fix(self,id:str,args:str,refresh:bool=False)->bool:
+        """Define a fix, only if not already defined with the same arguments.
+        A fix with the same id and style is replaced by LAMMPS, see
+        https://docs.lammps.org/fix.html
+
+        Parameters
+        ----------
+        id : str
+            fix id
+        args : str
+            group, style and arguments, e.g. "all ave/time 1 10 10 c_pe"
+        refresh : bool, optional
+            redefine even if unchanged, e.g. to reset a random seed,
+            by default False
+
+        Returns
+        -------
+        bool
+            True if the fix was (re)defined
+        """
+        args = " ".join(args.split())
+        if self.fixes.get(id)==args and not refresh:
+            return False
+        if id in self.fixes and \
+            self.fixes[id].split()[:2]!=args.split()[:2]:
+            self.unfix(id)
+        self.run_commands(f"fix {id} {args}")
+        self.fixes[id] = args
+        self.stale = True
+        return True
+
+    def unfix(self,id:str)->None:
+        """Remove a fix, if defined
+
+        Parameters
+        ----------
+        id : str
+            fix id
+        """
+        if id in self.fixes:
+            self.run_commands(f"unfix {id}")
+            del self.fixes[id]
+            self.stale = True
+
+    def compute(self,id:str,args:str)->bool:
+        """Define a compute, only if not already defined with
+        the same arguments
+
+        Parameters
+        ----------
+        id : str
+            compute id
+        args : str
+            group, style and arguments
+
+        Returns
+        -------
+        bool
+            True if the compute was (re)defined
+        """
+        args = " ".join(args.split())
+        if self.computes.get(id)==args:
+            return False
+        if id in self.computes:
+            self.run_commands(f"uncompute {id}")
+        self.run_commands(f"compute {id} {args}")
+        self.computes[id] = args
+        self.stale = True
+        return True
+
+    def check(self,id:str,args:str)->None:
+        """Check a fix is defined with the given arguments, e.g.
+        before extracting data for the current sample
+
+        Parameters
+        ----------
+        id : str
+            fix id
+        args : str
+            group, style and arguments
+
+        Raises
+        ------
+        ValueError
+            if the fix is not defined with these arguments
+        """
+        if self.fixes.get(id)!=" ".join(args.split()):
+            raise ValueError(f"fix {id} is {self.fixes.get(id)}, not {args}")
+
+    def touch(self)->None:
+        """Mark as stale after any other change, e.g. positions or scripts
+        """
+        self.stale = True
+
+    def run(self,cmds:str)->None:
+        """Run commands which include a full setup, e.g. run or minimize
+
+        Parameters
+        ----------
+        cmds : str
+            LAMMPS commands
+        """
+        self.run_commands(cmds)
+        self.stale = False
+
+    def setup(self)->None:
+        """Call `run 0` if stale, before extracting data
+        """
+        if self.stale:
+            self.run("run 0")
+
+    def reset(self)->None:
+        """Remove all tracked fixes and computes,
+        e.g. before redefining the system
+        """
+        for id in list(self.fixes.keys())[::-1]:
+            self.unfix(id)
+        for id in list(self.computes.keys()):
+            self.run_commands(f"uncompute {id}")
+        self.computes = {}
+        self.stale = True
@@ -1,10 +1,12 @@
 import numpy as np
 import os
-from typing import Any, List
+from typing import Any, List, Tuple
 from ..parsers.PAFIParser import PAFIParser
 from mpi4py import MPI
-from lammps import lammps,LMP_STYLE_GLOBAL,LMP_TYPE_VECTOR,LMP_TYPE_SCALAR
+from lammps import lammps,LMP_STYLE_GLOBAL,LMP_STYLE_ATOM,\
+    LMP_TYPE_VECTOR,LMP_TYPE_SCALAR,LMP_TYPE_ARRAY
 from .BaseWorker import BaseWorker
+from .LAMMPSSession import LAMMPSSession
 from ..results.ResultsHolder import ResultsHolder
 
 class LAMMPSWorker(BaseWorker):
@@ -24,14 +26,21 @@ class LAMMPSWorker(BaseWorker):
             Predefined or custom PAFIParser object
         worker_instance : int
             unique worker rank
+        world : None or MPI.Intracomm, optional
+            communicator of all workers, see BaseWorker
         """
     def __init__(self, comm: MPI.Intracomm, 
                  parameters: PAFIParser, worker_instance: int,
-                 rank: int, roots: List[int]) -> None:
-        super().__init__(comm, parameters, worker_instance, rank, roots)
+                 rank: int, roots: List[int],
+                 world: None|MPI.Intracomm=None) -> None:
+        super().__init__(comm, parameters, worker_instance, rank, roots, world)
         
         self.name = "LAMMPSWorker"
         self.last_error_message = ""
+        # tracks fixes and computes, see LAMMPSSession
+        self.session = LAMMPSSession(self.run_commands)
+        # write pathway of local atoms only, see set_local_path()
+        self.local_scatter = bool(self.parameters("LocalScatter"))
         self.start_lammps()
         if self.has_errors:
             print("ERROR STARTING LAMMPS!",self.last_error_message)
@@ -47,8 +56,6 @@ class LAMMPSWorker(BaseWorker):
         self.get_cell_data()
         # See initialize_hyperplane
         self.scale = np.ones(3)
-        self.made_fix=False
-        self.made_compute=False
         self.make_path()
         
     
@@ -96,30 +103,72 @@ class LAMMPSWorker(BaseWorker):
         arguments : None | dict | ResultsHolder, optional
             will be used to replace wildcards, by default None
         """
-        if key in self.parameters.scripts:
+        if self.has_script(key):
             if self.parameters("Verbose")>0 and self.rank==0:
                 print(f"RUNNING SCRIPT {key}")
         
             script = self.parameters.parse_script(key,arguments=arguments)
             self.run_commands(script)
+            self.session.touch()
+    
+    def has_script(self,key:str)->bool:
+        """Check if a non-empty script is defined in the XML
+
+        Parameters
+        ----------
+        key : str
+            script key from XML
+
+        Returns
+        -------
+        bool
+            True if the script has any commands
+        """
+        return key in self.parameters.scripts and \
+            len(self.parameters.scripts[key].strip())>0
 
     def run_commands(self,cmds : str | List[str]) -> bool:
         """
-            Run LAMMPS commands line by line, checking for errors
+            Run LAMMPS commands as a single block, via commands_list(),
+            checking for errors. If `Verbose>0`, commands are run and
+            printed line by line
         """
         cmd_list = cmds.splitlines() if isinstance(cmds,str) else cmds
-        for cmd in cmd_list:
-            try:
-                if self.parameters("Verbose")>0 and self.rank==0:
+        if self.parameters("Verbose")>0:
+            for cmd in cmd_list:
+                if self.rank==0:
                     print(f"TRYING COMMAND {cmd}")
-                self.L.command(cmd)
-            except Exception as ae:
-                if self.local_rank==0:
-                    message = f"LAMMPS ERROR: {cmd} {ae}"
+                self.run_block([cmd])
+        else:
+            self.run_block(cmd_list)
+    
+    def run_block(self,cmd_list:List[str])->None:
+        """Run a list of LAMMPS commands with commands_list()
+
+        Parameters
+        ----------
+        cmd_list : List[str]
+            LAMMPS commands
+
+        Raises
+        ------
+        SyntaxError
+            with the failing command, if LAMMPS raises an error
+        """
+        try:
+            self.L.commands_list(cmd_list)
+        except Exception as ae:
+            if self.local_rank==0:
+                # LAMMPS error messages end with the failing command
+                if "Last command:" in str(ae):
+                    cmd = str(ae).split("Last command:")[-1].strip()
                 else:
-                    message = None
-                self.last_error_message = ae
-                raise SyntaxError(message)
+                    cmd = "\n".join(cmd_list)
+                message = f"LAMMPS ERROR: {cmd} {ae}"
+            else:
+                message = None
+            self.last_error_message = ae
+            raise SyntaxError(message)
     
     def gather(self,name:str,type:None|int=None,count:None|int=None)->np.ndarray:
         """Wrapper of LAMMPS gather()
@@ -167,6 +216,143 @@ class LAMMPSWorker(BaseWorker):
             self.last_error_message = ae
         return np.ctypeslib.as_array(res).reshape((-1,count))
     
+    def extract_local(self,names:List[Tuple[str,int]])\
+            ->Tuple[np.ndarray,List[np.ndarray]]:
+        """Copies of double per-atom data for the atoms owned by this rank,
+        without communication, via L.numpy. Collective over the worker:
+        if any rank cannot access local data, all data is collected
+        with gather() and returned on the worker root only, such that
+        reductions and gather_root() give the same result.
+
+        Parameters
+        ----------
+        names : List[Tuple[str,int]]
+            (name,count) pairs, e.g. ("x",3), ("d_ux",1) or
+            ("f_[fix id]",3) for a per-atom fix
+
+        Returns
+        -------
+        Tuple[np.ndarray,List[np.ndarray]]
+            atom IDs, shape (nlocal,), and data, each of shape (nlocal,count)
+        """
+        if self.local_scatter:
+            try:
+                nlocal = self.L.extract_setting("nlocal")
+                ids = np.array(self.L.numpy.extract_atom("id",
+                        nelem=nlocal,dim=1),dtype=int).flatten()[:nlocal]
+                data = []
+                for name,count in names:
+                    if name[:2]=="f_":
+                        ftype = LMP_TYPE_VECTOR if count==1 else LMP_TYPE_ARRAY
+                        d = self.L.numpy.extract_fix(name[2:],
+                                                     LMP_STYLE_ATOM,ftype)
+                    else:
+                        d = self.L.numpy.extract_atom(name,nelem=nlocal,dim=count)
+                    data += [np.array(d,dtype=float)[:nlocal].reshape((-1,count))]
+                success = all(d.shape[0]==nlocal for d in data)
+            except Exception as ae:
+                self.last_error_message = ae
+                success = False
+            if self.comm.allreduce(success,op=MPI.LAND):
+                return ids, data
+            if self.local_rank==0:
+                print("Cannot access per-atom data, using gather()")
+            self.local_scatter = False
+        
+        data = [self.gather(name,1,count) for name,count in names]
+        ids = np.arange(data[0].shape[0]) + 1
+        if self.local_rank>0:
+            ids, data = ids[:0], [d[:0] for d in data]
+        return ids, data
+    
+    def gather_root(self,ids:np.ndarray,data:np.ndarray)->None|np.ndarray:
+        """Assemble per-atom data from extract_local() on the worker root
+
+        Parameters
+        ----------
+        ids : np.ndarray, shape (nlocal,)
+            atom IDs of local atoms
+        data : np.ndarray, shape (nlocal,count)
+            double data of local atoms
+
+        Returns
+        -------
+        None or np.ndarray, shape (natoms,count)
+            the data ordered by ID on the worker root, else None
+        """
+        count = data.shape[1]
+        sizes = self.comm.gather(ids.size,root=0)
+        # receive buffers only on the worker root
+        recv_ids, recv_data = None, None
+        if self.local_rank==0:
+            sizes = np.array(sizes)
+            all_ids = np.empty(sizes.sum(),dtype=np.int64)
+            all_data = np.empty((sizes.sum(),count),dtype=np.float64)
+            recv_ids, recv_data = [all_ids,sizes], [all_data,sizes*count]
+        self.comm.Gatherv(np.ascontiguousarray(ids,dtype=np.int64),
+                          recv_ids,root=0)
+        self.comm.Gatherv(np.ascontiguousarray(data,dtype=np.float64),
+                          recv_data,root=0)
+        if self.local_rank>0:
+            return None
+        res = np.empty_like(all_data)
+        res[all_ids-1] = all_data
+        return res
+    
+    def scatter_root(self,name:str,data:None|np.ndarray)->None:
+        """Write per-atom data held on the worker root, e.g. from 
+        gather_root(), to LAMMPS. Each rank receives the rows of the
+        atoms it owns, written via L.numpy. Collective over the worker:
+        if any rank cannot access local data, the data is broadcast 
+        and written with scatter()
+
+        Parameters
+        ----------
+        name : str
+            name of double per-atom data, e.g. "x" or "v"
+        data : None or np.ndarray, shape (natoms,count)
+            the data ordered by ID on the worker root, ignored elsewhere
+        """
+        root = self.local_rank==0
+        count = self.comm.bcast(data.shape[1] if root else None,root=0)
+        if self.local_scatter:
+            try:
+                nlocal = self.L.extract_setting("nlocal")
+                ids = np.array(self.L.numpy.extract_atom("id",
+                        nelem=nlocal,dim=1),dtype=np.int64).flatten()[:nlocal]
+                view = self.L.numpy.extract_atom(name,nelem=nlocal,dim=count)
+                success = not view is None
+            except Exception as ae:
+                self.last_error_message = ae
+                success = False
+            if self.comm.allreduce(success,op=MPI.LAND):
+                # rows of the local atoms of each rank, in rank order
+                sizes = self.comm.gather(ids.size,root=0)
+                recv_ids, send_data = None, None
+                if root:
+                    sizes = np.array(sizes)
+                    all_ids = np.empty(sizes.sum(),dtype=np.int64)
+                    recv_ids = [all_ids,sizes]
+                self.comm.Gatherv(ids,recv_ids,root=0)
+                if root:
+                    send_data = [np.ascontiguousarray(data[all_ids-1],
+                                                      dtype=np.float64),
+                                 sizes*count]
+                local = np.empty((ids.size,count),dtype=np.float64)
+                self.comm.Scatterv(send_data,local,root=0)
+                view[:nlocal] = local.reshape(view[:nlocal].shape)
+                self.session.touch()
+                return
+            if root:
+                print("Cannot access per-atom data, using scatter()")
+            self.local_scatter = False
+        
+        if not root:
+            data = np.empty((self.get_natoms(),count),dtype=np.float64)
+        data = np.ascontiguousarray(data,dtype=np.float64)
+        self.comm.Bcast(data,root=0)
+        self.scatter(name,data)
+    
     def scatter(self,name:str,data:np.ndarray)->None:
         """Scatter data to LAMMPS
             Assume ordered with ID
@@ -183,6 +369,7 @@ class LAMMPSWorker(BaseWorker):
         elif np.issubdtype(data.dtype,float):
             type = 1
         count = data.shape[1] if len(data.shape)>1 else 1
+        self.session.touch()
         try:
             self.L.scatter(name,type,count,
                            np.ctypeslib.as_ctypes(data.flatten()))
@@ -230,8 +417,7 @@ class LAMMPSWorker(BaseWorker):
         np.ndarray, shape (N,3)
             the positions
         """
-        self.made_fix = False
-        self.make_compute = False
+        self.session.reset()
         self.run_commands(f"""
             delete_atoms group all
             read_data {file_path} add merge
@@ -249,9 +435,11 @@ class LAMMPSWorker(BaseWorker):
         """
         newscale = self.parameters.expansion(T)
         rs = newscale / self.scale
+        if np.allclose(rs,1.0,rtol=0.0,atol=1.0e-12):
+            return
         self.run_commands(f"""
-            change_box all x scale {rs[0]} y scale {rs[1]} z scale {rs[2]}
-            run 0""")
+            change_box all x scale {rs[0]} y scale {rs[1]} z scale {rs[2]}""")
+        self.session.touch()
         self.scale = newscale.copy()
 
     def extract_compute(self,id:str,vector:bool=True)->float|np.ndarray:
@@ -273,6 +461,8 @@ class LAMMPSWorker(BaseWorker):
         style = LMP_STYLE_GLOBAL
         type = LMP_TYPE_VECTOR if vector else LMP_TYPE_SCALAR
         assert hasattr(self.L,"numpy")
+        # computes must be current
+        self.session.setup()
         try:
             res = self.L.numpy.extract_compute(id,style,type) 
             return np.array(res)
@@ -340,44 +530,104 @@ class LAMMPSWorker(BaseWorker):
 
         # check for __pafipath fix to store the path data
         # (path : d_u[x,y,z],tangent: d_n[x,y,z],dtangent: d_dn[x,y,z])
-        if not self.made_fix:
-            self.run_commands(f"""
-            fix __pafipath all property/atom d_ux d_uy d_uz d_nx d_ny d_nz d_dnx d_dny d_dnz
-            run 0""")
-            self.made_fix=True
+        if self.session.fix("__pafipath",
+            "all property/atom d_ux d_uy d_uz d_nx d_ny d_nz d_dnx d_dny d_dnz"):
+            self.session.setup()
+        
+        # write local atoms only if possible, see set_local_path()
+        if self.local_scatter and self.set_local_path(r):
+            return
+        
+        # position, tangent and curvature in one pass, see path_frame()
+        path_x, path_t, path_dt = self.path_frame(r,scale=self.scale)
         
         # fill positions: x and d_u[x,y,z]
-        path_x = self.pathway(r,nu=0,scale=self.scale)
         self.scatter("x",path_x)
         for i,c in enumerate(["d_ux","d_uy","d_uz"]):
             self.scatter(c,path_x[:,i])
-        del path_x
 
         # fill tangent: d_n[x,y,z]
-        path_t = self.pathway(r,nu=1,scale=self.scale)
         path_t -= path_t.mean(0)
         self.norm_t = np.linalg.norm(path_t)
         path_t /= self.norm_t
         for i,c in enumerate(["d_nx","d_ny","d_nz"]):
             self.scatter(c,path_t[:,i])
-        del path_t
 
         # fill dtangent: d_dn[x,y,z]
-        path_t = self.pathway(r,nu=2,scale=self.scale) 
-        
-        path_t /= self.norm_t**2
+        path_dt /= self.norm_t**2
         for i,c in enumerate(["d_dnx","d_dny","d_dnz"]):
-            self.scatter(c,path_t[:,i])
-        del path_t
+            self.scatter(c,path_dt[:,i])
+        del path_x, path_t, path_dt
+
+        self.make_path_compute()
+    
+    def make_path_compute(self)->None:
+        """Check for __pafipath compute to make path data accessible
+        """
+        # `run 0` is only called when required, see LAMMPSSession
+        self.session.compute("__pafipath",
+            "all property/atom d_ux d_uy d_uz d_nx d_ny d_nz d_dnx d_dny d_dnz")
+    
+    def set_local_path(self,r:float)->bool:
+        """Write pathway data directly into LAMMPS per-atom storage,
+        for the atoms owned by this rank only, via L.numpy.extract_atom.
+        The pathway is only evaluated for these atoms, and the tangent
+        is normalized with a single Allreduce. Collective over the worker.
+        Assumes atom IDs 1,..,natoms, as for gather()
 
-        self.run_commands("run 0")
+        Parameters
+        ----------
+        r : float
+            The reaction coordinate
 
-        # check for __pafipath compute to make this data accessible
-        if not self.made_compute:
-            self.run_commands(f"""
-            compute __pafipath all property/atom d_ux d_uy d_uz d_nx d_ny d_nz d_dnx d_dny d_dnz
-            run 0""")
-            self.made_compute=True
+        Returns
+        -------
+        bool
+            False if per-atom storage cannot be accessed on any rank,
+            e.g. for older LAMMPS versions. Then use scatter()
+        """
+        names = ["d_ux","d_uy","d_uz","d_nx","d_ny","d_nz","d_dnx","d_dny","d_dnz"]
+        try:
+            nlocal = self.L.extract_setting("nlocal")
+            ids = self.L.numpy.extract_atom("id",nelem=nlocal,dim=1)
+            views = [self.L.numpy.extract_atom("x",nelem=nlocal,dim=3)]
+            views += [self.L.numpy.extract_atom(n,nelem=nlocal,dim=1) \
+                      for n in names]
+            success = all(not v is None for v in [ids]+views)
+        except Exception as ae:
+            self.last_error_message = ae
+            success = False
+        if not self.comm.allreduce(success,op=MPI.LAND):
+            if self.local_rank==0:
+                print("Cannot access per-atom data, using scatter()")
+            self.local_scatter = False
+            return False
+        
+        # position, tangent and curvature of local atoms
+        atoms = np.asarray(ids,dtype=int).flatten() - 1
+        path_x, path_t, path_dt = \
+            self.path_frame(r,scale=self.scale,atoms=atoms)
+        
+        # tangent normalization over all atoms
+        local_sums = np.append(path_t.sum(0),(path_t**2).sum())
+        sums = np.zeros(4)
+        self.comm.Allreduce(local_sums,sums,op=MPI.SUM)
+        natoms = self.get_natoms()
+        mean_t = sums[:3] / natoms
+        self.norm_t = np.sqrt(sums[3] - natoms*(mean_t**2).sum())
+        path_t -= mean_t
+        path_t /= self.norm_t
+        path_dt /= self.norm_t**2
+        
+        # local rows of all nine columns in one indexing step
+        path_data = np.hstack((path_x,path_t,path_dt))
+        views[0][:] = path_x
+        for i,view in enumerate(views[1:]):
+            view[:] = path_data[:,i]
+        del path_x, path_t, path_dt, path_data
+        self.session.touch()
+        self.make_path_compute()
+        return True
     
     def close(self) -> None:
         """
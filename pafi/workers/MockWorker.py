@@ -0,0 +1,126 @@
+import time
+import numpy as np
+from mpi4py import MPI
+from typing import List
+from ..parsers.PAFIParser import PAFIParser
+from .BaseWorker import BaseWorker
+from ..results.ResultsHolder import ResultsHolder
+
+class MockWorker(BaseWorker):
+    """LAMMPS-free worker, which fakes sample() with a configurable
+        cost and result distribution. Used to test and benchmark
+        PAFIManager, the Gatherer and output, see examples/benchmarks
+
+        Results have the fields of PAFIWorker. The free energy gradient
+        is that of a barrier `MockBarrier*sin(pi*r)**2` in eV, with
+        Gaussian noise of standard deviation `MockNoise`. `MaxJump` is
+        drawn such that a fraction `MockInvalid` of samples is not `Valid`.
+
+        Optional parameters, set with parameters.set(key,value,create=True),
+        otherwise the defaults in MOCK_PARAMETERS are used:
+
+        MockCost : float
+            mean wall time of a sample in seconds
+        MockCostSpread : float
+            log-normal spread of the sample cost, 0 for a constant cost
+        MockBarrier : float
+            barrier height in eV
+        MockNoise : float
+            noise of FreeEnergyGradient in eV
+        MockInvalid : float
+            fraction of samples with MaxJump > MaxJumpThresh
+        MockAtoms : int
+            number of atoms for `Dev` if `PostDump==1`
+
+        Parameters
+        ----------
+        comm : MPI.Intracomm
+            MPI communicator
+        parameters : PAFIParser
+            Predefined or custom  PAFIParser object
+        worker_instance : int
+            unique worker rank
+        rank : int
+            global rank (for MPI safety)
+        roots : List[int]
+            list of master ranks  (for MPI safety)
+        world : None or MPI.Intracomm, optional
+            communicator of all workers, see BaseWorker
+        """
+    MOCK_PARAMETERS = {"MockCost":0.01,"MockCostSpread":0.0,
+                       "MockBarrier":1.0,"MockNoise":0.1,
+                       "MockInvalid":0.0,"MockAtoms":1000}
+    PROFILE_STAGES = ["Average"]
+    def __init__(self, comm: MPI.Intracomm,
+                 parameters: PAFIParser, worker_instance: int,
+                 rank: int, roots: List[int],
+                 world: None|MPI.Intracomm=None) -> None:
+        super().__init__(comm, parameters, worker_instance, rank, roots, world)
+        self.name = "MockWorker"
+        self.mock = {k:self.parameters(k) if self.parameters.has_key(k) \
+                     else v for k,v in self.MOCK_PARAMETERS.items()}
+        self.rng = np.random.default_rng(int(self.parameters.randint()))
+
+    def results_schema(self)->np.dtype:
+        """Structured dtype of the scalar fields returned by sample(),
+        as for PAFIWorker
+
+        Returns
+        -------
+        np.dtype
+            the structured dtype
+        """
+        schema = self.standard_schema()
+        if self.parameters("PostDump"):
+            schema["MaxDev"] = np.float64
+            if self.parameters("WriteDev"):
+                schema["DevIndex"] = np.int64
+        schema.update(self.profiler.schema())
+        return np.dtype(list(schema.items()))
+
+    def sample(self,results:ResultsHolder)->ResultsHolder:
+        """Fake sampling run, waiting for a random cost
+
+        Parameters
+        ----------
+        results : ResultsHolder
+            input data, with `ReactionCoordinate` and `Temperature`
+
+        Returns
+        -------
+        ResultsHolder
+            input data and fake results
+        """
+        r = results("ReactionCoordinate")
+        T = results("Temperature")
+        cost = self.mock["MockCost"]
+        if self.mock["MockCostSpread"]>0.0:
+            cost *= np.exp(self.rng.normal(0.0,self.mock["MockCostSpread"]))
+        with self.profiler("Average"):
+            time.sleep(cost)
+
+        dF = np.pi * self.mock["MockBarrier"] * np.sin(2.0*np.pi*r)
+        noise = self.mock["MockNoise"]
+        res = {"MinEnergy":self.mock["MockBarrier"]*np.sin(np.pi*r)**2,
+               "preTemperature":T,"postTemperature":T,
+               "FreeEnergyGradient":dF + self.rng.normal(0.0,noise),
+               "FreeEnergyGradientVariance":noise**2,
+               "avePsi":1.0,"dXTangent":self.rng.normal(0.0,0.01)}
+
+        thresh = self.parameters("MaxJumpThresh")
+        invalid = self.rng.uniform() < self.mock["MockInvalid"]
+        res["MaxJump"] = thresh * self.rng.uniform(1.0,2.0) if invalid \
+            else thresh * self.rng.uniform(0.0,1.0)
+        res["Valid"] = bool(res["MaxJump"] < thresh)
+        results.set_dict(res)
+
+        if self.parameters("PostDump") and self.local_rank==0:
+            dx = self.rng.normal(0.0,0.01,(int(self.mock["MockAtoms"]),3))
+            results.set("MaxDev",np.linalg.norm(dx,axis=1).max())
+            if self.parameters("WriteDev"):
+                dev_file, dev_index = self.dev_store().write(dx)
+                results.set("DevFile",dev_file)
+                results.set("DevIndex",dev_index)
+            else:
+                results.set("Dev",dx)
+        return results
@@ -0,0 +1,190 @@
+import numpy as np
+from typing import Tuple
+
+class ModelPotential:
+    """Base class of analytic model potentials for ModelWorker.
+        All methods act on a batch of configurations, shape
+        (nbatch,natoms,3), in eV and Angstrom
+
+        Attributes
+        ----------
+        natoms : int
+            number of atoms
+        mask : np.ndarray, shape (natoms,3)
+            1.0 for free degrees of freedom, 0.0 for fixed
+        cell : None or np.ndarray, shape (3,3)
+            periodic supercell, None if not periodic
+        periodicity : None or np.ndarray, shape (3,)
+            periodic directions
+
+        Methods
+        ----------
+        energy_forces()
+        endpoints()
+        """
+    natoms = 1
+    cell = None
+    periodicity = None
+    def __init__(self)->None:
+        self.mask = np.ones((self.natoms,3))
+
+    def energy_forces(self,X:np.ndarray)->Tuple[np.ndarray,np.ndarray]:
+        """Energies and forces
+
+        Parameters
+        ----------
+        X : np.ndarray, shape (nbatch,natoms,3)
+            configurations
+
+        Returns
+        -------
+        Tuple[np.ndarray,np.ndarray]
+            energies, shape (nbatch,) and forces, shape (nbatch,natoms,3),
+            zero for fixed degrees of freedom
+        """
+        raise NotImplementedError
+
+    def endpoints(self)->Tuple[np.ndarray,np.ndarray]:
+        """Initial and final configurations of the pathway,
+        relaxed by minimum_energy_path()
+
+        Returns
+        -------
+        Tuple[np.ndarray,np.ndarray]
+            configurations, each of shape (natoms,3)
+        """
+        raise NotImplementedError
+
+class MullerBrown(ModelPotential):
+    """The two-dimensional Muller-Brown surface, a single atom in the
+        xy plane. The pathway between the two deepest minima passes a
+        shallow intermediate minimum
+
+        Parameters
+        ----------
+        scale : float, optional
+            energy scale, by default 0.01, giving a barrier of 1.06eV
+        """
+    A = np.array([-200.,-100.,-170.,15.])
+    a = np.array([-1.,-1.,-6.5,0.7])
+    b = np.array([0.,0.,11.,0.6])
+    c = np.array([-10.,-10.,-6.5,0.7])
+    x0 = np.array([1.,0.,-0.5,-1.])
+    y0 = np.array([0.,0.5,1.5,1.])
+    def __init__(self,scale:float=0.01)->None:
+        super().__init__()
+        self.scale = scale
+        self.mask[:,2] = 0.0
+
+    def energy_forces(self,X:np.ndarray)->Tuple[np.ndarray,np.ndarray]:
+        dx = X[:,0,0,None] - self.x0
+        dy = X[:,0,1,None] - self.y0
+        e = self.scale * self.A * np.exp(self.a*dx*dx + self.b*dx*dy
+                                         + self.c*dy*dy)
+        F = np.zeros_like(X)
+        F[:,0,0] = -(e*(2.0*self.a*dx + self.b*dy)).sum(-1)
+        F[:,0,1] = -(e*(self.b*dx + 2.0*self.c*dy)).sum(-1)
+        return e.sum(-1), F
+
+    def endpoints(self)->Tuple[np.ndarray,np.ndarray]:
+        return np.array([[-0.558,1.442,0.]]), np.array([[0.623,0.028,0.]])
+
+class FrenkelKontorova(ModelPotential):
+    """Periodic Frenkel-Kontorova chain along x: `natoms` atoms joined by
+        harmonic springs of stiffness `k`, on a substrate
+        `V0*(1-cos(2*pi*x/b))/2` with `natoms-1` periods. The chain holds
+        a single kink, and the pathway moves the kink by one period
+
+        Parameters
+        ----------
+        natoms : int, optional
+            number of atoms, by default 16
+        k : float, optional
+            spring stiffness in eV/A^2, by default 1.0
+        V0 : float, optional
+            substrate barrier in eV, by default 2.0
+        b : float, optional
+            substrate period in A, by default 1.0
+        """
+    def __init__(self,natoms:int=16,k:float=1.0,V0:float=2.0,
+                 b:float=1.0)->None:
+        self.natoms = natoms
+        super().__init__()
+        self.k, self.V0, self.b = k, V0, b
+        self.length = (natoms-1)*b
+        self.mask[:,1:] = 0.0
+        # large y,z box, periodic in x
+        self.cell = np.diag([self.length,10.0*self.length,10.0*self.length])
+        self.periodicity = np.array([True,False,False])
+
+    def energy_forces(self,X:np.ndarray)->Tuple[np.ndarray,np.ndarray]:
+        x = X[:,:,0]
+        q = 2.0*np.pi/self.b
+        # bond i joins atoms i and i+1, the last across the boundary.
+        # Minimum image, as positions may be wrapped by BaseWorker.pbc()
+        dx = np.roll(x,-1,axis=1) - x
+        dx -= self.length*np.round(dx/self.length)
+        stretch = dx - self.length/self.natoms
+        E = 0.5*self.V0*(1.0-np.cos(q*x)).sum(1) \
+            + 0.5*self.k*(stretch**2).sum(1)
+        F = np.zeros_like(X)
+        F[:,:,0] = -0.5*self.V0*q*np.sin(q*x) \
+            + self.k*(stretch - np.roll(stretch,1,axis=1))
+        return E, F
+
+    def endpoints(self)->Tuple[np.ndarray,np.ndarray]:
+        # atoms on substrate minima, with one extra atom in a kink,
+        # then the kink moved by one period
+        i = np.arange(self.natoms)
+        X = np.zeros((2,self.natoms,3))
+        for j,c in enumerate([0.5*self.natoms-0.25,0.5*self.natoms+0.75]):
+            X[j,:,0] = self.b*(i - 0.5*(1.0+np.tanh(i-c)))
+        return X[0], X[1]
+
+def minimum_energy_path(model:ModelPotential,nimages:int=9,
+                        dt:float=0.01,steps:int=20000,
+                        tol:float=1.0e-8)->np.ndarray:
+    """Minimum energy path with the simplified string method:
+        all images are relaxed as one batch, then redistributed at
+        equal arc length. The endpoints relax to the nearest minima
+
+    Parameters
+    ----------
+    model : ModelPotential
+        the model
+    nimages : int, optional
+        number of images, by default 9
+    dt : float, optional
+        steepest descent step, by default 0.01
+    steps : int, optional
+        maximum number of steps, by default 20000
+    tol : float, optional
+        maximum displacement for convergence, by default 1.0e-8
+
+    Returns
+    -------
+    np.ndarray, shape (nimages,natoms,3)
+        the images
+    """
+    X0, X1 = model.endpoints()
+    s = np.linspace(0.,1.,nimages)[:,None,None]
+    X = X0[None] + s*(X1-X0)[None]
+    for step in range(steps):
+        _, F = model.energy_forces(X)
+        X_new = X + dt*F
+        # equal arc length redistribution
+        dl = np.linalg.norm((X_new[1:]-X_new[:-1]).reshape((nimages-1,-1)),
+                            axis=1)
+        l = np.append(0.,np.cumsum(dl))
+        l /= l[-1]
+        flat = X_new.reshape((nimages,-1))
+        X_new = np.array([np.interp(s.flatten(),l,flat[:,i]) \
+                          for i in range(flat.shape[1])]).T.reshape(X.shape)
+        change = np.abs(X_new-X).max()
+        X = X_new
+        if change < tol:
+            break
+    return X
+
+# available models, see ModelWorker
+MODELS = {"MullerBrown":MullerBrown,"FrenkelKontorova":FrenkelKontorova}
@@ -0,0 +1,411 @@
+import os
+import numpy as np
+from mpi4py import MPI
+from typing import List
+from ..parsers.PAFIParser import PAFIParser
+from ..parsers.LAMMPSDataReader import read_data_positions, write_data_positions
+from .BaseWorker import BaseWorker
+from .ModelPotentials import ModelPotential, MODELS, minimum_energy_path
+from ..results.ResultsHolder import ResultsHolder
+
+class ModelWorker(BaseWorker):
+    """LAMMPS-free worker for analytic model potentials, see ModelPotentials.
+        sample() has the contract of PAFIWorker.sample(), but runs
+        hyperplane-constrained Langevin dynamics for a batch of `Replicas`
+        independent replicas as one array, shape (Replicas,natoms,3).
+        Replicas are split over the cores of the worker.
+
+        The pathway is splined by make_path() from LAMMPS data files,
+        written once with write_pathway(). The free energy gradient is
+        estimated as for fix pafi, from the force along the pathway tangent,
+        averaged over time and all replicas. As for PAFIWorker, a sample
+        is only valid if every replica returns to the pathway on 
+        minimization (`MaxJump < MaxJumpThresh`).
+        Units are eV, Angstrom and a mass of 1.
+
+        Optional parameters, set with parameters.set(key,value,create=True),
+        otherwise the defaults in MODEL_PARAMETERS are used:
+
+        Model : str
+            a key of ModelPotentials.MODELS
+        ModelAtoms : int
+            number of atoms, for models of variable size
+        Replicas : int
+            number of replicas per sample, at least the number of 
+            cores of the worker
+        ModelTimestep : float
+            timestep, also the step size of minimization.
+            If `OverDamped==1`, the mobility is one and `Friction` unused
+
+        Parameters
+        ----------
+        comm : MPI.Intracomm
+            MPI communicator
+        parameters : PAFIParser
+            Predefined or custom  PAFIParser object
+        worker_instance : int
+            unique worker rank
+        rank : int
+            global rank (for MPI safety)
+        roots : List[int]
+            list of master ranks  (for MPI safety)
+        world : None or MPI.Intracomm, optional
+            communicator of all workers, see BaseWorker
+        """
+    MODEL_PARAMETERS = {"Model":"MullerBrown","ModelAtoms":16,
+                        "Replicas":128,"ModelTimestep":0.01}
+    PROFILE_STAGES = ["PreMin","Therm","Average","PostMin"]
+    def __init__(self, comm: MPI.Intracomm,
+                 parameters: PAFIParser, worker_instance: int,
+                 rank: int, roots: List[int],
+                 world: None|MPI.Intracomm=None) -> None:
+        super().__init__(comm, parameters, worker_instance, rank, roots, world)
+        self.name = "ModelWorker"
+        self.kB = 8.617e-5
+        self.model = self.make_model(self.parameters)
+        self.natoms = self.model.natoms
+        if not self.model.cell is None:
+            self.Cell = self.model.cell
+            self.invCell = np.linalg.inv(self.Cell)
+            self.Periodicity = self.model.periodicity
+            self.has_cell_data = True
+
+        # replicas of this core
+        replicas = int(self.model_parameter(self.parameters,"Replicas"))
+        if replicas < comm.Get_size():
+            raise ValueError(f"Replicas={replicas} is less than the "
+                             f"{comm.Get_size()} cores of a worker, "
+                             "increase Replicas or reduce CoresPerWorker")
+        self.nreplicas = np.array_split(np.arange(replicas),
+                                        comm.Get_size())[self.local_rank].size
+        self.timestep = float(self.model_parameter(self.parameters,
+                                                   "ModelTimestep"))
+        self.rng = np.random.default_rng([int(self.parameters.randint()),
+                                          self.local_rank])
+        self.make_path()
+
+    @classmethod
+    def model_parameter(cls,parameters:PAFIParser,key:str)->str|int|float:
+        """Value of an optional parameter, or its default
+
+        Parameters
+        ----------
+        parameters : PAFIParser
+            the parameters
+        key : str
+            a key of MODEL_PARAMETERS
+
+        Returns
+        -------
+        str|int|float
+            the value
+        """
+        if parameters.has_key(key):
+            return parameters(key)
+        return cls.MODEL_PARAMETERS[key]
+
+    @classmethod
+    def make_model(cls,parameters:PAFIParser)->ModelPotential:
+        """The model potential given by `Model` and `ModelAtoms`
+
+        Parameters
+        ----------
+        parameters : PAFIParser
+            the parameters
+
+        Returns
+        -------
+        ModelPotential
+            the model
+        """
+        name = cls.model_parameter(parameters,"Model")
+        if not name in MODELS:
+            raise ValueError(f"Unknown Model {name}, must be in {list(MODELS)}")
+        if name=="FrenkelKontorova":
+            return MODELS[name](natoms=int(cls.model_parameter(parameters,
+                                                             "ModelAtoms")))
+        return MODELS[name]()
+
+    @classmethod
+    def write_pathway(cls,parameters:PAFIParser,folder:os.PathLike[str],
+                      nimages:int=9,comm:MPI.Intracomm=MPI.COMM_WORLD)->None:
+        """Write the minimum energy path of the model as LAMMPS data files
+        `folder/image_[index].dat`, on the first rank of comm, and set
+        these as the PathwayConfigurations. No potential file is required,
+        so the first image is also set as the potential. Collective over comm
+
+        Parameters
+        ----------
+        parameters : PAFIParser
+            the parameters, on all ranks
+        folder : os.PathLike[str]
+            directory for the files, created if not present
+        nimages : int, optional
+            number of images, by default 9
+        comm : MPI.Intracomm, optional
+            communicator, by default MPI.COMM_WORLD
+        """
+        if comm.Get_rank()==0:
+            model = cls.make_model(parameters)
+            os.makedirs(folder,exist_ok=True)
+            for i,X in enumerate(minimum_energy_path(model,nimages)):
+                write_data_positions(os.path.join(folder,f"image_{i:03d}.dat"),
+                                     X,model.cell)
+        comm.Barrier()
+        parameters.set_pathway(os.path.join(folder,"image_*.dat"))
+        parameters.set_potential(parameters.PathwayConfigurations[0])
+
+    def load_config(self,file_path:os.PathLike[str])->np.ndarray:
+        """Load a LAMMPS data file written by write_pathway()
+
+        Parameters
+        ----------
+        file_path : os.PathLike[str]
+            path to file
+
+        Returns
+        -------
+        np.ndarray, shape (natoms,3)
+            configuration
+        """
+        return read_data_positions(file_path)
+
+    def results_schema(self)->np.dtype:
+        """Structured dtype of the scalar fields returned by sample(),
+        as for PAFIWorker with the number of `ValidReplicas`
+
+        Returns
+        -------
+        np.dtype
+            the structured dtype
+        """
+        schema = self.standard_schema()
+        schema["ValidReplicas"] = np.int64
+        schema.update(self.profiler.schema())
+        return np.dtype(list(schema.items()))
+
+    def minimize(self,X:np.ndarray,steps:int)->np.ndarray:
+        """In-plane steepest descent of all replicas
+
+        Parameters
+        ----------
+        X : np.ndarray, shape (nreplicas,natoms,3)
+            configurations, modified in place
+        steps : int
+            number of steps
+
+        Returns
+        -------
+        np.ndarray
+            the minimized configurations
+        """
+        for step in range(steps):
+            _, F = self.model.energy_forces(X)
+            X += self.timestep * self.project(F)
+        return X
+
+    def project(self,V:np.ndarray)->np.ndarray:
+        """Remove the component along the pathway tangent, and
+        any fixed degrees of freedom, for all replicas
+
+        Parameters
+        ----------
+        V : np.ndarray, shape (nreplicas,natoms,3)
+            forces, velocities or displacements
+
+        Returns
+        -------
+        np.ndarray
+            projected array
+        """
+        return (V - (V*self.n).sum((1,2))[:,None,None]*self.n) * self.mask
+
+    def dynamics(self,X:np.ndarray,v:np.ndarray,steps:int,T:float,
+                 overdamped:bool,window:None|int=None,
+                 average:bool=False)->dict:
+        """Hyperplane-constrained Langevin dynamics of all replicas,
+        with the BAOAB scheme, or Brownian dynamics if overdamped
+
+        Parameters
+        ----------
+        X : np.ndarray, shape (nreplicas,natoms,3)
+            configurations, modified in place
+        v : np.ndarray, shape (nreplicas,natoms,3)
+            velocities, modified in place
+        steps : int
+            number of steps
+        T : float
+            temperature in K
+        overdamped : bool
+            Brownian dynamics if True
+        window : None or int, optional
+            average over the last window steps, by default None, for all
+        average : bool, optional
+            accumulate fix pafi averages if True, by default False
+
+        Returns
+        -------
+        dict
+            time averages for each replica: `E`, `kT`, and if
+            average is True, `fn`, `fn2`, `psi`, `dxn`
+        """
+        kT = self.kB * T
+        dt = self.timestep
+        window = steps if window is None else min(window,steps)
+        # Friction is a damping time, as for fix pafi
+        c1 = np.exp(-dt/self.parameters("Friction"))
+        c2 = np.sqrt((1.0-c1*c1)*kT)
+        keys = ["E","kT"] + (["fn","fn2","psi","dxn"] if average else [])
+        sums = {k:np.zeros(X.shape[0]) for k in keys}
+        E, F = self.model.energy_forces(X)
+        for step in range(steps):
+            if overdamped:
+                X += dt*self.project(F) + np.sqrt(2.0*kT*dt) * \
+                    self.project(self.rng.normal(size=X.shape))
+            else:
+                v += 0.5*dt*self.project(F)
+                X += 0.5*dt*v
+                v *= c1
+                v += c2*self.project(self.rng.normal(size=X.shape))
+                X += 0.5*dt*v
+            # remove any drift from the hyperplane
+            X[:] = self.path_x + self.project(X - self.path_x)
+            E, F = self.model.energy_forces(X)
+            if not overdamped:
+                v += 0.5*dt*self.project(F)
+            if step < steps-window:
+                continue
+            if not overdamped:
+                sums["kT"] += (v*v).sum((1,2)) / self.ndof
+            sums["E"] += E
+            if average:
+                fn = (F*self.n).sum((1,2))
+                dX = X - self.path_x
+                sums["fn"] += fn
+                sums["fn2"] += fn*fn
+                sums["psi"] += 1.0 - (dX*self.dn).sum((1,2))
+                sums["dxn"] += (dX*self.n).sum((1,2))
+        return {k:v/max(1,window) for k,v in sums.items()}
+
+    def gather_replicas(self,data:np.ndarray)->np.ndarray:
+        """Concatenate per-replica data of all cores of the worker
+
+        Parameters
+        ----------
+        data : np.ndarray, shape (nreplicas,)
+            data of the replicas of this core
+
+        Returns
+        -------
+        np.ndarray
+            data of all replicas
+        """
+        if self.comm.Get_size()==1:
+            return data
+        return np.concatenate(self.comm.allgather(data))
+
+    def temperature(self,ave:dict,E_min:float,overdamped:bool)->float:
+        """Sampled temperature, from the kinetic energy, or if overdamped,
+        from the potential energy above the minimum, as for PAFIWorker
+
+        Parameters
+        ----------
+        ave : dict
+            time averages from dynamics()
+        E_min : float
+            energy of the in-plane minimum
+        overdamped : bool
+            if True, use the potential energy
+
+        Returns
+        -------
+        float
+            temperature in K
+        """
+        if overdamped:
+            kT = (self.gather_replicas(ave["E"])-E_min).mean()/0.5/self.ndof
+        else:
+            kT = self.gather_replicas(ave["kT"]).mean()
+        return kT / self.kB
+
+    def sample(self,results:ResultsHolder)->ResultsHolder:
+        """Main sampling run, for all replicas at once
+
+        1) Set up the hyperplane at `ReactionCoordinate`
+        2) In-plane minimization for `MinSteps` if `PreMin==1`
+        3) Thermalization for `ThermSteps` steps at `Temperature`
+        4) Sampling for `SampleSteps` steps, averaging the
+            projected force, as fix pafi
+        5) In-plane minimization for `MinSteps` if `PostMin==1`,
+            else one step. `MaxJump` is the maximum per-atom displacement
+            from the minimum of 2) over all replicas, `Valid` is True if
+            it is below `MaxJumpThresh`, i.e. all replicas are valid.
+            `ValidReplicas` is the number of valid replicas
+
+        Parameters
+        ----------
+        results : ResultsHolder
+            input data, with `ReactionCoordinate` and `Temperature`
+
+        Returns
+        -------
+        ResultsHolder
+            input data and results
+        """
+        parameters = lambda k: results(k) \
+            if results.has_key(k) else self.parameters(k)
+        r = results("ReactionCoordinate")
+        T = results("Temperature")
+        overdamped = parameters("OverDamped")==1
+
+        # hyperplane, as LAMMPSWorker.initialize_hyperplane()
+        self.mask = self.model.mask
+        self.path_x, path_t, path_dt = self.path_frame(r)
+        path_t *= self.mask
+        self.norm_t = np.linalg.norm(path_t)
+        self.n = path_t / self.norm_t
+        self.dn = path_dt * self.mask / self.norm_t**2
+        self.ndof = self.mask.sum() - 1.0
+
+        X = np.repeat(self.path_x[None],self.nreplicas,axis=0)
+        if parameters("PreMin"):
+            with self.profiler("PreMin"):
+                X = self.minimize(X,parameters("MinSteps"))
+        X_min = X.copy()
+        E_min, _ = self.model.energy_forces(X_min[:1])
+        results.set("MinEnergy",E_min[0])
+
+        # thermalize, with Maxwell-Boltzmann velocities
+        v = self.project(self.rng.normal(size=X.shape)) * \
+            np.sqrt(self.kB*T)
+        with self.profiler("Therm"):
+            ave = self.dynamics(X,v,parameters("ThermSteps"),T,overdamped,
+                                window=parameters("ThermWindow"))
+        results.set("preTemperature",self.temperature(ave,E_min[0],overdamped))
+
+        # sample
+        with self.profiler("Average"):
+            ave = self.dynamics(X,v,parameters("SampleSteps"),T,overdamped,
+                                average=True)
+        results.set("postTemperature",self.temperature(ave,E_min[0],overdamped))
+
+        # minimize to test for MaxJump
+        min_steps = parameters("MinSteps") if parameters("PostMin") else 1
+        with self.profiler("PostMin"):
+            X = self.minimize(X,min_steps)
+            jump = self.pbc_dist(X-X_min,axis=2).max(1)
+
+        jump = self.gather_replicas(jump)
+        valid = jump < parameters("MaxJumpThresh")
+        ave = {k:self.gather_replicas(v) for k,v in ave.items()}
+        res = {}
+        res["FreeEnergyGradient"] = -ave["fn"].mean() * self.norm_t
+        res["FreeEnergyGradientVariance"] = ave["fn2"].mean() * self.norm_t**2 \
+            - res["FreeEnergyGradient"]**2
+        res["avePsi"] = ave["psi"].mean()
+        res["dXTangent"] = ave["dxn"].mean()
+        res["MaxJump"] = jump.max()
+        res["ValidReplicas"] = int(valid.sum())
+        res["Valid"] = bool(valid.all())
+        results.set_dict(res)
+        return results
@@ -22,26 +22,55 @@ class PAFIWorker(LAMMPSWorker):
             2) Apply `fix_pafi` constraint at defined `ReactionCoordinate`
             3) Execute `PreTherm` script
             4) Thermalization for `ThermSteps` steps at `Temperature`
+                If `WarmStart==1`, the in-plane deviation and velocities
+                of the last sample at the same `Temperature` are projected
+                onto the new plane, and only `WarmThermSteps` are used
             5) Execute `constrained_average()` function
                 In standard PAFI this runs for `SampleSteps` steps and 
                 time averages the output of `fix_pafi`, as shown below.
                 See https://docs.lammps.org/fix_pafi.html for details.
             6) Extract the average displacment from path if `PostDump==1`
+                If `WriteDev==1` this is written to a DevStore, with
+                only the reference `DevFile`,`DevIndex` in results
             7) Minimize in-plane to check system returns to path.
                 The check is the max per-atom displacement : `MaxJump`
                 If `MaxJump` is larger than `MaxJumpMaxJumpThresh` then 
                 the sample is retained but marked as `Valid=False`
+                `MaxJump` and `MaxDev` are reduced over local atoms,
+                full arrays are only collected for `Dev` output
             8) Execute `PostRun` script
         
         The `contrained_average()` function is therefore suitable for
         any form of hyperplane-constrained averaging.
         """
-    
+    PROFILE_STAGES = ["Hyperplane","PreMin","PreTherm","Therm","Average",
+                      "PostDump","PostMin","PostRun"]
     def __init__(self, comm: MPI.Intracomm, 
                  parameters: PAFIParser, tag: int,
-                 rank: int, roots: List[int]) -> None:
-        super().__init__(comm, parameters, tag, rank, roots)
-        
+                 rank: int, roots: List[int],
+                 world: None|MPI.Intracomm=None) -> None:
+        super().__init__(comm, parameters, tag, rank, roots, world)
+        self.warm_state = None
+    
+    def results_schema(self)->np.dtype:
+        """Structured dtype of the scalar fields returned by sample(),
+        sent as typed records. Other fields, e.g. `DevFile` or those
+        set in custom scripts, are pickled, see BaseGatherer.set_schema()
+
+        Returns
+        -------
+        np.dtype
+            the structured dtype
+        """
+        schema = self.standard_schema()
+        if self.parameters("WarmStart"):
+            schema["WarmStart"] = np.bool_
+        if self.parameters("PostDump"):
+            schema["MaxDev"] = np.float64
+            if self.parameters("WriteDev"):
+                schema["DevIndex"] = np.int64
+        schema.update(self.profiler.schema())
+        return np.dtype(list(schema.items()))
     
     def constrained_average(self,results:ResultsHolder)->ResultsHolder:
         """
@@ -62,7 +91,7 @@ class PAFIWorker(LAMMPSWorker):
         parameters = lambda k: results(k)\
             if results.has_key(k) else self.parameters(k)
         fixname = self.setup_pafi_average(parameters("SampleSteps"),"avepafi")
-        self.run_commands("run %d" % parameters("SampleSteps"))
+        self.session.run("run %d" % parameters("SampleSteps"))
         results = self.extract_pafi_data(results,fixname)
         
         return results
@@ -104,7 +133,8 @@ class PAFIWorker(LAMMPSWorker):
         
     
         results = self.standard_pafi_pre_average(results)
-        results = self.constrained_average(results)
+        with self.profiler("Average"):
+            results = self.constrained_average(results)
         results = self.standard_pafi_post_average(results)
 
         return results
@@ -124,9 +154,8 @@ class PAFIWorker(LAMMPSWorker):
         str:
             the fix name
         """
-        self.run_commands(f"""
-            fix {fixname} all ave/time 1 {ave_steps} {ave_steps} f_pafi[*]
-        """)
+        self.session.fix(fixname,
+                         f"all ave/time 1 {ave_steps} {ave_steps} f_pafi[*]")
         return fixname
     
     def extract_pafi_data(self,results:ResultsHolder,
@@ -151,10 +180,71 @@ class PAFIWorker(LAMMPSWorker):
         res['avePsi'] = fix_data[2]
         res['dXTangent'] = fix_data[3]
         results.set_dict(res)
-        self.run_commands(f"unfix {name}")
+        self.session.unfix(name)
         return results
     
     
+    def store_warm_state(self,r:float,T:float)->None:
+        """Store the in-plane deviation from the pathway and the
+        velocities at the end of sampling, for warm_start().
+        Per-atom data is held on the worker root only, see gather_root()
+
+        Parameters
+        ----------
+        r : float
+            reaction coordinate
+        T : float
+            temperature
+        """
+        ids, (x, v) = self.extract_local([("x",3),("v",3)])
+        x, v = self.gather_root(ids,x), self.gather_root(ids,v)
+        self.warm_state = {"r":r,"T":T}
+        if self.local_rank==0:
+            dx = x - self.pathway(r,nu=0,scale=self.scale)
+            self.warm_state.update({"dx":self.pbc(dx),"v":v})
+        del x, v
+    
+    def warm_start(self,r:float,T:float)->bool:
+        """Continue from the state stored by store_warm_state(),
+        if at the same temperature and at most one plane away. 
+        The deviation and velocities are projected onto the new
+        hyperplane on the worker root, removing center of mass and 
+        tangent components, then written with scatter_root()
+        
+        Parameters
+        ----------
+        r : float
+            reaction coordinate
+        T : float
+            temperature
+
+        Returns
+        -------
+        bool
+            True if the stored state was applied
+        """
+        if self.warm_state is None or T<0.1 or \
+            not np.isclose(self.warm_state["T"],T):
+            return False
+        r_axis = np.unique(self.parameters.axes["ReactionCoordinate"])
+        dr = np.diff(r_axis).max() if r_axis.size>1 else 0.0
+        if np.abs(r-self.warm_state["r"]) > dr + 1.0e-8:
+            return False
+        x, v = None, None
+        if self.local_rank==0:
+            path_x, path_t = self.path_frame(r,scale=self.scale,nus=(0,1))
+            path_t -= path_t.mean(0)
+            path_t /= np.linalg.norm(path_t)
+            dx = self.warm_state["dx"] - self.warm_state["dx"].mean(0)
+            v = self.warm_state["v"] - self.warm_state["v"].mean(0)
+            dx -= (dx*path_t).sum() * path_t
+            v -= (v*path_t).sum() * path_t
+            x = path_x + dx
+            del path_x, path_t, dx
+        self.scatter_root("x",x)
+        self.scatter_root("v",v)
+        return True
+    
     def standard_pafi_pre_average(self,results:ResultsHolder)->ResultsHolder:
         """Helper functions for standard PAFI
 
@@ -181,63 +271,67 @@ class PAFIWorker(LAMMPSWorker):
         r = results("ReactionCoordinate")
         T = results("Temperature")
         
-        self.initialize_hyperplane(r,0.)
-        # TODO: check order in public PAFI
-        self.run_script("PreRun",results)
-        self.initialize_hyperplane(r,T)
+        with self.profiler("Hyperplane"):
+            self.initialize_hyperplane(r,0.)
+            # TODO: check order in public PAFI
+            self.run_script("PreRun",results)
+            self.initialize_hyperplane(r,T)
         n_atoms = self.get_natoms()
 
-        # the PAFI fix
+        # the PAFI fix, always redefined to reset the random seed
         gamma = parameters("Friction")
         overdamped = parameters("OverDamped")
         seed = self.parameters.randint()
-        cmd = f"fix pafi all pafi __pafipath {T} {gamma} {seed} "
-        cmd += f"overdamped {overdamped} com 1\nrun 0"
-        self.run_commands(cmd)
+        cmd = f"all pafi __pafipath {T} {gamma} {seed} "
+        cmd += f"overdamped {overdamped} com 1"
+        self.session.fix("pafi",cmd,refresh=True)
 
         # pre minimize (optional)
         if parameters("PreMin"):
             min_steps = parameters("MinSteps")
-            self.run_commands(f"""
-                min_style fire
-                minimize 0 0.0001 {min_steps} {min_steps}
-            """)
-        if parameters("PostMin"):
-            self.change_x = -self.gather("x",1,3)
+            with self.profiler("PreMin"):
+                self.session.run(f"""
+                    min_style fire
+                    minimize 0 0.0001 {min_steps} {min_steps}
+                """)
+        # reference positions for MaxJump, which migrate with atoms
+        self.session.fix("__pafix0","all store/state 0 x y z",refresh=True)
+        
+        # continue from last sample (optional)
+        warm = self.warm_start(r,T) if parameters("WarmStart") else False
         
         # PreThermalize (optional)
-        self.run_script("PreTherm",results)
+        with self.profiler("PreTherm"):
+            self.run_script("PreTherm",results)
         results.set("MinEnergy",self.get_energy())
         
         # establish temperature time average and thermalize
-        pre_therm_hp = self.extract_fix("pafi",size=4)
         steps = parameters("ThermSteps")
         ave_steps = parameters("ThermWindow")
+        if warm:
+            steps = min(steps,parameters("WarmThermSteps"))
+            ave_steps = min(steps,ave_steps)
+        if parameters("WarmStart"):
+            results.set("WarmStart",warm)
         f_T = "c_pe" if overdamped==1 else "c_thermo_temp"
-        self.run_commands(f"""
-            reset_timestep 0
-            fix __ae all ave/time 1 {ave_steps} {steps} {f_T}
-            run {steps}
-        """)
+        # time-averaging fixes are defined after reset_timestep
+        self.run_commands("reset_timestep 0")
+        self.session.fix("__ae",f"all ave/time 1 {ave_steps} {steps} {f_T}")
+        with self.profiler("Therm"):
+            self.session.run(f"run {steps}")
         sampleT = self.extract_fix("__ae")
         
         if overdamped==1:
             sampleT = (sampleT-results("MinEnergy"))/1.5/n_atoms/self.kB
         results.set("preTemperature",sampleT)
-        self.run_commands(f"""
-            unfix __ae
-            run 0""")
+        self.session.unfix("__ae")
         
         # main sampling run
         steps = parameters("SampleSteps")
-        self.run_commands(f"""
-            reset_timestep 0
-            fix __ae all ave/time 1 {steps} {steps} {f_T}
-            """)
+        self.run_commands("reset_timestep 0")
+        self.session.fix("__ae",f"all ave/time 1 {steps} {steps} {f_T}")
         if parameters("PostDump"):
-            self.run_commands(f"""
-            fix pafiax all ave/atom 1 {steps} {steps} x y z
-            """)
+            self.session.fix("pafiax",f"all ave/atom 1 {steps} {steps} x y z")
         return results
     
     def standard_pafi_post_average(self,results:ResultsHolder)->ResultsHolder:
@@ -257,58 +351,75 @@ class PAFIWorker(LAMMPSWorker):
         parameters = lambda k: results(k) if results.has_key(k) else self.parameters(k)
         n_atoms = self.get_natoms()
         
-        # get final temperature
+        # get final temperature, checking the average is for this sample
+        steps = parameters("SampleSteps")
+        f_T = "c_pe" if parameters("OverDamped")==1 else "c_thermo_temp"
+        self.session.check("__ae",f"all ave/time 1 {steps} {steps} {f_T}")
         sampleT = self.extract_fix("__ae")
         if parameters("OverDamped")==1:
             sampleT = (sampleT-results("MinEnergy"))/1.5/n_atoms/self.kB
         results.set("postTemperature",sampleT)
-        self.run_commands(f"""
-            unfix __ae
-            run 0""")
+        self.session.unfix("__ae")
+        
+        # store thermalized state for next sample (optional)
+        if parameters("WarmStart"):
+            self.store_warm_state(results("ReactionCoordinate"),
+                                  results("Temperature"))
         
         # average positions
         if parameters("PostDump"):
-            dx = self.gather("f_pafiax",type=1,count=3)
-            dx[:,0] -= self.gather("f_ux",type=1,count=1).flatten()
-            dx[:,1] -= self.gather("f_uy",type=1,count=1).flatten()
-            dx[:,2] -= self.gather("f_uz",type=1,count=1).flatten()
-            dx = self.pbc(dx)
-            results.set("MaxDev",np.linalg.norm(dx,axis=1).max())
-            results.set("Dev",dx.copy())
-            del dx
-            self.run_commands("unfix pafiax")
+            with self.profiler("PostDump"):
+                self.post_dump(results)
         
         # minimize to test for MaxJump
         if parameters("PostMin"):
             min_steps = parameters("MinSteps")
         else:
             min_steps = 1
-        self.run_commands(f"""
-            min_style fire
-            minimize 0 0.0001 {min_steps} {min_steps}
-        """)
-        self.change_x += self.gather("x",1,3)
-        results.set("MaxJump",self.pbc_dist(self.change_x,axis=1).max())
+        with self.profiler("PostMin"):
+            self.session.run(f"""
+                min_style fire
+                minimize 0 0.0001 {min_steps} {min_steps}
+            """)
+            ids, (x, x0) = self.extract_local([("x",3),("f___pafix0",3)])
+            max_jump = self.pbc_dist(x-x0,axis=1).max(initial=0.0)
+        results.set("MaxJump",self.comm.allreduce(max_jump,op=MPI.MAX))
         results.set("Valid",bool(results("MaxJump")<parameters("MaxJumpThresh")))
-        del self.change_x
+        self.session.unfix("__pafix0")
+        del x, x0
         # unfix hyperplane
-        self.run_commands("unfix pafi")
-        self.run_script("PostRun",results)
-        # rescale back.... not sure if this is required
-        r = results("ReactionCoordinate")
-        self.initialize_hyperplane(r,0.0)
+        self.session.unfix("pafi")
+        with self.profiler("PostRun"):
+            self.run_script("PostRun",results)
+            # rescale back.... not sure if this is required
+            r = results("ReactionCoordinate")
+            self.initialize_hyperplane(r,0.0)
         return results
-  
-            
-
-
-
-        
-
-
-
-
-
-        
-
+    
+    def post_dump(self,results:ResultsHolder)->None:
+        """Extract the average deviation from the pathway, `MaxDev`,
+        and `Dev`, or the reference `DevFile`,`DevIndex` if `WriteDev==1`
 
+        Parameters
+        ----------
+        results : ResultsHolder instance
+            results of the sample
+        """
+        # local atoms only, see extract_local()
+        ids, (dx, ux, uy, uz) = self.extract_local([("f_pafiax",3),
+                                ("d_ux",1),("d_uy",1),("d_uz",1)])
+        dx = self.pbc(dx - np.hstack((ux,uy,uz)))
+        max_dev = np.linalg.norm(dx,axis=1).max(initial=0.0)
+        results.set("MaxDev",self.comm.allreduce(max_dev,op=MPI.MAX))
+        # Dev is collected on the worker root only
+        dx = self.gather_root(ids,dx)
+        if self.local_rank==0:
+            if self.parameters("WriteDev"):
+                # only a reference to the on-disk store is kept in results
+                dev_file, dev_index = self.dev_store().write(dx)
+                results.set("DevFile",dev_file)
+                results.set("DevIndex",dev_index)
+            else:
+                results.set("Dev",dx)
+        del dx, ux, uy, uz
+        self.session.unfix("pafiax")
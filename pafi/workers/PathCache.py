@@ -0,0 +1,139 @@
+import os
+import shutil
+import hashlib
+import numpy as np
+from typing import List, Tuple
+
+class PathCache:
+    def __init__(self,folder:os.PathLike[str])->None:
+        """On-disk cache of the splined pathway. Each entry is a directory
+        `pafi_path_[key]` of .npy files, holding the knot positions
+        `r_dist`, the unwrapped configurations `X` and the CubicSpline
+        coefficients `c`, which are memory-mapped by load()
+
+        Parameters
+        ----------
+        folder : os.PathLike[str]
+            cache directory, created if not present
+
+        Methods
+        ----------
+        key()
+        has()
+        load()
+        write()
+        """
+        self.folder = folder
+
+    def key(self,paths:List[os.PathLike[str]],real_mep_dist:int,bc:str,
+            cell:None|np.ndarray,periodicity:None|np.ndarray)->str:
+        """Hash of all inputs of BaseWorker.make_path()
+
+        Parameters
+        ----------
+        paths : List[os.PathLike[str]]
+            pathway configuration files, whose content is hashed
+        real_mep_dist : int
+            `RealMEPDist` parameter
+        bc : str
+            `CubicSplineBoundaryConditions` parameter
+        cell : None or np.ndarray, shape (3,3)
+            supercell
+        periodicity : None or np.ndarray, shape (3,)
+            periodic boundary conditions
+
+        Returns
+        -------
+        str
+            the key
+        """
+        h = hashlib.sha256()
+        for p in paths:
+            with open(p,'rb') as f:
+                for block in iter(lambda: f.read(1<<20),b''):
+                    h.update(block)
+        h.update(f"{int(real_mep_dist)} {bc}".encode())
+        if not cell is None:
+            h.update(np.asarray(cell,dtype=np.float64).tobytes())
+        if not periodicity is None:
+            h.update(np.asarray(periodicity,dtype=bool).tobytes())
+        return h.hexdigest()[:32]
+
+    def path(self,key:str)->str:
+        """Directory of a cache entry
+
+        Parameters
+        ----------
+        key : str
+            from key()
+
+        Returns
+        -------
+        str
+            the path
+        """
+        return os.path.join(self.folder,f"pafi_path_{key}")
+
+    def has(self,key:str)->bool:
+        """Check if a complete cache entry exists
+
+        Parameters
+        ----------
+        key : str
+            from key()
+
+        Returns
+        -------
+        bool
+            True if present
+        """
+        return all(os.path.exists(os.path.join(self.path(key),f"{n}.npy")) \
+                   for n in ["r_dist","X","c"])
+
+    def load(self,key:str)->Tuple[np.ndarray,np.ndarray]:
+        """Memory-map a cache entry, read-only
+
+        Parameters
+        ----------
+        key : str
+            from key()
+
+        Returns
+        -------
+        Tuple[np.ndarray,np.ndarray]
+            knot positions, shape (nknots,) and
+            spline coefficients, shape (4,nknots-1,3*natoms)
+        """
+        path = self.path(key)
+        r_dist = np.load(os.path.join(path,"r_dist.npy"))
+        c = np.load(os.path.join(path,"c.npy"),mmap_mode='r')
+        return r_dist, c
+
+    def write(self,key:str,r_dist:np.ndarray,
+              X:np.ndarray,c:np.ndarray)->None:
+        """Write a cache entry. Files are written to a temporary
+        directory, which is then renamed, such that concurrent
+        runs never read an incomplete entry
+
+        Parameters
+        ----------
+        key : str
+            from key()
+        r_dist : np.ndarray, shape (nknots,)
+            knot positions
+        X : np.ndarray, shape (nknots,3*natoms)
+            unwrapped configurations
+        c : np.ndarray, shape (4,nknots-1,3*natoms)
+            spline coefficients
+        """
+        os.makedirs(self.folder,exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp_path,exist_ok=True)
+        for name,data in zip(["r_dist","X","c"],[r_dist,X,c]):
+            np.save(os.path.join(tmp_path,f"{name}.npy"),np.asarray(data))
+        try:
+            os.rename(tmp_path,path)
+        except OSError:
+            # written by another run
+            shutil.rmtree(tmp_path,ignore_errors=True)
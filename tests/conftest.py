@@ -0,0 +1,65 @@
+import os
+import sys
+import glob
+import shutil
+import subprocess
+import pytest
+import mpi4py
+# MPI is only initialized in the runs launched by mpirun
+mpi4py.rc.initialize = False
+mpi4py.rc.finalize = False
+sys.path.insert(1,os.path.join(os.path.dirname(__file__),'..'))
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+@pytest.fixture
+def mpirun(tmp_path):
+    """Run a script in tests/ under mpirun in `tmp_path`, with 
+    `python -m mpi4py` such that an exception on any rank aborts the 
+    run. The launcher is set by `PAFI_MPIRUN`, by default `mpirun`. 
+    Returns a function which returns the output of the run, 
+    asserting it succeeded if `check`, else failed
+    """
+    launcher = os.environ.get("PAFI_MPIRUN","mpirun")
+    if shutil.which(launcher) is None:
+        pytest.skip(f"{launcher} not found")
+    env = dict(os.environ)
+    env.setdefault("OMPI_ALLOW_RUN_AS_ROOT","1")
+    env.setdefault("OMPI_ALLOW_RUN_AS_ROOT_CONFIRM","1")
+    env.setdefault("OMPI_MCA_rmaps_base_oversubscribe","1")
+
+    def run(script:str,nprocs:int=1,args:list=[],check:bool=True)->str:
+        command = [launcher,"-np",str(nprocs),sys.executable,"-m","mpi4py",
+                   os.path.join(TESTS,script)] + [str(a) for a in args]
+        result = subprocess.run(command,env=env,capture_output=True,
+                                text=True,timeout=300,cwd=tmp_path)
+        output = result.stdout+result.stderr
+        if check:
+            assert result.returncode==0, output
+        else:
+            assert result.returncode!=0, output
+        return output
+    return run
+
+@pytest.fixture
+def run_pafi(mpirun,tmp_path):
+    """Run PAFIManager under mpirun with a LAMMPS-free worker,
+    see mpi_run.py. Returns a function which returns the path to the CSV
+    output of the run, in `DumpFolder`, by default `tmp_path`/dumps,
+    or the output of the run if `check` is False or `output` is True
+    """
+    def run(nprocs:int=1,check:bool=True,output:bool=False,
+            **parameters)->str:
+        parameters.setdefault("DumpFolder",str(tmp_path/"dumps"))
+        parameters.setdefault("MockCost",0.0)
+        os.makedirs(parameters["DumpFolder"],exist_ok=True)
+        args = []
+        for k,v in parameters.items():
+            args += [k,repr(v) if not isinstance(v,str) else v]
+        run_output = mpirun("mpi_run.py",nprocs=nprocs,args=args,check=check)
+        if output or not check:
+            return run_output
+        csv_files = glob.glob(os.path.join(parameters["DumpFolder"],
+                                           "pafi_data_*.csv"))
+        return max(csv_files,key=lambda f:int(f.split("_")[-1][:-4]))
+    return run
@@ -0,0 +1,78 @@
+"""Checks of PAFIWorker which need LAMMPS, run by test_lammps.py, e.g.
+
+mpirun -np 2 python -m mpi4py mpi_lammps.py scatter
+
+`scatter`: the pathway written to LAMMPS with LocalScatter=1 and 
+LocalScatter=0, printing the maximum difference as `MAXDIFF`
+`reader`: the pathway spline with NativePathReader=1 and 
+NativePathReader=0, printing the maximum difference as `MAXDIFF`
+`scatter_root`: velocities written from the worker root with and 
+without local access, printing the maximum error as `MAXDIFF`
+"""
+import os
+import sys
+import numpy as np
+from mpi4py import MPI
+sys.path.insert(1,os.path.join(os.path.dirname(__file__),'..'))
+from pafi import PAFIParser
+from pafi.workers.PAFIWorker import PAFIWorker
+
+SYSTEM = os.path.join(os.path.dirname(__file__),'..',
+                      'examples','systems','EAM-SIA-Fe')
+PATH_DATA = ["d_ux","d_uy","d_uz","d_nx","d_ny","d_nz","d_dnx","d_dny","d_dnz"]
+
+def make_worker(world:MPI.Intracomm,**kwargs)->PAFIWorker:
+    parameters = PAFIParser(rank=world.Get_rank())
+    parameters.set_pathway(os.path.join(SYSTEM,"image_*.dat"))
+    parameters.set_potential(os.path.join(SYSTEM,"Fe.eam.fs"))
+    for k,v in kwargs.items():
+        parameters.set(k,v)
+    worker = PAFIWorker(world,parameters,0,world.Get_rank(),[0],world)
+    assert not worker.has_errors, worker.last_error_message
+    return worker
+
+def path_data(worker:PAFIWorker,r:float)->np.ndarray:
+    """Positions and pathway data in LAMMPS, ordered by atom ID"""
+    worker.initialize_hyperplane(r,0.0)
+    data = [worker.gather("x",1,3)]
+    data += [worker.gather(name,1,1) for name in PATH_DATA]
+    return np.hstack(data+[[[worker.norm_t]]*data[0].shape[0]])
+
+world = MPI.COMM_WORLD
+check = sys.argv[1]
+if check=="scatter":
+    worker = make_worker(world,LocalScatter=1)
+    max_diff = 0.0
+    for r in [0.1,0.5,0.9]:
+        worker.local_scatter = True
+        local = path_data(worker,r)
+        assert worker.local_scatter, "LocalScatter fell back to scatter()"
+        worker.local_scatter = False
+        max_diff = max(max_diff,np.abs(local-path_data(worker,r)).max())
+    worker.close()
+    if world.Get_rank()==0:
+        print(f"MAXDIFF {max_diff:.6e}")
+elif check=="reader":
+    worker = make_worker(world,NativePathReader=0)
+    c = worker.Spline_X.c.copy()
+    worker.parameters.set("NativePathReader",1)
+    worker.make_path()
+    max_diff = np.abs(worker.Spline_X.c-c).max()
+    worker.close()
+    if world.Get_rank()==0:
+        print(f"MAXDIFF {max_diff:.6e}")
+elif check=="scatter_root":
+    worker = make_worker(world,LocalScatter=1)
+    worker.initialize_hyperplane(0.5,0.0)
+    # identical on all ranks, though only used on the root
+    v = np.random.default_rng(5).normal(size=(worker.get_natoms(),3))
+    max_diff = 0.0
+    for local_scatter in [True,False]:
+        worker.local_scatter = local_scatter
+        worker.scatter_root("v",v if world.Get_rank()==0 else None)
+        assert worker.local_scatter==local_scatter
+        max_diff = max(max_diff,np.abs(worker.gather("v",1,3)-v).max())
+        v = 2.0*v
+    worker.close()
+    if world.Get_rank()==0:
+        print(f"MAXDIFF {max_diff:.6e}")
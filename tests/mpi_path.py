@@ -0,0 +1,108 @@
+"""Checks of the pathway spline of BaseWorker, without LAMMPS, run by 
+test_path.py, e.g.
+
+mpirun -np 3 python -m mpi4py mpi_path.py shared
+
+`shared`: the spline with SharedPath=1 and SharedPath=0, from configurations
+read with NativePathReader=1, printing the maximum difference as `MAXDIFF`
+`cache`: the spline with PathCache, which is written on a miss and 
+memory-mapped on a hit, only when the configurations and RealMEPDist are
+unchanged, printing the maximum difference to the uncached spline as `MAXDIFF`
+"""
+import os
+import sys
+import shutil
+import numpy as np
+from mpi4py import MPI
+sys.path.insert(1,os.path.join(os.path.dirname(__file__),'..'))
+from pafi import PAFIParser
+from pafi.workers.BaseWorker import BaseWorker
+
+SYSTEM = os.path.join(os.path.dirname(__file__),'..',
+                      'examples','systems','EAM-VAC-W')
+
+def make_worker(world:MPI.Intracomm,**kwargs)->BaseWorker:
+    parameters = PAFIParser(rank=world.Get_rank())
+    parameters.set_pathway(os.path.join(SYSTEM,"image_*.dat"))
+    parameters.set_potential(os.path.join(SYSTEM,"image_0.dat"))
+    for k,v in kwargs.items():
+        parameters.set(k,v)
+    # one worker per rank, all sharing a node
+    comm = world.Split(world.Get_rank(),0)
+    worker = BaseWorker(comm,parameters,world.Get_rank(),
+                        world.Get_rank(),list(range(world.Get_size())),world)
+    # orthogonal cell of image_0.dat, as from LAMMPSWorker.get_cell_data()
+    worker.Cell = 15.927565*np.eye(3)
+    worker.invCell = np.linalg.inv(worker.Cell)
+    worker.Periodicity = np.ones(3,bool)
+    worker.has_cell_data = True
+    return worker
+
+world = MPI.COMM_WORLD
+check = sys.argv[1]
+if check=="shared":
+    shared = make_worker(world,NativePathReader=1,SharedPath=1)
+    shared.make_path()
+    private = make_worker(world,NativePathReader=1,SharedPath=0)
+    private.make_path()
+    assert not shared.spline_window is None
+    assert private.spline_window is None
+    max_diff = np.abs(shared.Spline_X.c-private.Spline_X.c).max()
+    for r in [0.0,0.25,0.61,1.0]:
+        for f_s,f_p in zip(shared.path_frame(r),private.path_frame(r)):
+            max_diff = max(max_diff,np.abs(f_s-f_p).max())
+    max_diff = world.allreduce(max_diff,op=MPI.MAX)
+    shared.close()
+    private.close()
+    if world.Get_rank()==0:
+        print(f"MAXDIFF {max_diff:.6e}")
+elif check=="cache":
+    def cached_worker(**kwargs)->BaseWorker:
+        worker = make_worker(world,NativePathReader=1,PathCache="cache",
+                             **kwargs)
+        worker.make_path()
+        return worker
+    def mapped(worker:BaseWorker)->bool:
+        return isinstance(worker.Spline_X.c.base,np.memmap)
+    def entries()->int:
+        return len([d for d in os.listdir("cache") if d.startswith("pafi_")])
+    if world.Get_rank()==0:
+        shutil.rmtree("cache",ignore_errors=True)
+    world.Barrier()
+    max_diff = 0.0
+    for real_mep_dist in [1,0]:
+        private = make_worker(world,NativePathReader=1,
+                              RealMEPDist=real_mep_dist)
+        private.make_path()
+        # miss, written by the first rank
+        miss = cached_worker(RealMEPDist=real_mep_dist)
+        assert not mapped(miss)
+        world.Barrier()
+        assert entries()==2-real_mep_dist
+        # hit, on all ranks
+        hit = cached_worker(RealMEPDist=real_mep_dist)
+        assert mapped(hit)
+        assert entries()==2-real_mep_dist
+        for worker in [miss,hit]:
+            max_diff = max(max_diff,
+                           np.abs(worker.r_dist-private.r_dist).max(),
+                           np.abs(worker.Spline_X.c-private.Spline_X.c).max())
+        for worker in [private,miss,hit]:
+            worker.close()
+    # a change of configuration is a miss
+    if world.Get_rank()==0:
+        with open(os.path.join(SYSTEM,"image_0.dat"),'r') as f:
+            config = f.read()
+        with open("image_0.dat",'w') as f:
+            f.write(config.replace("Atoms","Atoms ",1))
+    world.Barrier()
+    changed = make_worker(world,NativePathReader=1,PathCache="cache")
+    changed.parameters.PathwayConfigurations[0] = "image_0.dat"
+    changed.make_path()
+    assert not mapped(changed)
+    world.Barrier()
+    assert entries()==3
+    changed.close()
+    max_diff = world.allreduce(max_diff,op=MPI.MAX)
+    if world.Get_rank()==0:
+        print(f"MAXDIFF {max_diff:.6e}")
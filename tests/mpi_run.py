@@ -0,0 +1,51 @@
+"""Run PAFIManager with a LAMMPS-free worker, for the test suite.
+Launched by the `run_pafi` fixture, see conftest.py, e.g.
+
+mpirun -np 4 python -m mpi4py mpi_run.py DumpFolder /tmp/dumps Worker Mock \
+    nRepeats 2 TaskFarm 1
+
+Each pair of arguments sets a parameter, with values parsed as
+Python literals where possible. `Worker` (Mock or Model), 
+`Planes` (number of hyperplanes), `Temperatures` and `Restart` 
+are used here and not passed to PAFIParser.
+"""
+import os
+import sys
+import ast
+import numpy as np
+from mpi4py import MPI
+sys.path.insert(1,os.path.join(os.path.dirname(__file__),'..'))
+from pafi import PAFIManager,PAFIParser,MockWorker,ModelWorker
+
+SYSTEM = os.path.join(os.path.dirname(__file__),'..',
+                      'examples','systems','EAM-VAC-W')
+
+def literal(value:str):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError,SyntaxError):
+        return value
+
+world = MPI.COMM_WORLD
+args = dict(zip(sys.argv[1::2],map(literal,sys.argv[2::2])))
+Worker = {"Mock":MockWorker,"Model":ModelWorker}[args.pop("Worker","Mock")]
+n_planes = args.pop("Planes",5)
+temperatures = args.pop("Temperatures",[100.])
+restart_data = args.pop("Restart",None)
+
+parameters = PAFIParser(rank=world.Get_rank())
+for k,v in args.items():
+    parameters.set(k,v,create=True)
+if Worker is ModelWorker:
+    ModelWorker.write_pathway(parameters,
+        os.path.join(parameters("DumpFolder"),"pathway"))
+else:
+    parameters.set_pathway(os.path.join(SYSTEM,"image_*.dat"))
+    parameters.set_potential(os.path.join(SYSTEM,"image_0.dat"))
+parameters.axes["Temperature"] = list(temperatures)
+parameters.axes["ReactionCoordinate"] = np.linspace(0.,1.,n_planes)
+
+manager = PAFIManager(world,parameters=parameters,
+                      restart_data=restart_data,Worker=Worker)
+manager.run()
+manager.close()
@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import pandas as pd
+from pafi import ResultsProcessor
+
+def test_columnar_checkpoint_run(run_pafi):
+    """ColumnarOutput and CheckpointInterval write .npz files
+    alongside the CSV, in lockstep and task farm modes"""
+    for TaskFarm in [0,1]:
+        csv_file = run_pafi(nprocs=3,nRepeats=2,ColumnarOutput=1,
+                            CheckpointInterval=1,TaskFarm=TaskFarm)
+        suffix = csv_file.split("_")[-1][:-4]
+        dump_folder = os.path.dirname(csv_file)
+        assert os.path.exists(os.path.splitext(csv_file)[0]+".npz")
+        assert os.path.exists(os.path.join(dump_folder,
+                                           f"pafi_checkpoint_{suffix}.npz"))
+
+def test_columnar_checkpoint_values(run_pafi):
+    """Columnar output and checkpoint, read with ResultsProcessor, 
+    match the CSV output. Checkpoints also hold the pickled `Dev`"""
+    csv_file = run_pafi(nprocs=3,nRepeats=2,ColumnarOutput=1,
+                        CheckpointInterval=1,PostDump=1)
+    suffix = csv_file.split("_")[-1][:-4]
+    checkpoint = os.path.join(os.path.dirname(csv_file),
+                              f"pafi_checkpoint_{suffix}.npz")
+    csv_data = ResultsProcessor(csv_file).data
+    with np.load(checkpoint,allow_pickle=True) as npz_data:
+        assert npz_data["Dev"].shape==(len(csv_data),)
+    for npz_file in [os.path.splitext(csv_file)[0]+".npz",checkpoint]:
+        npz_data = ResultsProcessor(npz_file).data
+        assert "Dev" not in npz_data
+        assert len(npz_data)==len(csv_data)
+        for k in npz_data.keys():
+            if k!=ResultsProcessor.SOURCE_KEY:
+                assert np.allclose(npz_data[k],csv_data[k],rtol=1e-12), k
+
+def test_columnar_restart(run_pafi,tmp_path):
+    """Missing values after a restart with different fields are NaN 
+    in columnar output, see BaseGatherer.schema()"""
+    data = pd.read_csv(run_pafi(nprocs=2),index_col=0)
+    data = data[data.ReactionCoordinate<0.6].drop(columns=["Valid"])
+    data.to_csv(tmp_path/"partial.csv")
+    csv_file = run_pafi(nprocs=2,ColumnarOutput=1,
+                        Restart=str(tmp_path/"partial.csv"))
+    npz_data = ResultsProcessor(os.path.splitext(csv_file)[0]+".npz").data
+    assert npz_data.Valid.dtype==np.float64
+    assert npz_data.Valid.isna().sum()==len(data)
+    assert np.allclose(npz_data.FreeEnergyGradient,
+                       pd.read_csv(csv_file,index_col=0).FreeEnergyGradient)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from pafi.parsers.LAMMPSDataReader import read_data_positions,\
+    write_data_positions
+
+HEADER = """LAMMPS data file
+
+4 atoms
+1 atom types
+
+0.0 10.0 xlo xhi
+0.0 10.0 ylo yhi
+0.0 10.0 zlo zhi
+
+Masses
+
+1 55.845
+
+"""
+X = np.array([[0.5,1.0,1.5],[2.0,2.5,3.0],[9.5,0.1,4.0],[5.0,6.0,7.0]])
+
+def write(path,style:str,columns:str)->None:
+    """Atoms in the order of IDs 3,1,4,2, with image flags"""
+    lines = [f"{i+1} {columns} {X[i][0]} {X[i][1]} {X[i][2]} {i-1} 1 -2" \
+             for i in [2,0,3,1]]
+    with open(path,'w') as f:
+        f.write(HEADER+f"Atoms # {style}\n\n"+"\n".join(lines)+"\n")
+
+def test_unsorted_ids_image_flags(tmp_path):
+    """Positions are ordered by ID and image flags are not applied,
+    as for LAMMPSWorker.gather("x") with atoms inside the box"""
+    write(tmp_path/"atomic.dat","atomic","1")
+    assert np.allclose(read_data_positions(tmp_path/"atomic.dat"),X)
+    write(tmp_path/"full.dat","full","1 1 0.0")
+    assert np.allclose(read_data_positions(tmp_path/"full.dat"),X)
+
+def test_missing_atoms(tmp_path):
+    write(tmp_path/"atomic.dat","atomic","1")
+    with open(tmp_path/"atomic.dat") as f:
+        lines = f.readlines()
+    with open(tmp_path/"short.dat",'w') as f:
+        f.writelines(lines[:-2])
+    with pytest.raises(ValueError):
+        read_data_positions(tmp_path/"short.dat")
+
+def test_write_read(tmp_path):
+    write_data_positions(tmp_path/"path.dat",X,cell=10.0*np.eye(3))
+    assert np.allclose(read_data_positions(tmp_path/"path.dat"),X)
@@ -0,0 +1,24 @@
+import importlib.util
+import pytest
+
+pytestmark = pytest.mark.skipif(importlib.util.find_spec("lammps") is None,
+                                reason="LAMMPS python module not found")
+
+def max_diff(output:str)->float:
+    return float(output.split("MAXDIFF")[-1].split()[0])
+
+def test_local_scatter(mpirun):
+    """LocalScatter=1 writes the same pathway as scatter()"""
+    for nprocs in [1,2]:
+        assert max_diff(mpirun("mpi_lammps.py",nprocs=nprocs,
+                               args=["scatter"]))<1e-10
+
+def test_native_path_reader(mpirun):
+    """NativePathReader=1 gives the same spline as read_data in LAMMPS"""
+    assert max_diff(mpirun("mpi_lammps.py",nprocs=2,args=["reader"]))<1e-8
+
+def test_scatter_root(mpirun):
+    """scatter_root() writes data from the worker root to every rank"""
+    for nprocs in [1,3]:
+        assert max_diff(mpirun("mpi_lammps.py",nprocs=nprocs,
+                               args=["scatter_root"]))==0.0
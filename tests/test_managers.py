@@ -0,0 +1,52 @@
+import pandas as pd
+
+def samples(csv_file:str)->pd.Series:
+    """Number of samples of each (plane,repeat)"""
+    data = pd.read_csv(csv_file,index_col=0)
+    return data.groupby(["ReactionCoordinate","Repeat"]).size()
+
+def test_lockstep_task_farm(run_pafi,tmp_path):
+    """Lockstep and task farm runs make the same samples, nWorkers for 
+    each (plane,repeat), though the first task farm worker coordinates"""
+    lockstep = samples(run_pafi(nprocs=3,nRepeats=2,
+                                DumpFolder=str(tmp_path/"lockstep")))
+    task_farm = samples(run_pafi(nprocs=3,nRepeats=2,TaskFarm=1,
+                                 DumpFolder=str(tmp_path/"task_farm")))
+    assert len(lockstep)==10
+    assert (lockstep==3).all()
+    pd.testing.assert_series_equal(lockstep,task_farm)
+
+def test_task_farm_cores(run_pafi):
+    """With CoresPerWorker>1 the task farm coordinator has one core,
+    here giving worker sizes [1,2,2]"""
+    counts = samples(run_pafi(nprocs=5,CoresPerWorker=2,TaskFarm=1))
+    assert len(counts)==5
+    assert (counts==3).all()
+
+def test_resampling(run_pafi,tmp_path):
+    """Planes with too few valid samples are resampled, 
+    up to maxExtraRepeats times"""
+    for TaskFarm in [0,1]:
+        counts = samples(run_pafi(nprocs=3,TaskFarm=TaskFarm,MockInvalid=1.0,
+                                  maxExtraRepeats=2,
+                                  DumpFolder=str(tmp_path/f"{TaskFarm}")))
+        assert len(counts)==15
+        assert (counts==3).all()
+        assert set(counts.index.get_level_values("Repeat"))=={1,2,3}
+
+def test_worker_sizes(run_pafi,tmp_path):
+    """Workers of different sizes each sample every (plane,repeat)"""
+    for sizes in ["1 2","2 1"]:
+        counts = samples(run_pafi(nprocs=3,WorkerSizes=sizes,
+                                  DumpFolder=str(tmp_path/sizes[0])))
+        assert len(counts)==5
+        assert (counts==2).all()
+
+def test_worker_sizes_errors(run_pafi):
+    """WorkerSizes must sum to the number of cores and cannot be used 
+    with the task farm"""
+    output = run_pafi(nprocs=3,check=False,WorkerSizes="2 2")
+    assert "WorkerSizes=[2, 2] requests 4 cores, but 3 are available" \
+        in output
+    output = run_pafi(nprocs=3,check=False,WorkerSizes="1 2",TaskFarm=1)
+    assert "WorkerSizes=[1, 2] cannot be used with TaskFarm=1" in output
@@ -0,0 +1,70 @@
+import os
+import pytest
+from pafi import PAFIParser
+from pafi.parsers.ScriptTemplate import ScriptTemplate
+
+SYSTEM = os.path.join(os.path.dirname(__file__),'..',
+                      'examples','systems','EAM-VAC-W')
+
+SCRIPT = """fix ae all ave/time 1 %Steps% %Steps% c_pe
+run %Steps%
+velocity all create %Temperature% %Seed%%Seed% mom yes
+variable f equal 50%
+print "%not a key% %ReactionCoordinate%"
+"""
+
+def replace(script:str,values:dict)->str:
+    """Baseline parse_script(), one str.replace() per argument"""
+    for k,v in values.items():
+        script = script.replace("%"+k+"%",str(v))
+    return script
+
+@pytest.mark.parametrize("values",[
+    {"Steps":100,"Temperature":300.0,"Seed":7,"ReactionCoordinate":0.25},
+    {"Steps":100,"Temperature":300.0,"Seed":7},
+    {"Steps":"10","Seed":"a","Unused":1},
+    {},
+])
+def test_render(values):
+    """Repeated, adjacent and missing placeholders and a literal %
+    render as with str.replace()"""
+    template = ScriptTemplate(SCRIPT)
+    assert template.placeholders == \
+        {"Steps","Temperature","Seed","ReactionCoordinate"}
+    assert template.render(values) == replace(SCRIPT,values)
+
+def test_render_cache():
+    """The script is only rebuilt when a placeholder value changes"""
+    template = ScriptTemplate(SCRIPT)
+    values = {"Steps":100,"Temperature":300.0,"Seed":7}
+    first = template.render(values)
+    assert template.render(dict(values,Unused=2)) is first
+    assert "%ReactionCoordinate%" in first
+    values["Temperature"] = 400.0
+    second = template.render(values)
+    assert second == replace(SCRIPT,values)
+    assert not "300.0" in second
+    values["ReactionCoordinate"] = 0.5
+    assert template.render(values) == replace(SCRIPT,values)
+
+def test_parse_script(tmp_path,monkeypatch):
+    """parse_script() fills %FirstPathConfiguration% and %Potential%
+    and follows changes to the script and arguments"""
+    # PAFIParser creates the default DumpFolder
+    monkeypatch.chdir(tmp_path)
+    parameters = PAFIParser()
+    parameters.set_pathway(os.path.join(SYSTEM,"image_*.dat"))
+    parameters.set_potential(os.path.join(SYSTEM,"image_0.dat"))
+    script = parameters.parse_script("Input")
+    assert "read_data  "+parameters.PathwayConfigurations[0] in script
+    assert "pair_coeff * * "+parameters.PotentialLocation in script
+    assert not "%" in script
+
+    parameters.scripts["PreRun"] = "run %Steps%"
+    assert parameters.parse_script("PreRun",{"Steps":10}) == "run 10"
+    assert parameters.parse_script("PreRun",{"Steps":20}) == "run 20"
+    parameters.scripts["PreRun"] = "minimize 0 0 %Steps% %Steps%"
+    assert parameters.parse_script("PreRun",{"Steps":20}) == \
+        "minimize 0 0 20 20"
+    # not a script key, treated as a script
+    assert parameters.parse_script("run %Steps%",{"Steps":5}) == "run 5"
@@ -0,0 +1,58 @@
+import numpy as np
+from scipy.interpolate import CubicSpline
+from pafi.workers.BaseWorker import BaseWorker
+
+def max_diff(output:str)->float:
+    return float(output.split("MAXDIFF")[-1].split()[0])
+
+def test_shared_path(mpirun):
+    """The spline in shared memory matches a private copy on every rank"""
+    for nprocs in [1,3]:
+        assert max_diff(mpirun("mpi_path.py",nprocs=nprocs,
+                               args=["shared"]))==0.0
+
+def test_path_cache(mpirun):
+    """PathCache is hit only for unchanged configurations and RealMEPDist, 
+    and gives the uncached spline"""
+    for nprocs in [1,3]:
+        assert max_diff(mpirun("mpi_path.py",nprocs=nprocs,
+                               args=["cache"]))==0.0
+
+def spline_worker(bc:str="not-a-knot")->BaseWorker:
+    """BaseWorker with a spline through random knots, without MPI"""
+    rng = np.random.default_rng(11)
+    r_dist = np.append(0.,np.cumsum(rng.uniform(0.5,1.5,6)))
+    r_dist /= r_dist[-1]
+    worker = BaseWorker.__new__(BaseWorker)
+    worker.Spline_X = CubicSpline(r_dist,rng.normal(size=(7,3*5)),
+                                  axis=0,bc_type=bc)
+    worker.path_table = {}
+    return worker
+
+def test_path_frame():
+    """path_frame() evaluates the spline and its first two derivatives,
+    as CubicSpline, at knots, ends and between knots"""
+    scale = np.array([1.01,0.99,1.02])
+    for bc in ["not-a-knot","natural","clamped"]:
+        worker = spline_worker(bc)
+        for r in np.append(worker.Spline_X.x,[0.03,0.37,0.5,0.91]):
+            frame = worker.path_frame(r,scale=scale)
+            for nu in [0,1,2]:
+                X = worker.Spline_X(r,nu=nu).reshape((-1,3))*scale
+                assert np.allclose(frame[nu],X,rtol=1e-12,atol=1e-12)
+                assert np.allclose(worker.pathway(r,nu=nu,scale=scale),X,
+                                   rtol=1e-12,atol=1e-12)
+
+def test_path_frame_atoms_table():
+    """path_frame() for a subset of atoms, and from the path table"""
+    worker = spline_worker()
+    atoms = np.array([4,0,2])
+    for r in [0.0,0.37,1.0]:
+        frame = worker.path_frame(r)
+        for X,X_atoms in zip(frame,worker.path_frame(r,atoms=atoms)):
+            assert np.allclose(X[atoms],X_atoms,rtol=1e-12,atol=1e-12)
+        worker.path_table[worker.path_key(r)] = worker.path_frame(r)
+        for X,X_table in zip(frame,worker.path_frame(r,scale=2.0,nus=(0,1,2))):
+            assert np.allclose(2.0*X,X_table,rtol=1e-12,atol=1e-12)
+        # table entries are not modified by scaling
+        assert np.allclose(worker.path_table[worker.path_key(r)][0],frame[0])
@@ -0,0 +1,49 @@
+import glob
+import numpy as np
+import pandas as pd
+
+def test_restart_partial_csv(run_pafi,tmp_path):
+    """Restart from part of a run with different fields, here without 
+    `Time*` fields or `avePsi` and with an extra `Source` field"""
+    full = pd.read_csv(run_pafi(nprocs=2,nRepeats=2),index_col=0)
+    assert len(full)==20
+    
+    partial = full[(full.Repeat==1) & (full.ReactionCoordinate<0.6)]
+    partial = partial.drop(columns=["avePsi"]).assign(Source="previous")
+    partial.to_csv(tmp_path/"partial.csv")
+    
+    data = pd.read_csv(run_pafi(nprocs=2,nRepeats=2,Profile=1,
+                                Restart=str(tmp_path/"partial.csv")),
+                       index_col=0)
+    assert len(data)==len(full)
+    assert (data.groupby(["ReactionCoordinate","Repeat"]).size()==2).all()
+    assert "avePsi" in data and "TimeSample" in data
+    restarted = data.Source=="previous"
+    assert restarted.sum()==len(partial)
+    assert data.loc[restarted,"avePsi"].isna().all()
+    assert data.loc[restarted,"TimeSample"].isna().all()
+    assert data.loc[~restarted,["avePsi","TimeSample"]].notna().all().all()
+    assert np.allclose(data.loc[restarted,"FreeEnergyGradient"],
+                       partial.FreeEnergyGradient)
+
+def test_restart_missing_fields(run_pafi,tmp_path):
+    """Restart data must contain the axes and `Repeat`"""
+    data = pd.read_csv(run_pafi(nprocs=1),index_col=0)
+    data.drop(columns=["Repeat"]).to_csv(tmp_path/"partial.csv")
+    output = run_pafi(nprocs=1,check=False,
+                      Restart=str(tmp_path/"partial.csv"))
+    assert "missing fields ['Repeat']" in output
+
+def test_restart_unmatched_axes(run_pafi,tmp_path):
+    """Restart data on other planes gives a warning and all planes 
+    are sampled"""
+    full = pd.read_csv(run_pafi(nprocs=2),index_col=0)
+    shifted = full.assign(ReactionCoordinate=full.ReactionCoordinate+1e-3)
+    shifted.to_csv(tmp_path/"shifted.csv")
+    output = run_pafi(nprocs=2,output=True,DumpFolder=str(tmp_path/"restart"),
+                      Restart=str(tmp_path/"shifted.csv"))
+    assert "10 samples" in output and "0 on the planes" in output
+    assert "WARNING: no sample" in output
+    data = pd.read_csv(glob.glob(str(tmp_path/"restart"/"pafi_data_*.csv"))[0],
+                       index_col=0)
+    assert len(data)==len(full)+len(shifted)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from pafi import ResultsProcessor
+
+def test_streaming_statistics(run_pafi,tmp_path):
+    """Statistics in `streaming` mode, merged over chunks and files,
+    agree with those of the data held in memory"""
+    for _ in range(2):
+        csv_file = run_pafi(nprocs=2,nRepeats=3,MockInvalid=0.3,
+                            ColumnarOutput=1,Temperatures=[100.,200.])
+    paths = [os.path.join(os.path.dirname(csv_file),"pafi_data_0.csv"),
+             os.path.join(os.path.dirname(csv_file),"pafi_data_1.npz")]
+    
+    in_memory = ResultsProcessor(paths)
+    streaming = ResultsProcessor(paths,streaming=True,chunksize=7)
+    assert list(in_memory.axes.items())==list(streaming.axes.items())
+    assert len(in_memory.data)==120
+    assert streaming.data is None
+    
+    ave = in_memory.ensemble_collate(return_pd=True)
+    stream_ave = streaming.ensemble_collate(return_pd=True)
+    assert list(ave.keys())==list(stream_ave.keys())
+    assert (ave.ValidCount==stream_ave.ValidCount).all()
+    assert ave.ValidCount.sum()==in_memory.data.Valid.sum()
+    for k in ave.keys():
+        assert np.allclose(ave[k],stream_ave[k],rtol=1e-9,atol=1e-9,
+                           equal_nan=True), k
+    
+    f = in_memory.integrate()
+    stream_f = streaming.integrate()
+    assert np.allclose(f.to_numpy(float),stream_f.to_numpy(float),
+                       rtol=1e-9,atol=1e-9,equal_nan=True)
+
+def field_statistics(data:pd.DataFrame)->tuple:
+    """Per-field count, mean and M2, grouped by `ReactionCoordinate`"""
+    groups = data.groupby(data.ReactionCoordinate.to_numpy())
+    count = groups.count()
+    return count, groups.mean(), groups.var(ddof=0)*count
+
+def test_merge_statistics_missing_values():
+    """Merged statistics use the count of each field, 
+    which differ if fields have missing values"""
+    rng = np.random.default_rng(7)
+    data = pd.DataFrame({"ReactionCoordinate":np.repeat([0.,0.5,1.],8),
+                         "F":rng.normal(size=24),"G":rng.normal(size=24)})
+    data.loc[rng.uniform(size=24)<0.4,"G"] = np.nan
+    data.loc[data.index[:8],"G"] = np.nan
+    
+    processor = ResultsProcessor.__new__(ResultsProcessor)
+    processor.fields = list(data.keys())
+    processor.statistics_data = None
+    for chunk in np.array_split(np.arange(24),5):
+        processor.merge_statistics(field_statistics(data.iloc[chunk]))
+    for merged,direct in zip(processor.statistics_data,
+                             field_statistics(data)):
+        assert np.allclose(merged.to_numpy(float),direct.to_numpy(float),
+                           rtol=1e-12,atol=1e-12,equal_nan=True)
+
+DATA = os.path.join(os.path.dirname(__file__),"data")
+
+def by_axes(data:pd.DataFrame)->pd.DataFrame:
+    """Rows sorted by axis values"""
+    return data.sort_values(["Temperature","ReactionCoordinate"],
+                            ignore_index=True)
+
+def test_ensemble_collate_baseline():
+    """ensemble_collate() gives the output of the original, 
+    point by point, implementation in data/ensemble_collate.csv"""
+    processor = ResultsProcessor(os.path.join(DATA,"pafi_data_0.csv"))
+    ave = by_axes(processor.ensemble_collate(return_pd=True))
+    baseline = by_axes(pd.read_csv(os.path.join(DATA,"ensemble_collate.csv"),
+                                   index_col=0))
+    for k in baseline.keys():
+        assert np.allclose(ave[k].to_numpy(float),baseline[k].to_numpy(float),
+                           rtol=1e-12,atol=1e-15), k
+
+def test_statistics_missing_values(tmp_path):
+    """Fields with missing values are averaged over their values only, 
+    and `Valid` is parsed, such that NaN or "False" are not valid"""
+    data = pd.read_csv(os.path.join(DATA,"pafi_data_0.csv"),index_col=0)
+    rng = np.random.default_rng(3)
+    data.loc[rng.uniform(size=len(data))<0.3,"dXTangent"] = np.nan
+    valid = data.Valid.astype(object)
+    valid[rng.uniform(size=len(data))<0.2] = np.nan
+    data["Valid"] = valid.map({True:"True",False:"False",np.nan:np.nan})
+    data.to_csv(tmp_path/"pafi_data_0.csv")
+    
+    ave = by_axes(ResultsProcessor(str(tmp_path/"pafi_data_0.csv"))\
+                  .ensemble_collate(return_pd=True))
+    data = data[data.Valid=="True"]
+    groups = data.groupby(["Temperature","ReactionCoordinate"])
+    assert (ave.ValidCount.to_numpy()==groups.size().to_numpy()).all()
+    for f in ["FreeEnergyGradient","dXTangent"]:
+        values = groups[f]
+        assert np.allclose(ave[f],values.mean(),rtol=1e-12)
+        assert np.allclose(ave[f+"_var"],values.var(ddof=0)/values.count(),
+                           rtol=1e-12)
+
+def test_expand_paths_source(tmp_path):
+    """Wildcards are expanded in sorted order, without duplicates or 
+    missing files, and rows are tagged with the suffix of their file"""
+    for suffix in ["12","3","lammps_7"]:
+        shutil.copy(os.path.join(DATA,"pafi_data_0.csv"),
+                    tmp_path/f"pafi_data_{suffix}.csv")
+    paths = [str(tmp_path/"pafi_data_3.csv"),str(tmp_path/"pafi_data_*.csv"),
+             str(tmp_path/"pafi_data_3.csv"),str(tmp_path/"pafi_data_5.csv"),
+             str(tmp_path/"none_*.csv")]
+    processor = ResultsProcessor(paths)
+    assert processor.expand_paths(paths) == \
+        [str(tmp_path/f"pafi_data_{s}.csv") for s in ["3","12","lammps_7"]]
+    assert processor.source(tmp_path/"pafi_data_lammps_7.csv") == "7"
+    assert processor.source("results.csv") == "results"
+    
+    n = len(pd.read_csv(os.path.join(DATA,"pafi_data_0.csv")))
+    assert len(processor.data)==3*n
+    assert list(processor.data.Source.unique())==["3","12","7"]
+    assert (processor.data.groupby("Source").size()==n).all()
+    assert not processor.SOURCE_KEY in processor.fields
+    
+    processor.append(str(tmp_path/"pafi_data_12.csv"))
+    assert (processor.data.Source=="12").sum()==2*n
+
+def test_integrate_baseline():
+    """integrate() gives the output of the original, point by point, 
+    implementation in data/integrate.csv"""
+    processor = ResultsProcessor(os.path.join(DATA,"pafi_data_0.csv"))
+    integrated = by_axes(processor.integrate())
+    baseline = by_axes(pd.read_csv(os.path.join(DATA,"integrate.csv"),
+                                   index_col=0))
+    assert len(integrated)==len(baseline)
+    for k in baseline.keys():
+        assert np.allclose(integrated[k].to_numpy(float),
+                           baseline[k].to_numpy(float),
+                           rtol=1e-10,atol=1e-14), k
@@ -0,0 +1,39 @@
+import os
+import numpy as np
+import pandas as pd
+
+def test_mock_dev_store(run_pafi):
+    """WriteDev stores `Dev` in a DevStore, see BaseWorker.dev_store()"""
+    csv_file = run_pafi(nprocs=2,PostDump=1,WriteDev=1)
+    data = pd.read_csv(csv_file,index_col=0)
+    assert len(data)==10
+    assert data.DevIndex.notna().all()
+    for dev_file in data.DevFile.unique():
+        assert os.path.exists(os.path.join(os.path.dirname(csv_file),
+                                           dev_file))
+
+def test_model_worker(run_pafi):
+    """ModelWorker with two cores per worker"""
+    data = pd.read_csv(run_pafi(nprocs=2,Worker="Model",CoresPerWorker=2,
+                                Replicas=8,ThermSteps=50,SampleSteps=100,
+                                MinSteps=50),index_col=0)
+    assert len(data)==5
+    assert np.isfinite(data.FreeEnergyGradient).all()
+
+def test_model_worker_replicas(run_pafi):
+    """Fewer Replicas than cores per worker is an error"""
+    output = run_pafi(nprocs=2,check=False,Worker="Model",CoresPerWorker=2,
+                      Replicas=1)
+    assert "Replicas=1 is less than the 2 cores" in output
+
+def test_model_worker_valid(run_pafi):
+    """A ModelWorker sample is valid only if all replicas are valid,
+    i.e. MaxJump < MaxJumpThresh, here with some partly valid samples"""
+    data = pd.read_csv(run_pafi(nprocs=2,Worker="Model",CoresPerWorker=2,
+                                Replicas=8,ThermSteps=50,SampleSteps=100,
+                                MinSteps=50,MaxJumpThresh=1e-3,
+                                maxExtraRepeats=0),index_col=0)
+    assert (data.Valid==(data.ValidReplicas==8)).all()
+    assert (data.Valid==(data.MaxJump<1e-3)).all()
+    assert ((data.ValidReplicas>0) & ~data.Valid).any()
+    assert np.isfinite(data.FreeEnergyGradient).all()